@@ -0,0 +1 @@
+"""Офлайн-бенчмарки бота (без сети, на фейковой сессии Bot API)."""
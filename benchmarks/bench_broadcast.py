@@ -0,0 +1,136 @@
+"""Скорость рассылки /broadcast и продолжение после перезапуска.
+
+Рассылает объявление синтетическому реестру подписчиков через настоящую
+очередь исходящих сообщений и фейковую сессию Bot API, в которой часть
+пользователей заблокировала бота. Второй сценарий прерывает рассылку на
+середине, как при перезапуске, продолжает ее новым экземпляром и
+проверяет, что никому не ушло два сообщения.
+
+    python -m benchmarks.bench_broadcast [--subscribers 20000] [--rate 30]
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter
+from typing import Any, Dict
+
+from benchmarks.common import prepare_environment, write_results
+
+FIRST_ID = 1_000_000
+
+
+def make_session(args: argparse.Namespace) -> Any:
+    from aiogram.exceptions import TelegramForbiddenError
+    from aiogram.methods import SendMessage
+
+    from benchmarks.fake_session import FakeSession
+
+    class BlockingSession(FakeSession):
+        """Каждый ``blocked_every``-й пользователь заблокировал бота."""
+
+        async def make_request(self, bot: Any, method: Any, timeout: int = None) -> Any:
+            if isinstance(method, SendMessage) and method.chat_id >= FIRST_ID \
+                    and (method.chat_id - FIRST_ID) % args.blocked_every == 0:
+                self.requests.append(method)
+                raise TelegramForbiddenError(method=method, message="Forbidden: bot was blocked by the user")
+            return await super().make_request(bot, method, timeout)
+
+    return BlockingSession(latency=args.api_latency)
+
+
+def delivered(session: Any, subscribers: int) -> Counter:
+    """Сколько раз каждому подписчику отправлялась рассылка."""
+    return Counter(
+        method.chat_id for method in session.requests
+        if method.__api_method__ == "sendMessage" and FIRST_ID <= method.chat_id < FIRST_ID + subscribers
+    )
+
+
+async def run_broadcast(args: argparse.Namespace, interrupt_after: float = 0) -> Dict[str, Any]:
+    from aiogram import Bot
+
+    import services.broadcast as broadcast_module
+    from config import config
+    from services.broadcast import Broadcaster
+    from services.outbound import OutboundDispatcher
+    from services.subscribers import SubscriberRegistry
+
+    registry = SubscriberRegistry(f"subscribers_{interrupt_after}.bin")
+    for user_id in range(FIRST_ID, FIRST_ID + args.subscribers):
+        registry.add(user_id)
+    registry.close()
+    registry.load()
+    broadcast_module.subscribers = registry
+
+    session = make_session(args)
+    bot = Bot(token=config.BOT_TOKEN, session=session)
+    outbound = OutboundDispatcher(global_rate=args.rate)
+    broadcast_module.outbound = outbound
+    outbound.start(bot)
+
+    state_file = f"broadcast_{interrupt_after}.json"
+    broadcaster = Broadcaster(state_file=state_file, concurrency=args.concurrency)
+    started = time.perf_counter()
+    broadcaster.start("🎭 Новый спектакль!", config.ADMIN_ID)
+    restarts = 0
+    if interrupt_after:
+        await asyncio.sleep(interrupt_after)
+        await broadcaster.stop()
+        restarts += 1
+        # Новый экземпляр - как после перезапуска бота
+        broadcaster = Broadcaster(state_file=state_file, concurrency=args.concurrency)
+        broadcaster.resume()
+    await broadcaster._task
+    elapsed = time.perf_counter() - started
+    await outbound.stop()
+
+    counts = delivered(session, args.subscribers)
+    stats = broadcaster.stats()
+    result = {
+        "subscribers": args.subscribers,
+        "seconds": elapsed,
+        "per_sec": args.subscribers / elapsed,
+        "restarts": restarts,
+        "sent": stats["sent"],
+        "pruned": stats["pruned"],
+        "failed": stats["failed"],
+        "missed": args.subscribers - len(counts),
+        "duplicates": sum(count - 1 for count in counts.values()),
+        "registry_after": len(registry),
+        "state_left": os.path.exists(broadcaster.state_file)
+    }
+    name = "resume" if interrupt_after else "full"
+    print(
+        f"{name:>8}: {result['per_sec']:8.1f} сообщ./с за {elapsed:.1f} с; отправлено {result['sent']}, "
+        f"удалено {result['pruned']}, ошибок {result['failed']}, пропущено {result['missed']}, "
+        f"повторов {result['duplicates']}; в реестре осталось {result['registry_after']}"
+    )
+    return result
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    results = {"full": await run_broadcast(args)}
+    expected = args.subscribers / args.rate
+    results["resume"] = await run_broadcast(args, interrupt_after=max(0.1, expected / 2))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк рассылки")
+    parser.add_argument("--subscribers", type=int, default=20000, help="Подписчиков в реестре")
+    parser.add_argument("--rate", type=float, default=1000, help="Общий лимит отправки, сообщений/сек")
+    parser.add_argument("--concurrency", type=int, default=32, help="Сообщений рассылки в очереди")
+    parser.add_argument("--blocked-every", type=int, default=20, help="Каждый N-й заблокировал бота")
+    parser.add_argument("--api-latency", type=float, default=0.02, help="Задержка фейкового Bot API, сек")
+    parser.add_argument("--output", default="bench_broadcast.json", help="Файл результатов (JSON)")
+    args = parser.parse_args()
+
+    # Лимит на чат не мешает рассылке: каждому пользователю уходит одно сообщение
+    prepare_environment(DEDUP_STATE_FILE="", BROADCAST_REPORT_INTERVAL="1")
+    results = asyncio.run(run(args))
+    write_results(args.output, "broadcast", {"params": vars(args), **results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Пропускная способность и задержки бота на синтетическом потоке обновлений.
+
+Собирает настоящий Dispatcher (``setup_middlewares`` и ``setup_handlers`` из
+bot.py) с фейковой сессией Bot API и прогоняет обновления через пул
+обработчиков webhook. Сеть не используется.
+
+    python -m benchmarks.bench_dispatcher [--updates 2000] [--output bench_dispatcher.json]
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from typing import Any, Dict, Iterator, List
+
+from benchmarks.common import percentiles, prepare_environment, write_results
+
+MENU_TEXTS = ["/start", "/help", "📅 Расписание", "🎫 Купить билеты", "📞 Поддержка"]
+
+
+class UpdateFactory:
+    """Генератор сырых обновлений Telegram."""
+
+    def __init__(self, admin_id: int):
+        self.admin_id = admin_id
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    def _user(self, user_id: int) -> Dict[str, Any]:
+        return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+
+    def message(self, user_id: int, text: str) -> Dict[str, Any]:
+        return {
+            "update_id": next(self._update_ids),
+            "message": {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": self._user(user_id),
+                "text": text
+            }
+        }
+
+    def admin_callback(self, data: str) -> Dict[str, Any]:
+        return {
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._message_ids)),
+                "chat_instance": "benchmark",
+                "from": self._user(self.admin_id),
+                "data": data,
+                "message": {
+                    "message_id": next(self._message_ids),
+                    "date": int(time.time()),
+                    "chat": {"id": self.admin_id, "type": "private"},
+                    "text": "📩 Новый вопрос!"
+                }
+            }
+        }
+
+
+def menu_updates(factory: UpdateFactory, count: int, rng: random.Random) -> Iterator[Dict[str, Any]]:
+    """Команды и кнопки меню от разных пользователей."""
+    for _ in range(count):
+        yield factory.message(rng.randint(1, 1000), rng.choice(MENU_TEXTS))
+
+
+def question_updates(factory: UpdateFactory, user_ids: List[int]) -> Iterator[Dict[str, Any]]:
+    """Наплыв вопросов: по одному от каждого пользователя."""
+    for user_id in user_ids:
+        yield factory.message(user_id, f"Здравствуйте! Вопрос про билеты и парковку №{user_id}")
+
+
+def admin_updates(factory: UpdateFactory, user_ids: List[int]) -> Iterator[Dict[str, Any]]:
+    """Ответы админа (кнопка 'Ответить' + текст) и закрытие вопросов."""
+    for number, user_id in enumerate(user_ids):
+        if number % 2:
+            yield factory.admin_callback(f"close_{user_id}")
+        else:
+            yield factory.admin_callback(f"ans_{user_id}")
+            yield factory.message(factory.admin_id, f"Ответ на вопрос №{user_id}")
+
+
+def flood_updates(factory: UpdateFactory, users: int, messages: int) -> Iterator[Dict[str, Any]]:
+    """Много сообщений подряд от нескольких пользователей (защита от флуда)."""
+    for number in range(messages):
+        for user_id in range(500_000, 500_000 + users):
+            yield factory.message(user_id, f"сообщение {number}")
+
+
+async def run_scenario(name: str, updates: List[Dict[str, Any]], bot: Any, dp: Any,
+                       session: Any, webhook_reply: bool) -> Dict[str, Any]:
+    """Прогоняет обновления через пул обработчиков и меряет задержки.
+
+    С ``webhook_reply`` каждое обновление подается с future ответа, как это
+    делает webhook-обработчик, и методы, ушедшие в ответ, не попадают в API.
+    """
+    from services.webhook import UpdateWorkerPool
+
+    submitted: Dict[int, float] = {}
+    latencies: List[float] = []
+
+    class TimedPool(UpdateWorkerPool):
+        async def _process(self, bot: Any, update: Dict[str, Any]) -> Any:
+            result = await super()._process(bot, update)
+            latencies.append(time.perf_counter() - submitted[update["update_id"]])
+            return result
+
+    pool = TimedPool(dp)
+    requests_before = len(session.requests)
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    for update in updates:
+        submitted[update["update_id"]] = time.perf_counter()
+        reply = loop.create_future() if webhook_reply else None
+        while not await pool.submit(bot, update, reply):
+            await asyncio.sleep(0.001)
+    await pool.stop(timeout=600)
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "updates": len(updates),
+        "seconds": elapsed,
+        "updates_per_sec": len(updates) / elapsed if elapsed else 0.0,
+        "api_requests": len(session.requests) - requests_before,
+        "webhook_replies": pool.webhook_replies,
+        "latency": percentiles(latencies)
+    }
+    print(
+        f"{name:>10}: {result['updates_per_sec']:8.0f} обн/с, "
+        f"p50 {result['latency']['p50_ms']:.2f} мс, p95 {result['latency']['p95_ms']:.2f} мс, "
+        f"p99 {result['latency']['p99_ms']:.2f} мс"
+    )
+    return result
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from aiogram import Bot, Dispatcher
+
+    import bot as bot_module
+    from benchmarks.fake_session import FakeSession
+    from config import config
+    from database import db
+    from services.outbound import outbound
+
+    await db.open()
+    session = FakeSession(latency=args.api_latency)
+    bot = Bot(token=config.BOT_TOKEN, session=session)
+    dp = Dispatcher()
+    bot_module.setup_middlewares(dp)
+    bot_module.setup_handlers(dp)
+    outbound.start(bot)
+
+    rng = random.Random(args.seed)
+    factory = UpdateFactory(config.ADMIN_ID)
+    user_ids = list(range(10_000, 10_000 + args.updates))
+
+    results = {}
+    results["menu"] = await run_scenario(
+        "menu", list(menu_updates(factory, args.updates, rng)), bot, dp, session, args.webhook_reply
+    )
+    results["questions"] = await run_scenario(
+        "questions", list(question_updates(factory, user_ids)), bot, dp, session, args.webhook_reply
+    )
+    results["admin"] = await run_scenario(
+        "admin", list(admin_updates(factory, user_ids)), bot, dp, session, args.webhook_reply
+    )
+    results["flood"] = await run_scenario(
+        "flood", list(flood_updates(factory, 20, max(1, args.updates // 20))), bot, dp, session, args.webhook_reply
+    )
+
+    await outbound.stop(timeout=600)
+    results["outbound"] = outbound.stats()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк обработки обновлений")
+    parser.add_argument("--updates", type=int, default=2000, help="Обновлений в сценарии")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="Задержка фейкового Bot API, сек")
+    parser.add_argument("--webhook-reply", action="store_true",
+                        help="Отправлять ответы обработчиков в ответе на webhook")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_dispatcher.json", help="Файл результатов (JSON)")
+    args = parser.parse_args()
+
+    # Лимиты Telegram в бенчмарке не нужны: меряем сам бот
+    prepare_environment(
+        OUTBOUND_GLOBAL_RATE="1000000",
+        OUTBOUND_CHAT_RATE="1000000",
+        OUTBOUND_CHAT_BURST="1000000",
+        DEDUP_STATE_FILE=""
+    )
+    results = asyncio.run(run(args))
+    write_results(args.output, "dispatcher", {"params": vars(args), **results})
+
+
+if __name__ == "__main__":
+    main()
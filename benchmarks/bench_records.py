@@ -0,0 +1,121 @@
+"""Бенчмарк представления вопросов в JSON хранилище.
+
+Сравнивает прежний формат (dict на вопрос с датой ISO, снимок версии 1)
+с записями ``QuestionRecord`` (снимок версии 2, читаемый и компактный):
+память под вопросы после загрузки, время загрузки хранилища, разовую
+миграцию снимка версии 1 и размер файла снимка.
+
+    python -m benchmarks.bench_records [--sizes 100000,300000]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import time
+import tracemalloc
+from typing import Any, Callable, Dict
+
+from benchmarks.common import prepare_environment, write_results
+from benchmarks.bench_storage import synthetic_questions
+
+
+def measure_memory(build: Callable[[], Any]) -> float:
+    """Память (МБ), которую занимает результат ``build`` после сборки мусора."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current / 1024 / 1024
+
+
+def timed(operation: Callable[[], Any]) -> float:
+    started = time.perf_counter()
+    operation()
+    return time.perf_counter() - started
+
+
+def bench_size(size: int, directory: str) -> Dict[str, Any]:
+    from config import config
+    from database import QuestionsDatabase
+
+    questions = synthetic_questions(size, random.Random(size))
+    legacy_path = os.path.join(directory, f"legacy_{size}.json")
+    with open(legacy_path, "w", encoding="utf-8") as f:
+        json.dump(questions, f, ensure_ascii=False, indent=2)
+    del questions
+
+    def read_legacy() -> Dict[str, Any]:
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def read_records() -> Dict[int, Any]:
+        return QuestionsDatabase._decode_snapshot(read_legacy())[0]
+
+    def load_legacy() -> None:
+        # Так загружалась база до записей: разбор JSON версии 1 и очередь неотвеченных
+        data = read_legacy()
+        sorted(
+            (record.get("created_at") or "", uid) for uid, record in data.items()
+            if not record.get("answered", False)
+        )
+
+    result: Dict[str, Any] = {
+        "legacy_memory_mb": measure_memory(read_legacy),
+        "records_memory_mb": measure_memory(read_records),
+        "legacy_load_seconds": timed(load_legacy)
+    }
+
+    for snapshot_format in ("json", "compact"):
+        config.SNAPSHOT_FORMAT = snapshot_format
+        path = os.path.join(directory, f"{snapshot_format}_{size}.json")
+        with open(legacy_path, "rb") as source, open(path, "wb") as target:
+            target.write(source.read())
+        # Первая загрузка переводит снимок на новую схему и перезаписывает его
+        store = None
+
+        def open_store() -> None:
+            nonlocal store
+            store = QuestionsDatabase(path)
+
+        result[f"migrate_{snapshot_format}_seconds"] = timed(open_store)
+        store.close()
+        store = None
+        gc.collect()
+        result[f"{snapshot_format}_load_seconds"] = timed(open_store)
+        store.close()
+        store = None
+        result[f"{snapshot_format}_snapshot_mb"] = os.path.getsize(path) / 1024 / 1024
+    result["legacy_snapshot_mb"] = os.path.getsize(legacy_path) / 1024 / 1024
+
+    print(f"{size:>9}: память {result['legacy_memory_mb']:.1f} -> {result['records_memory_mb']:.1f} МБ")
+    print(
+        f"{'':>11}загрузка: версия 1 {result['legacy_load_seconds']:.2f} с, "
+        f"json {result['json_load_seconds']:.2f} с, compact {result['compact_load_seconds']:.2f} с "
+        f"(миграция {result['migrate_json_seconds']:.2f} с)"
+    )
+    print(
+        f"{'':>11}снимок: версия 1 {result['legacy_snapshot_mb']:.1f} МБ, "
+        f"json {result['json_snapshot_mb']:.1f} МБ, compact {result['compact_snapshot_mb']:.1f} МБ"
+    )
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк представления вопросов")
+    parser.add_argument("--sizes", default="100000,300000", help="Размеры баз через запятую")
+    parser.add_argument("--output", default="bench_records.json", help="Файл результатов (JSON)")
+    args = parser.parse_args()
+
+    directory = prepare_environment()
+    results: Dict[str, Any] = {"params": vars(args)}
+    for size in (int(value) for value in args.sizes.split(",")):
+        results[f"size_{size}"] = bench_size(size, directory)
+    write_results(args.output, "records", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Кэш расписания: задержка ответа на кнопки и нагрузка на сайт.
+
+Поднимает локальную заглушку сайта (HTML с разметкой мероприятий JSON-LD,
+ETag и задержкой, как у медленного хостинга) и сравнивает ответ на кнопку
+«Расписание» с запросом к сайту на каждое нажатие и ответ из кэша
+``ScheduleCache``, который обновляется в фоне условными запросами.
+
+    python -m benchmarks.bench_schedule [--requests 5000] [--site-latency 0.5]
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from benchmarks.common import percentiles, prepare_environment, write_results
+
+
+def site_page(events: int) -> str:
+    """Страница сайта с ``events`` будущими мероприятиями."""
+    started = datetime.now().replace(hour=19, minute=0, second=0, microsecond=0)
+    graph = [
+        {
+            "@type": "TheaterEvent",
+            "name": f"Спектакль №{number}",
+            "startDate": (started + timedelta(days=number + 1)).isoformat(),
+            "location": {"@type": "Place", "name": "Usupovo Life Hall"},
+            "offers": {
+                "@type": "Offer", "price": str(500 + number * 100), "priceCurrency": "RUB",
+                "url": f"https://example.org/tickets/{number}", "availability": "https://schema.org/InStock"
+            }
+        }
+        for number in range(events)
+    ]
+    markup = json.dumps({"@context": "https://schema.org", "@graph": graph}, ensure_ascii=False)
+    return (
+        "<html><head><title>Usupovo Life Hall</title>"
+        f'<script type="application/ld+json">{markup}</script></head>'
+        "<body>" + "<p>Лорем ипсум</p>" * 2000 + "</body></html>"
+    )
+
+
+async def start_site(page: str, latency: float, counters: Dict[str, int]) -> Any:
+    """Заглушка сайта на localhost: отвечает 304 на совпавший ETag."""
+    from aiohttp import web
+
+    etag = f'"{hash(page) & 0xffffffff:x}"'
+
+    async def handle(request: web.Request) -> web.Response:
+        counters["requests"] += 1
+        await asyncio.sleep(latency)
+        if request.headers.get("If-None-Match") == etag:
+            counters["not_modified"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=page, content_type="text/html", headers={"ETag": etag})
+
+    app = web.Application()
+    app.router.add_get("/", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/"
+
+
+async def timed_calls(call: Any, count: int, concurrency: int) -> List[float]:
+    """Вызывает ``call`` ``count`` раз, не больше ``concurrency`` одновременно."""
+    samples: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            samples.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one() for _ in range(count)))
+    return samples
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import aiohttp
+
+    from config import config
+    from services.schedule import ScheduleCache, parse_events, render_schedule
+
+    page = site_page(args.events)
+    started = time.perf_counter()
+    for _ in range(100):
+        parse_events(page)
+    results: Dict[str, Any] = {"page_kb": len(page.encode()) / 1024,
+                               "parse_ms": (time.perf_counter() - started) * 10}
+
+    counters = {"requests": 0, "not_modified": 0}
+    runner, url = await start_site(page, args.site_latency, counters)
+    try:
+        # Без кэша: каждое нажатие - запрос к сайту и разбор страницы
+        async with aiohttp.ClientSession() as session:
+            async def direct() -> str:
+                async with session.get(url) as response:
+                    body = await response.text()
+                return render_schedule(parse_events(body), config.SCHEDULE_MAX_EVENTS, config.WEBSITE_URL)
+
+            baseline_count = min(args.requests, 500)
+            samples = await timed_calls(direct, baseline_count, args.concurrency)
+            results["direct"] = {"requests": baseline_count, "site_requests": counters["requests"],
+                                 "latency": percentiles(samples)}
+
+        # С кэшем: первая загрузка, затем ответы из памяти и фоновые условные запросы
+        counters.update(requests=0, not_modified=0)
+        cache = ScheduleCache(url=url, refresh_interval=args.refresh_interval, cache_file="")
+        cache.start()
+        await cache.refresh()
+
+        async def cached() -> str:
+            await asyncio.sleep(0)
+            return cache.schedule_text()
+
+        started = time.perf_counter()
+        samples = await timed_calls(cached, args.requests, args.concurrency)
+        # Даем фоновому обновлению пройти несколько раз
+        await asyncio.sleep(max(0.0, 3 * args.refresh_interval - (time.perf_counter() - started)))
+        await cache.stop()
+        results["cached"] = {"requests": args.requests, "site_requests": counters["requests"],
+                             "not_modified": counters["not_modified"], "latency": percentiles(samples)}
+    finally:
+        await runner.cleanup()
+
+    print(f"страница {results['page_kb']:.0f} КБ, разбор {results['parse_ms']:.2f} мс")
+    for name in ("direct", "cached"):
+        stats = results[name]
+        print(
+            f"{name:>7}: p50 {stats['latency']['p50_ms']:.3f} мс, p99 {stats['latency']['p99_ms']:.3f} мс, "
+            f"запросов к сайту {stats['site_requests']} на {stats['requests']} нажатий"
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк кэша расписания")
+    parser.add_argument("--requests", type=int, default=5000, help="Нажатий кнопки")
+    parser.add_argument("--concurrency", type=int, default=50, help="Одновременных нажатий")
+    parser.add_argument("--events", type=int, default=30, help="Мероприятий на странице")
+    parser.add_argument("--site-latency", type=float, default=0.5, help="Задержка ответа сайта, сек")
+    parser.add_argument("--refresh-interval", type=float, default=1.0, help="Интервал обновления кэша, сек")
+    parser.add_argument("--output", default="bench_schedule.json", help="Файл результатов (JSON)")
+    args = parser.parse_args()
+
+    prepare_environment()
+    results = asyncio.run(run(args))
+    write_results(args.output, "schedule", {"params": vars(args), **results})
+
+
+if __name__ == "__main__":
+    main()
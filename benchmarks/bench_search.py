@@ -0,0 +1,105 @@
+"""Бенчмарк поискового индекса /search на истории разного размера.
+
+Строит индекс из синтетических вопросов и ответов, меряет время
+индексации одного документа (как при записи в обработчиках), замены
+открытого вопроса и поиска по частым и редким словам.
+
+    python -m benchmarks.bench_search [--sizes 10000,100000,300000]
+"""
+import argparse
+import random
+import time
+from typing import Any, Dict
+
+from benchmarks.common import percentiles, prepare_environment, write_results
+
+TOPICS = [
+    ("Как вернуть билеты на концерт?", "Возврат билетов оформляется на сайте в личном кабинете."),
+    ("Где парковка у зала?", "Парковка бесплатная, вход со стороны улицы."),
+    ("Можно ли прийти с ребенком?", "Дети до 6 лет проходят бесплатно."),
+    ("Перенесли спектакль, что делать с билетом?", "Билет действует на новую дату."),
+    ("Есть ли скидки для студентов?", "Скидка 20% по студенческому билету."),
+    ("Во сколько открываются двери?", "Двери открываются за час до начала."),
+]
+QUERIES = {
+    "frequent": "билеты",
+    "two_terms": "возврат билетов",
+    "rare": "студенческому",
+    # Частые слова, которые не встречаются вместе: худший случай для ранней остановки
+    "disjoint": "парковка студентов",
+    "missing": "абракадабра"
+}
+
+
+def synthetic_record(number: int, rng: random.Random) -> Dict[str, Any]:
+    question, answer = rng.choice(TOPICS)
+    return {
+        "user_id": 1_000_000 + number,
+        "username": f"@user{number}",
+        "question": f"{question} Заказ {number}",
+        "answer": answer,
+        "resolution": "answered",
+        "resolved_at": "2025-01-01T12:00:00"
+    }
+
+
+def bench_index(size: int, ops: int, rng: random.Random) -> Dict[str, Any]:
+    from services.search import SearchIndex
+
+    index = SearchIndex()
+    records = [synthetic_record(number, rng) for number in range(size)]
+    started = time.perf_counter()
+    for record in records:
+        index.add_archived(record)
+    result: Dict[str, Any] = {"build_seconds": time.perf_counter() - started}
+    del records
+
+    samples = []
+    for number in range(ops):
+        record = synthetic_record(size + number, rng)
+        started = time.perf_counter()
+        index.add_archived(record)
+        samples.append(time.perf_counter() - started)
+    result["add_archived"] = percentiles(samples)
+
+    samples = []
+    for number in range(ops):
+        question = {"question": f"Вопрос про парковку №{number}", "username": "@open"}
+        started = time.perf_counter()
+        index.add_open(42, question)
+        samples.append(time.perf_counter() - started)
+    result["replace_open"] = percentiles(samples)
+
+    for name, query in QUERIES.items():
+        samples = []
+        for _ in range(ops):
+            started = time.perf_counter()
+            index.search(query)
+            samples.append(time.perf_counter() - started)
+        result[f"search_{name}"] = percentiles(samples)
+
+    print(f"{size:>9}: индекс {result['build_seconds']:.2f} с")
+    for name, stats in result.items():
+        if isinstance(stats, dict):
+            print(f"{'':>11}{name:<20} p50 {stats['p50_ms']:.3f} мс, p99 {stats['p99_ms']:.3f} мс")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк поискового индекса")
+    parser.add_argument("--sizes", default="10000,100000,300000", help="Размеры истории через запятую")
+    parser.add_argument("--ops", type=int, default=200, help="Повторов каждой операции")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_search.json", help="Файл результатов (JSON)")
+    args = parser.parse_args()
+
+    prepare_environment()
+    rng = random.Random(args.seed)
+    results: Dict[str, Any] = {"params": vars(args)}
+    for size in (int(value) for value in args.sizes.split(",")):
+        results[f"index_{size}"] = bench_index(size, args.ops, rng)
+    write_results(args.output, "search", results)
+
+
+if __name__ == "__main__":
+    main()
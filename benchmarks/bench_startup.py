@@ -0,0 +1,95 @@
+"""Бенчмарк запуска бота на большой базе вопросов.
+
+Меряет время импорта модуля ``bot`` (до фоновой загрузки хранилище не
+читается, поэтому импорт не зависит от размера базы), время загрузки
+хранилища в ``open`` и размер снимка для форматов json, compact и binary.
+
+    python -m benchmarks.bench_startup [--sizes 100000,300000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Dict
+
+from benchmarks.bench_storage import synthetic_questions
+from benchmarks.common import ROOT, prepare_environment, write_results
+
+FORMATS = ("json", "compact", "binary")
+
+
+def measure_import(directory: str) -> float:
+    """Время импорта ``bot`` в отдельном процессе с базой в ``directory``."""
+    code = (
+        "import sys, time; sys.path.insert(0, sys.argv[1]); started = time.perf_counter(); "
+        "import bot; print(time.perf_counter() - started)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code, ROOT], cwd=directory, env=dict(os.environ, SUGGESTIONS_ENABLED="0"),
+        capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_open(path: str) -> float:
+    """Время ``open`` ленивого хранилища (загрузка в пуле потоков)."""
+    from database import QuestionsDatabase
+
+    store = QuestionsDatabase(path, lazy=True)
+    started = time.perf_counter()
+    asyncio.run(store.open())
+    elapsed = time.perf_counter() - started
+    store.close()
+    return elapsed
+
+
+def bench_size(size: int, directory: str) -> Dict[str, Any]:
+    from config import config
+    from database import QuestionsDatabase
+
+    questions = synthetic_questions(size, random.Random(size))
+    result: Dict[str, Any] = {}
+    for snapshot_format in FORMATS:
+        config.SNAPSHOT_FORMAT = snapshot_format
+        workdir = os.path.join(directory, f"{snapshot_format}_{size}")
+        os.makedirs(workdir, exist_ok=True)
+        path = os.path.join(workdir, "questions.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(questions, f, ensure_ascii=False)
+        # Первая загрузка переводит снимок на текущую схему и формат
+        QuestionsDatabase(path).close()
+
+        result[f"{snapshot_format}_snapshot_mb"] = os.path.getsize(path) / 1024 / 1024
+        result[f"{snapshot_format}_open_seconds"] = measure_open(path)
+        os.environ["SNAPSHOT_FORMAT"] = snapshot_format
+        result[f"{snapshot_format}_import_seconds"] = measure_import(workdir)
+
+    print(f"{size:>9}:")
+    for snapshot_format in FORMATS:
+        print(
+            f"{'':>11}{snapshot_format:<8} импорт bot {result[f'{snapshot_format}_import_seconds']:.2f} с, "
+            f"загрузка {result[f'{snapshot_format}_open_seconds']:.2f} с, "
+            f"снимок {result[f'{snapshot_format}_snapshot_mb']:.1f} МБ"
+        )
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк запуска бота")
+    parser.add_argument("--sizes", default="100000,300000", help="Размеры баз через запятую")
+    parser.add_argument("--output", default="bench_startup.json", help="Файл результатов (JSON)")
+    args = parser.parse_args()
+
+    directory = prepare_environment()
+    results: Dict[str, Any] = {"params": vars(args)}
+    for size in (int(value) for value in args.sizes.split(",")):
+        results[f"size_{size}"] = bench_size(size, directory)
+    write_results(args.output, "startup", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Микробенчмарки хранилища вопросов на базах разного размера.
+
+Для каждого бэкенда (json, sqlite) и размера базы создает синтетическую
+базу, меряет время загрузки и задержки операций, которые выполняют
+обработчики бота. Запись на диск синхронная (без event loop), поэтому
+в задержки изменений входит запись журнала, а в хвост - компактизация.
+
+    python -m benchmarks.bench_storage [--sizes 1000,100000,1000000] [--backends json,sqlite]
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from benchmarks.common import percentiles, prepare_environment, write_results
+
+
+def synthetic_questions(size: int, rng: random.Random) -> Dict[str, Dict[str, Any]]:
+    """База вопросов: часть отвечена, часть взята админом в работу."""
+    started = datetime(2025, 1, 1)
+    questions = {}
+    for number in range(size):
+        state = rng.random()
+        questions[str(1_000_000 + number)] = {
+            "question": f"Вопрос №{number}: когда начинается праздник и где парковка?",
+            "username": f"user{number}",
+            "full_name": f"Пользователь {number}",
+            "created_at": (started + timedelta(seconds=number)).isoformat(),
+            "admin_ready_to_reply": state < 0.01,
+            "answered": state > 0.8
+        }
+    return questions
+
+
+def create_store(backend: str, questions: Dict[str, Dict[str, Any]], directory: str) -> Callable[[], Any]:
+    """Записывает базу на диск и возвращает функцию, открывающую хранилище."""
+    if backend == "sqlite":
+        from sqlite_database import SQLiteQuestionsDatabase
+
+        path = os.path.join(directory, f"bench_{len(questions)}.db")
+        store = SQLiteQuestionsDatabase(path)
+        store.import_questions(questions)
+        store.close()
+        return lambda: SQLiteQuestionsDatabase(path)
+
+    from database import QuestionsDatabase
+
+    path = os.path.join(directory, f"bench_{len(questions)}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(questions, f, ensure_ascii=False, indent=2)
+    return lambda: QuestionsDatabase(path)
+
+
+def measure(operation: Callable[[int], Any], count: int) -> Dict[str, float]:
+    """Вызывает ``operation(i)`` ``count`` раз и возвращает перцентили."""
+    samples: List[float] = []
+    for number in range(count):
+        started = time.perf_counter()
+        operation(number)
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+def bench_store(backend: str, size: int, ops: int, directory: str, rng: random.Random) -> Dict[str, Any]:
+    """Все измерения для одного бэкенда и размера базы."""
+    questions = synthetic_questions(size, rng)
+    existing = [int(uid) for uid in rng.sample(list(questions), min(ops, size))]
+    open_store = create_store(backend, questions, directory)
+    del questions
+
+    started = time.perf_counter()
+    store = open_store()
+    result: Dict[str, Any] = {"load_seconds": time.perf_counter() - started}
+
+    new_ids = [10_000_000 + number for number in range(ops)]
+    result["add_question"] = measure(
+        lambda i: store.add_question(new_ids[i], "Новый вопрос", "bench", "Bench"), ops
+    )
+    result["get_question"] = measure(lambda i: store.get_question(existing[i % len(existing)]), ops)
+    result["append_question"] = measure(lambda i: store.append_question(new_ids[i], "Дополнение"), ops)
+    result["get_pending_questions"] = measure(lambda i: store.get_pending_questions(limit=10), ops)
+    # Страница /questions с курсора в произвольном месте очереди
+    cursors = [(store.get_question(uid)["created_at"], uid) for uid in existing]
+    result["get_pending_page"] = measure(
+        lambda i: store.get_pending_page(11, after=cursors[i % len(cursors)]), ops
+    )
+    result["get_statistics"] = measure(lambda i: store.get_statistics(), ops)
+    result["set_admin_ready"] = measure(lambda i: store.set_admin_ready(new_ids[i]), ops)
+    result["get_ready_to_reply"] = measure(lambda i: store.get_ready_to_reply(), ops)
+    result["mark_answered"] = measure(lambda i: store.mark_answered(new_ids[i]), ops)
+    result["delete_question"] = measure(lambda i: store.delete_question(new_ids[i]), ops)
+    # Ответ на вопрос из середины очереди: ключ удаляется не с ее конца
+    result["answer_queued"] = measure(lambda i: store.mark_answered(existing[i % len(existing)]), ops)
+
+    started = time.perf_counter()
+    store.close()
+    result["close_seconds"] = time.perf_counter() - started
+
+    print(f"{backend:>6} {size:>9}: загрузка {result['load_seconds']:.3f} с")
+    for name, stats in result.items():
+        if isinstance(stats, dict):
+            print(f"{'':>17}{name:<22} p50 {stats['p50_ms']:.3f} мс, p99 {stats['p99_ms']:.3f} мс")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк хранилища вопросов")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="Размеры баз через запятую")
+    parser.add_argument("--backends", default="json,sqlite", help="Бэкенды через запятую")
+    parser.add_argument("--ops", type=int, default=1000, help="Повторов каждой операции")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_storage.json", help="Файл результатов (JSON)")
+    args = parser.parse_args()
+
+    directory = prepare_environment()
+    rng = random.Random(args.seed)
+    results: Dict[str, Any] = {"params": vars(args)}
+    for backend in args.backends.split(","):
+        for size in (int(value) for value in args.sizes.split(",")):
+            results[f"{backend}_{size}"] = bench_store(backend, size, args.ops, directory, rng)
+    write_results(args.output, "storage", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Планировщик таймеров вопросов на базах разного размера.
+
+Меряет построение таймеров при запуске (один проход по открытым
+вопросам) и постановку с отменой таймеров, которые делают обработчики.
+
+    python -m benchmarks.bench_timers [--sizes 100000,300000]
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from benchmarks.common import percentiles, prepare_environment, write_results
+
+
+def bench_size(size: int, ops: int) -> Dict[str, Any]:
+    from services.timers import QuestionTimers
+
+    rng = random.Random(size)
+    now = datetime.now()
+    pending = {
+        str(1_000_000 + number): {
+            "question": "Вопрос", "created_at": (now - timedelta(seconds=rng.randint(0, 10 * 86400))).isoformat(),
+            "admin_ready_to_reply": rng.random() < 0.01, "answered": False
+        }
+        for number in range(size)
+    }
+    timers = QuestionTimers(sla=7200, ready_timeout=900, retention=30 * 86400)
+
+    started = time.perf_counter()
+    asyncio.run(timers.rebuild(pending))
+    result: Dict[str, Any] = {"rebuild_seconds": time.perf_counter() - started, "timers": len(timers._live)}
+
+    created_at = now.isoformat()
+    samples = []
+    for number in range(ops):
+        user_id = 10_000_000 + number
+        began = time.perf_counter()
+        timers.track(user_id, created_at)
+        timers.forget(user_id)
+        samples.append(time.perf_counter() - began)
+    result["track_forget"] = percentiles(samples)
+
+    print(
+        f"{size:>9}: построение {result['rebuild_seconds']:.3f} с ({result['timers']} таймеров), "
+        f"track+forget p50 {result['track_forget']['p50_ms'] * 1000:.1f} мкс, "
+        f"p99 {result['track_forget']['p99_ms'] * 1000:.1f} мкс"
+    )
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк таймеров вопросов")
+    parser.add_argument("--sizes", default="100000,300000", help="Открытых вопросов через запятую")
+    parser.add_argument("--ops", type=int, default=10000, help="Постановок и отмен таймеров")
+    parser.add_argument("--output", default="bench_timers.json", help="Файл результатов (JSON)")
+    args = parser.parse_args()
+
+    prepare_environment()
+    results: Dict[str, Any] = {"params": vars(args)}
+    for size in (int(value) for value in args.sizes.split(",")):
+        results[f"size_{size}"] = bench_size(size, args.ops)
+    write_results(args.output, "timers", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Общие функции бенчмарков: окружение, статистика, файл результатов."""
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def prepare_environment(**env: str) -> str:
+    """Готовит окружение до импорта модулей бота.
+
+    Бот читает конфигурацию и создает базу при импорте, поэтому переменные
+    окружения и рабочий каталог (временный, чтобы не трогать настоящий
+    questions.json) нужно задать заранее. Возвращает путь к каталогу.
+    """
+    os.environ.setdefault("BOT_TOKEN", "123456:BENCHMARK-TOKEN")
+    for key, value in env.items():
+        os.environ.setdefault(key, value)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    workdir = tempfile.mkdtemp(prefix="usupovo-bench-")
+    os.chdir(workdir)
+    return workdir
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99, среднее и максимум (в миллисекундах)."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": ordered[-1] * 1000
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(path: str, benchmark: str, results: Dict[str, Any]) -> None:
+    """Сохраняет результаты в JSON для сравнения версий (benchmarks/compare.py)."""
+    payload = {
+        "benchmark": benchmark,
+        "revision": _git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results
+    }
+    path = os.path.join(ROOT, path) if not os.path.isabs(path) else path
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    print(f"Результаты записаны в {path}")
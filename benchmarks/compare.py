@@ -0,0 +1,67 @@
+"""Сравнение двух файлов результатов бенчмарка.
+
+    python -m benchmarks.compare old.json new.json [--threshold 0.1]
+
+Показывает значения, изменившиеся больше порога. Для задержек и времени
+рост - ухудшение, для пропускной способности (``*_per_sec``) - наоборот.
+Код возврата 1, если есть ухудшения.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict
+
+
+def flatten(value: Any, prefix: str = "") -> Dict[str, float]:
+    """Разворачивает вложенные результаты в ``путь.к.значению -> число``."""
+    if isinstance(value, dict):
+        flat = {}
+        for key, child in value.items():
+            if key == "params":
+                continue
+            flat.update(flatten(child, f"{prefix}.{key}" if prefix else key))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: float(value)}
+    return {}
+
+
+def is_timing(key: str) -> bool:
+    """Метрика, у которой меньше - лучше."""
+    name = key.rsplit(".", 1)[-1]
+    return name.endswith("_ms") or name.endswith("seconds")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Сравнение результатов бенчмарков")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Порог изменения (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"{old.get('revision')} -> {new.get('revision')} ({new.get('benchmark')})")
+
+    old_values = flatten(old["results"])
+    new_values = flatten(new["results"])
+    regressions = 0
+    for key in sorted(old_values.keys() & new_values.keys()):
+        before, after = old_values[key], new_values[key]
+        if not (is_timing(key) or key.endswith("_per_sec")) or not before:
+            continue
+        change = (after - before) / before
+        if abs(change) < args.threshold:
+            continue
+        worse = change > 0 if is_timing(key) else change < 0
+        regressions += worse
+        mark = "ХУЖЕ " if worse else "лучше"
+        print(f"  {mark} {key:<50} {before:12.3f} -> {after:12.3f} ({change:+.0%})")
+    print(f"Ухудшений: {regressions}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
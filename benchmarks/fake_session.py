@@ -0,0 +1,55 @@
+"""Фейковая сессия Bot API: отвечает на запросы локально, без сети."""
+import asyncio
+import itertools
+from datetime import datetime
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import Chat, Message
+
+
+class FakeSession(BaseSession):
+    """Сессия, которая запоминает запросы и возвращает правдоподобные ответы.
+
+    ``latency`` имитирует время ответа Telegram, ``errors`` позволяет
+    подменить ответ на конкретный вызов исключением (по порядковому номеру).
+    """
+
+    def __init__(self, latency: float = 0.0, errors: Optional[Dict[int, Exception]] = None):
+        super().__init__()
+        self.latency = latency
+        self.errors = errors or {}
+        self.requests: List[TelegramMethod[Any]] = []
+        self._message_ids = itertools.count(1)
+
+    async def close(self) -> None:
+        pass
+
+    async def make_request(self, bot: Bot, method: TelegramMethod[TelegramType],
+                           timeout: Optional[int] = None) -> TelegramType:
+        number = len(self.requests)
+        self.requests.append(method)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if number in self.errors:
+            raise self.errors[number]
+        if method.__api_method__ in {"sendMessage", "sendDocument"}:
+            return Message(
+                message_id=next(self._message_ids),
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id, type="private"),
+                text=getattr(method, "text", None)
+            )
+        return True
+
+    async def stream_content(self, url: str, headers: Optional[Dict[str, Any]] = None,
+                             timeout: int = 30, chunk_size: int = 65536,
+                             raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    def count(self, api_method: str) -> int:
+        """Сколько раз вызывался метод Bot API."""
+        return sum(1 for method in self.requests if method.__api_method__ == api_method)
@@ -0,0 +1,250 @@
+"""Нагрузочная проверка режима нескольких процессов (WORKERS > 1).
+
+Запускает bot.py с N процессами на одном порту и общей базой SQLite,
+поднимает локальный фейковый Bot API (TELEGRAM_API_URL) и параллельно
+отправляет на webhook вопросы множества пользователей, часть обновлений -
+повторно. Затем проверяет, что ни один вопрос не потерян и не задвоен:
+в базе ровно по одному вопросу на пользователя со всеми его сообщениями
+по одному разу, админ получил ровно одно уведомление на пользователя.
+
+    python -m benchmarks.stress_workers [--workers 4] [--users 200] [--messages 3]
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import re
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+import aiohttp
+from aiohttp import web
+
+from benchmarks.common import ROOT, write_results
+
+ADMIN_ID = 1
+TOKEN = "123456:STRESS-TOKEN"
+SECRET_PATH = "stress"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeBotAPI:
+    """HTTP-сервер, отвечающий как Bot API и запоминающий вызовы."""
+
+    def __init__(self):
+        self.calls: List[Dict[str, Any]] = []
+        self._message_ids = itertools.count(1)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        fields = dict(await request.post())
+        self.calls.append({"method": method, **fields})
+        result: Any = True
+        if method == "sendMessage":
+            result = {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(fields["chat_id"]), "type": "private"},
+                "text": fields.get("text", "")
+            }
+        return web.json_response({"ok": True, "result": result})
+
+    def messages_to(self, chat_id: int) -> List[str]:
+        return [
+            call.get("text", "") for call in self.calls
+            if call["method"] == "sendMessage" and int(call["chat_id"]) == chat_id
+        ]
+
+
+def make_update(update_id: int, user_id: int, text: str) -> Dict[str, Any]:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+            "text": text
+        }
+    }
+
+
+async def wait_until(predicate, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if await predicate():
+            return True
+        await asyncio.sleep(0.2)
+    return False
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    api = FakeBotAPI()
+    api_app = web.Application()
+    api_app.router.add_post("/bot{token}/{method}", api.handle)
+    api_runner = web.AppRunner(api_app)
+    await api_runner.setup()
+    api_port = free_port()
+    await web.TCPSite(api_runner, "127.0.0.1", api_port).start()
+
+    workdir = tempfile.mkdtemp(prefix="usupovo-stress-")
+    bot_port = free_port()
+    env = dict(
+        os.environ,
+        BOT_TOKEN=TOKEN,
+        ADMIN_ID=str(ADMIN_ID),
+        WORKERS=str(args.workers),
+        STORAGE_BACKEND="sqlite",
+        SQLITE_FILE=os.path.join(workdir, "questions.db"),
+        PORT=str(bot_port),
+        WEBHOOK_SECRET_PATH=SECRET_PATH,
+        WEBHOOK_URL=f"http://127.0.0.1:{bot_port}",
+        TELEGRAM_API_URL=f"http://127.0.0.1:{api_port}",
+        OUTBOUND_GLOBAL_RATE="100000",
+        OUTBOUND_CHAT_RATE="100000",
+        OUTBOUND_CHAT_BURST="100000"
+    )
+    env.pop("WORKER_ID", None)
+    log = open(os.path.join(workdir, "bot.log"), "w")
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "bot.py")], cwd=workdir, env=env,
+        stdout=log, stderr=subprocess.STDOUT
+    )
+
+    base_url = f"http://127.0.0.1:{bot_port}"
+    # Новое соединение на каждый запрос: ядро распределяет соединения по процессам
+    session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(force_close=True))
+    workers_seen: Dict[int, int] = {}
+
+    async def poll_status() -> bool:
+        try:
+            async with session.get(f"{base_url}/status") as response:
+                status = await response.json()
+            if status.get("ready"):
+                workers_seen[status["worker"]] = status["webhook"]["processed"]
+        except (aiohttp.ClientError, ValueError):
+            pass
+        return len(workers_seen) == args.workers
+
+    rng = random.Random(args.seed)
+    update_ids = itertools.count(1)
+    responses: Counter = Counter()
+    replies_in_webhook: Counter = Counter()
+    sent_updates = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def post(update: Dict[str, Any]) -> None:
+        nonlocal sent_updates
+        for _ in range(50):
+            async with semaphore:
+                async with session.post(f"{base_url}/webhook/{SECRET_PATH}", json=update) as response:
+                    body = await response.text()
+                    responses[response.status] += 1
+            if response.status == 200:
+                break
+            await asyncio.sleep(0.1)
+        sent_updates += 1
+        if "Ваш вопрос принят" in body:
+            replies_in_webhook[update["message"]["chat"]["id"]] += 1
+
+    async def user_session(user_id: int) -> None:
+        # Сообщения одного пользователя - по очереди, как их отправляет Telegram
+        for number in range(args.messages):
+            update = make_update(next(update_ids), user_id, f"u{user_id}-m{number}")
+            await post(update)
+            if rng.random() < args.duplicates:
+                await post(update)
+
+    users = list(range(1000, 1000 + args.users))
+    try:
+        if not await wait_until(poll_status, 30):
+            raise RuntimeError(f"Запустились не все процессы: {sorted(workers_seen)}")
+        started = time.perf_counter()
+        await asyncio.gather(*(user_session(user_id) for user_id in users))
+        elapsed = time.perf_counter() - started
+
+        async def notified() -> bool:
+            return len(api.messages_to(ADMIN_ID)) >= len(users)
+
+        await wait_until(notified, 10)
+        for _ in range(args.workers * 10):
+            await poll_status()
+    finally:
+        await session.close()
+        # Ждем в потоке: при остановке процессы бота еще обращаются к фейковому API
+        process.send_signal(signal.SIGTERM)
+        await asyncio.get_running_loop().run_in_executor(None, process.wait, 30)
+        log.close()
+        await api_runner.cleanup()
+
+    conn = sqlite3.connect(env["SQLITE_FILE"])
+    stored = dict(conn.execute("SELECT user_id, question FROM questions"))
+    conn.close()
+
+    problems = []
+    for user_id in users:
+        expected = [f"u{user_id}-m{number}" for number in range(args.messages)]
+        if user_id not in stored:
+            problems.append(f"{user_id}: вопрос потерян")
+        elif stored[user_id].split("\n") != expected:
+            problems.append(f"{user_id}: {stored[user_id]!r}")
+        acks = replies_in_webhook[user_id] + sum(
+            "Ваш вопрос принят" in text for text in api.messages_to(user_id)
+        )
+        if acks != 1:
+            problems.append(f"{user_id}: подтверждений {acks}")
+    admin_notifications = Counter(
+        int(user_id) for text in api.messages_to(ADMIN_ID) for user_id in re.findall(r"🆔 (\d+)", text)
+    )
+    for user_id in users:
+        if admin_notifications[user_id] != 1:
+            problems.append(f"{user_id}: уведомлений админу {admin_notifications[user_id]}")
+
+    result = {
+        "workers": args.workers,
+        "updates": sent_updates,
+        "seconds": elapsed,
+        "updates_per_sec": sent_updates / elapsed if elapsed else 0.0,
+        "http_statuses": {str(status): count for status, count in responses.items()},
+        "processed_by_worker": {str(worker): count for worker, count in sorted(workers_seen.items())},
+        "problems": len(problems)
+    }
+    print(f"Процессов: {args.workers}, обновлений: {sent_updates}, {result['updates_per_sec']:.0f} обн/с")
+    print(f"Обработано процессами: {result['processed_by_worker']}")
+    for problem in problems[:20]:
+        print(f"  ❌ {problem}")
+    print("✅ Потерь и дублей нет" if not problems else f"❌ Проблем: {len(problems)} (лог: {workdir}/bot.log)")
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Проверка нескольких процессов с общей базой")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=3, help="Сообщений от каждого пользователя")
+    parser.add_argument("--duplicates", type=float, default=0.2, help="Доля повторно доставленных обновлений")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="stress_workers.json", help="Файл результатов (JSON)")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    write_results(args.output, "stress_workers", {"params": vars(args), **result})
+    return 1 if result["problems"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
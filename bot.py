@@ -1,12 +1,38 @@
 """Главный файл Telegram бота Usupovo Life Hall."""
+import asyncio
 import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from typing import Optional
 from aiogram import Bot, Dispatcher, F
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.filters import Command
-from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiogram.webhook.aiohttp_server import setup_application
 from aiohttp import web
 
 from config import config
+from database import db
 from handlers import common, support, admin
+from middlewares.dedup import DedupMiddleware, deduplicator
+from middlewares.metrics import ApiMetricsMiddleware, HandlerMetricsMiddleware, UpdateMetricsMiddleware
+from middlewares.throttling import ThrottlingMiddleware
+from middlewares.webhook_reply import WebhookReplyMiddleware
+from services.archive import archive
+from services.broadcast import broadcaster
+from services.digest import notifier
+from services.metrics import loop_monitor, metrics
+from services.operators import operators
+from services.outbound import outbound
+from services.schedule import schedule
+from services.search import search_index
+from services.subscribers import subscribers
+from services.suggestions import suggestions
+from services.timers import timers
+from services.webhook import PooledRequestHandler
 
 
 # Настройка логирования
@@ -16,47 +42,140 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Бот готов обрабатывать обновления: база загружена, индексы построены
+ready = asyncio.Event()
+_warm_up_task: Optional[asyncio.Task] = None
+
 
 async def on_startup(bot: Bot) -> None:
     """Выполняется при запуске бота."""
-    url = config.webhook_url
-    await bot.set_webhook(url)
-    logger.info(f"✅ Webhook установлен на {url}")
+    global _warm_up_task
+    outbound.start(bot)
+    loop_monitor.start()
+    # Расписание отдается из кэша (сохраненного на диске), обновляется в фоне
+    schedule.start()
+    # Сервер начинает слушать порт только после on_startup, поэтому база и
+    # индексы загружаются в фоне: health-check сразу отвечает, а пришедшие
+    # обновления ждут в очередях пула
+    _warm_up_task = asyncio.create_task(warm_up(bot))
+
+
+async def warm_up(bot: Bot) -> None:
+    """Загружает базу и индексы, затем открывает обработку обновлений."""
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    try:
+        await db.open()
+        operators.restore(db.get_open_assignments())
+        await loop.run_in_executor(None, subscribers.load)
+        pending = db.get_pending_questions()
+        await loop.run_in_executor(None, search_index.rebuild, pending)
+        # Таймеры всех открытых вопросов строит один процесс
+        if config.is_primary_worker:
+            await timers.rebuild(pending)
+        del pending
+        if config.SUGGESTIONS_ENABLED:
+            await loop.run_in_executor(None, load_suggestions)
+    except Exception:
+        # Бот остается неготовым: health-check отвечает 503, и хостинг перезапустит процесс
+        logger.exception("❌ Ошибка загрузки базы")
+        return
+    ready.set()
+    timers.start(support.resolve_question)
+    logger.info(f"✅ Бот готов к работе за {time.perf_counter() - started:.2f} с")
+    # Рассылка, прерванная перезапуском, продолжается с сохраненного места
+    broadcaster.resume()
+    # При нескольких процессах webhook настраивает только первый
+    if config.is_primary_worker:
+        url = config.webhook_url
+        try:
+            await bot.set_webhook(url)
+        except Exception:
+            logger.exception(f"❌ Не удалось установить webhook на {url}")
+            return
+        logger.info(f"✅ Webhook установлен на {url}")
+
+
+async def health_check(_: web.Request) -> web.Response:
+    """Health check: 503, пока бот загружает базу."""
+    if not ready.is_set():
+        return web.Response(status=503, text="⏳ Usupovo Bot is starting")
+    return web.Response(text="✅ Usupovo Bot is running!")
+
+
+def load_suggestions() -> None:
+    """Загружает индекс подсказок, а если его еще нет - строит по архиву."""
+    if not suggestions.load():
+        suggestions.rebuild(archive.records())
 
 
 async def on_shutdown(bot: Bot) -> None:
     """Выполняется при остановке бота."""
-    await bot.delete_webhook()
+    if _warm_up_task is not None and not _warm_up_task.done():
+        _warm_up_task.cancel()
+        await asyncio.gather(_warm_up_task, return_exceptions=True)
+    if config.is_primary_worker:
+        await bot.delete_webhook()
+    # Рассылка сохраняет прогресс, пока очередь отправки еще работает
+    await broadcaster.stop()
+    # Вопросы, ждущие сводки, отправляем операторам сейчас, а не теряем
+    notifier.flush_all()
+    await outbound.stop()
+    await loop_monitor.stop()
+    await schedule.stop()
+    await timers.stop()
+    deduplicator.save()
+    # Дописываем отложенные изменения, чтобы не потерять их при перезапуске
+    await db.flush()
+    db.close()
+    await archive.flush()
+    archive.close()
+    subscribers.close()
+    # Индекс подсказок у процессов одинаковый по архиву, сохраняет его первый
+    # (и только загруженный, чтобы не затереть файл пустым)
+    if config.SUGGESTIONS_ENABLED and config.is_primary_worker and ready.is_set():
+        suggestions.save()
     logger.info("🛑 Webhook удален, бот остановлен")
 
 
 def setup_handlers(dp: Dispatcher) -> None:
     """Регистрирует все обработчики."""
+    # Простые ответы отправляем в теле ответа на webhook
+    reply_in_webhook = {"webhook_reply": True}
+    
     # Общие команды
-    dp.message.register(common.cmd_start, Command("start"))
-    dp.message.register(common.cmd_help, Command("help"))
+    dp.message.register(common.cmd_start, Command("start"), flags=reply_in_webhook)
+    dp.message.register(common.cmd_help, Command("help"), flags=reply_in_webhook)
     
     # Обработчики кнопок меню
-    dp.message.register(common.info_handler, F.text.in_({"📅 Расписание", "🎫 Купить билеты"}))
-    dp.message.register(support.support_handler, F.text == "📞 Поддержка")
+    dp.message.register(
+        common.info_handler,
+        F.text.in_({"📅 Расписание", "🎫 Купить билеты"}),
+        flags=reply_in_webhook
+    )
+    dp.message.register(support.support_handler, F.text == "📞 Поддержка", flags=reply_in_webhook)
     dp.message.register(admin.stats_button_handler, F.text == "📊 Статистика")
     
     # Админские команды
     dp.message.register(admin.cmd_stats, Command("stats"))
     dp.message.register(admin.cmd_questions, Command("questions"))
+    dp.message.register(admin.cmd_export, Command("export"))
+    dp.message.register(admin.cmd_search, Command("search"))
+    dp.message.register(admin.cmd_broadcast, Command("broadcast"))
     
     # Обработка вопросов и ответов
-    # Сначала проверяем, не админ ли это (для ответов на вопросы)
+    # Сначала проверяем, не оператор ли это (для ответов на вопросы)
     dp.message.register(
         support.handle_admin_reply,
-        F.from_user.id == config.ADMIN_ID,
+        F.from_user.id.in_(config.staff_ids),
         F.text
     )
-    # Затем обрабатываем вопросы от обычных пользователей (не админов)
+    # Затем обрабатываем вопросы от обычных пользователей (не операторов)
     dp.message.register(
         support.handle_user_question,
-        F.from_user.id != config.ADMIN_ID,
-        F.text
+        ~F.from_user.id.in_(config.staff_ids),
+        F.text,
+        flags={"throttle": True, "webhook_reply": True}
     )
     
     # Callback обработчики
@@ -64,14 +183,44 @@ def setup_handlers(dp: Dispatcher) -> None:
         support.answer_callback,
         F.data.startswith("ans_") | F.data.startswith("close_")
     )
+    dp.callback_query.register(support.digest_page_callback, F.data.startswith("dg_"))
+    dp.callback_query.register(admin.search_page_callback, F.data.startswith("srch_"))
+    dp.callback_query.register(admin.questions_page_callback, F.data.startswith("qp_"))
+    dp.callback_query.register(support.suggestion_callback, F.data.startswith("sug_"))
 
 
-def main() -> None:
-    """Главная функция запуска бота."""
-    bot = Bot(token=config.BOT_TOKEN)
+def setup_middlewares(dp: Dispatcher) -> None:
+    """Регистрирует middleware."""
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    # Повторно доставленные обновления отбрасываем до любых обработчиков
+    dp.update.outer_middleware(DedupMiddleware(deduplicator))
+    handler_metrics = HandlerMetricsMiddleware()
+    dp.message.middleware(handler_metrics)
+    dp.callback_query.middleware(handler_metrics)
+    # Ограничение частоты вопросов (для обработчиков с флагом throttle)
+    dp.message.middleware(ThrottlingMiddleware())
+    # Ответ, который вернул обработчик: в теле ответа на webhook (флаг webhook_reply) или запросом
+    webhook_reply = WebhookReplyMiddleware()
+    dp.message.middleware(webhook_reply)
+    dp.callback_query.middleware(webhook_reply)
+
+
+def create_bot() -> Bot:
+    """Создает бота (с другим адресом Bot API, если он задан)."""
+    if config.TELEGRAM_API_URL:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(config.TELEGRAM_API_URL))
+        return Bot(token=config.BOT_TOKEN, session=session)
+    return Bot(token=config.BOT_TOKEN)
+
+
+def run_server() -> None:
+    """Запускает webhook-сервер бота в текущем процессе."""
+    bot = create_bot()
+    bot.session.middleware(ApiMetricsMiddleware())
     dp = Dispatcher()
     
-    # Регистрируем обработчики
+    # Регистрируем middleware и обработчики
+    setup_middlewares(dp)
     setup_handlers(dp)
     
     # Регистрируем startup и shutdown
@@ -81,29 +230,93 @@ def main() -> None:
     # Настройка webhook сервера
     app = web.Application()
     
-    # Health check endpoint
-    app.router.add_get(
-        "/",
-        lambda _: web.Response(text="✅ Usupovo Bot is running!")
-    )
+    # Health check endpoint (готовность после загрузки базы)
+    app.router.add_get("/", health_check)
     
-    # Webhook endpoint
-    webhook_requests_handler = SimpleRequestHandler(
+    # Webhook endpoint: обновления обрабатывает пул, простые ответы уходят в ответе на webhook
+    webhook_requests_handler = PooledRequestHandler(
         dispatcher=dp,
-        bot=bot
+        bot=bot,
+        ready=ready
     )
     webhook_requests_handler.register(app, path=config.webhook_path)
+    
+    # Состояние очередей (обновления и исходящие сообщения)
+    app.router.add_get(
+        "/status",
+        lambda _: web.json_response({
+            "webhook": webhook_requests_handler.pool.stats(),
+            "outbound": outbound.stats(),
+            "dedup": deduplicator.stats(),
+            "operators": operators.stats(),
+            "broadcast": broadcaster.stats(),
+            "schedule": schedule.stats(),
+            "timers": timers.stats(),
+            "worker": config.WORKER_ID,
+            "ready": ready.is_set()
+        })
+    )
+    
+    # Метрики в формате Prometheus
+    metrics.gauge_callback("bot_webhook", "Пул обработки webhook", webhook_requests_handler.pool.stats)
+    metrics.gauge_callback("bot_outbound", "Очередь исходящих сообщений", outbound.stats)
+    metrics.gauge_callback("bot_dedup", "Кэш повторных обновлений", deduplicator.stats)
+    metrics.gauge_callback("bot_broadcast", "Рассылка /broadcast", broadcaster.stats)
+    metrics.gauge_callback("bot_schedule", "Кэш расписания", schedule.stats)
+    metrics.gauge_callback("bot_question_timers", "Таймеры открытых вопросов", timers.stats)
+    app.router.add_get(
+        "/metrics",
+        lambda _: web.Response(text=metrics.render(), content_type="text/plain")
+    )
+    
     setup_application(app, dp, bot=bot)
     
     logger.info(f"🚀 Бот запускается на {config.WEB_SERVER_HOST}:{config.WEB_SERVER_PORT}")
     
-    # Запуск сервера
+    # Запуск сервера (несколько процессов слушают один порт через SO_REUSEPORT)
     web.run_app(
         app,
         host=config.WEB_SERVER_HOST,
-        port=config.WEB_SERVER_PORT
+        port=config.WEB_SERVER_PORT,
+        reuse_port=config.WORKERS > 1
     )
 
 
+def run_workers(count: int) -> None:
+    """Запускает ``count`` процессов бота на одном порту и ждет их завершения."""
+    # spawn: каждый процесс заново открывает базу, а не наследует соединение SQLite
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for worker_id in range(count):
+        os.environ["WORKER_ID"] = str(worker_id)
+        process = context.Process(target=run_server, name=f"bot-worker-{worker_id}")
+        process.start()
+        processes.append(process)
+    logger.info(f"🚀 Запущено процессов: {count}")
+    
+    # SIGTERM останавливает главный процесс штатно, чтобы остановить и дочерние
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for process in processes:
+            process.join()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+
+
+def main() -> None:
+    """Главная функция запуска бота."""
+    config.validate()
+    if config.WORKERS > 1 and config.WORKER_ID is None:
+        run_workers(config.WORKERS)
+    else:
+        run_server()
+
+
 if __name__ == "__main__":
     main()
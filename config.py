@@ -15,9 +15,66 @@ class Config:
     # ID администратора (можно указать через переменную окружения)
     ADMIN_ID: int = int(os.getenv("ADMIN_ID", "2107059658"))
     
+    # Операторы поддержки (ID через запятую); по умолчанию вопросы получает администратор
+    OPERATOR_IDS: list[int] = [
+        int(operator_id) for operator_id in os.getenv("OPERATOR_IDS", "").split(",") if operator_id.strip()
+    ] or [ADMIN_ID]
+    # Распределение вопросов: "least_loaded" (меньше открытых вопросов) или "round_robin"
+    ASSIGNMENT_STRATEGY: str = os.getenv("ASSIGNMENT_STRATEGY", "least_loaded")
+    
+    # Хранилище вопросов: "json" (файл questions.json) или "sqlite"
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "json")
+
     # Файл с вопросами
     QUESTIONS_FILE: str = "questions.json"
-    
+    # Файл базы SQLite
+    SQLITE_FILE: str = os.getenv("SQLITE_FILE", "questions.db")
+    # Сколько ждать блокировки базы SQLite другим процессом, сек
+    SQLITE_BUSY_TIMEOUT: float = float(os.getenv("SQLITE_BUSY_TIMEOUT", "5.0"))
+
+    # Режим хранения: "journal" (журнал изменений + периодические снимки)
+    # или "json" (полная перезапись файла после каждого изменения)
+    STORAGE_MODE: str = os.getenv("STORAGE_MODE", "journal")
+    # Формат снимка questions.json: "json" (читаемый, с отступами),
+    # "compact" (список строк без отступов - меньше файл и быстрее загрузка)
+    # или "binary" (двоичные столбцы - самая быстрая загрузка)
+    SNAPSHOT_FORMAT: str = os.getenv("SNAPSHOT_FORMAT", "json")
+    # Через сколько записей журнала делать компактный снимок
+    JOURNAL_COMPACT_EVERY: int = int(os.getenv("JOURNAL_COMPACT_EVERY", "1000"))
+    # Вызывать fsync после каждой записи в журнал
+    JOURNAL_FSYNC: bool = os.getenv("JOURNAL_FSYNC", "0") == "1"
+    # Отложенная запись на диск в фоновом потоке (внутри event loop)
+    ASYNC_PERSISTENCE: bool = os.getenv("ASYNC_PERSISTENCE", "1") == "1"
+    # Пауза без изменений перед записью, сек
+    FLUSH_DELAY: float = float(os.getenv("FLUSH_DELAY", "0.5"))
+    # Максимальная задержка записи при непрерывном потоке изменений, сек
+    FLUSH_MAX_DELAY: float = float(os.getenv("FLUSH_MAX_DELAY", "2.0"))
+
+    # Архив отвеченных и закрытых вопросов (сжатые сегменты JSONL)
+    ARCHIVE_DIR: str = os.getenv("ARCHIVE_DIR", "archive")
+    # Размер сегмента архива (несжатых данных), после которого начинается новый, байт
+    ARCHIVE_SEGMENT_BYTES: int = int(os.getenv("ARCHIVE_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+    # Через сколько после первой записи пачка уходит в архив на диск, сек
+    ARCHIVE_FLUSH_DELAY: float = float(os.getenv("ARCHIVE_FLUSH_DELAY", "1.0"))
+    # Размер пачки, при котором она пишется сразу, не дожидаясь таймера, байт
+    ARCHIVE_FLUSH_BYTES: int = int(os.getenv("ARCHIVE_FLUSH_BYTES", str(256 * 1024)))
+
+    # Поиск /search: сколько лучших результатов показывать и сколько на странице
+    SEARCH_MAX_RESULTS: int = int(os.getenv("SEARCH_MAX_RESULTS", "50"))
+    SEARCH_PAGE_SIZE: int = int(os.getenv("SEARCH_PAGE_SIZE", "5"))
+
+    # Подсказки ответов по похожим прошлым вопросам
+    SUGGESTIONS_ENABLED: bool = os.getenv("SUGGESTIONS_ENABLED", "1") == "1"
+    # Файл индекса подсказок, число признаков и сколько последних ответов в нем держать
+    SUGGEST_INDEX_FILE: str = os.getenv("SUGGEST_INDEX_FILE", "suggestions.npz")
+    SUGGEST_DIM: int = int(os.getenv("SUGGEST_DIM", "2048"))
+    SUGGEST_MAX_ITEMS: int = int(os.getenv("SUGGEST_MAX_ITEMS", "5000"))
+    # Сколько подсказок показывать и минимальная похожесть подсказки (0..1)
+    SUGGEST_COUNT: int = int(os.getenv("SUGGEST_COUNT", "3"))
+    SUGGEST_MIN_SCORE: float = float(os.getenv("SUGGEST_MIN_SCORE", "0.3"))
+    # Похожесть, с которой бот отвечает сам, без оператора (0 - не отвечать)
+    SUGGEST_AUTO_REPLY: float = float(os.getenv("SUGGEST_AUTO_REPLY", "0"))
+
     # Параметры webhook
     WEB_SERVER_HOST: str = "0.0.0.0"
     WEB_SERVER_PORT: int = int(os.getenv("PORT", "8000"))
@@ -29,10 +86,100 @@ class Config:
         "WEBHOOK_URL", 
         "https://usupovo-bot.onrender.com"
     ).strip()
+    # Адрес Bot API (пусто - api.telegram.org), например локальный telegram-bot-api
+    TELEGRAM_API_URL: str = os.getenv("TELEGRAM_API_URL", "").strip()
+    
+    # Число процессов бота на одном порту (SO_REUSEPORT); больше 1 - только с SQLite
+    WORKERS: int = int(os.getenv("WORKERS", "1"))
+    # Номер процесса: задается главным процессом при запуске нескольких
+    WORKER_ID: Optional[int] = int(os.environ["WORKER_ID"]) if "WORKER_ID" in os.environ else None
     
+    # Исходящие сообщения: общий лимит (сообщений/сек), лимит и запас на чат
+    OUTBOUND_GLOBAL_RATE: float = float(os.getenv("OUTBOUND_GLOBAL_RATE", "25"))
+    OUTBOUND_CHAT_RATE: float = float(os.getenv("OUTBOUND_CHAT_RATE", "1"))
+    OUTBOUND_CHAT_BURST: int = int(os.getenv("OUTBOUND_CHAT_BURST", "3"))
+    OUTBOUND_WORKERS: int = int(os.getenv("OUTBOUND_WORKERS", "8"))
+    OUTBOUND_MAX_RETRIES: int = int(os.getenv("OUTBOUND_MAX_RETRIES", "5"))
+
+    # Сводки уведомлений админу при наплыве вопросов
+    DIGEST_ENABLED: bool = os.getenv("DIGEST_ENABLED", "0") == "1"
+    # Окно сбора сводки, сек, и число вопросов в окне, после которого включается сводка
+    DIGEST_WINDOW: float = float(os.getenv("DIGEST_WINDOW", "30"))
+    DIGEST_THRESHOLD: int = int(os.getenv("DIGEST_THRESHOLD", "5"))
+    # Вопросов на одной странице сводки
+    DIGEST_PAGE_SIZE: int = int(os.getenv("DIGEST_PAGE_SIZE", "5"))
+    # Вопросов на одной странице /questions
+    QUESTIONS_PAGE_SIZE: int = int(os.getenv("QUESTIONS_PAGE_SIZE", "10"))
+
+    # Реестр пользователей для рассылок /broadcast
+    SUBSCRIBERS_FILE: str = os.getenv("SUBSCRIBERS_FILE", "subscribers.bin")
+    # Файл прогресса рассылки (продолжение после перезапуска)
+    BROADCAST_STATE_FILE: str = os.getenv("BROADCAST_STATE_FILE", "broadcast_state.json")
+    # Сколько сообщений рассылки держать в очереди отправки одновременно
+    BROADCAST_CONCURRENCY: int = int(os.getenv("BROADCAST_CONCURRENCY", "32"))
+    # Как часто обновлять отчет админу и сохранять прогресс, сек
+    BROADCAST_REPORT_INTERVAL: float = float(os.getenv("BROADCAST_REPORT_INTERVAL", "5"))
+    BROADCAST_CHECKPOINT_INTERVAL: float = float(os.getenv("BROADCAST_CHECKPOINT_INTERVAL", "1"))
+
+    # Обработка webhook: число обработчиков, общий размер очередей и
+    # сколько ждать места в очереди, прежде чем ответить Telegram 503
+    WEBHOOK_WORKERS: int = int(os.getenv("WEBHOOK_WORKERS", "16"))
+    WEBHOOK_MAX_QUEUE: int = int(os.getenv("WEBHOOK_MAX_QUEUE", "1000"))
+    WEBHOOK_ENQUEUE_TIMEOUT: float = float(os.getenv("WEBHOOK_ENQUEUE_TIMEOUT", "1.0"))
+    # Сколько ждать ответа обработчика, чтобы отправить его в теле ответа на webhook (0 - не ждать)
+    WEBHOOK_REPLY_TIMEOUT: float = float(os.getenv("WEBHOOK_REPLY_TIMEOUT", "0.5"))
+
+    # Защита от повторной доставки обновлений: сколько update_id помнить и как долго, сек
+    DEDUP_MAX_SIZE: int = int(os.getenv("DEDUP_MAX_SIZE", "10000"))
+    DEDUP_TTL: float = float(os.getenv("DEDUP_TTL", "3600"))
+    # Файл с последним обработанным update_id (пустая строка - не сохранять)
+    DEDUP_STATE_FILE: str = os.getenv("DEDUP_STATE_FILE", "dedup_state.json")
+    DEDUP_SAVE_EVERY: int = int(os.getenv("DEDUP_SAVE_EVERY", "100"))
+
+    # Защита от флуда вопросами: не больше THROTTLE_BURST сообщений подряд,
+    # затем одно сообщение в THROTTLE_PERIOD / THROTTLE_BURST секунд
+    THROTTLE_BURST: int = int(os.getenv("THROTTLE_BURST", "5"))
+    THROTTLE_PERIOD: float = float(os.getenv("THROTTLE_PERIOD", "60"))
+    # Сроки открытых вопросов, сек (0 - отключить): напоминание оператору о вопросе без ответа,
+    # сколько ждать ответа после кнопки «Ответить» и когда закрывать вопрос без ответа
+    QUESTION_SLA: float = float(os.getenv("QUESTION_SLA", str(2 * 3600)))
+    REPLY_READY_TIMEOUT: float = float(os.getenv("REPLY_READY_TIMEOUT", str(15 * 60)))
+    QUESTION_RETENTION: float = float(os.getenv("QUESTION_RETENTION", str(30 * 86400)))
+    # Сообщения, пришедшие в течение окна после вопроса, дописываются к нему, сек
+    QUESTION_MERGE_WINDOW: float = float(os.getenv("QUESTION_MERGE_WINDOW", "60"))
+    # Максимальная длина текста вопроса после объединения сообщений
+    MAX_QUESTION_LENGTH: int = 4000
+
     # URL сайта
     WEBSITE_URL: str = "https://usupovo-life-hall.onrender.com/"
+    # Страница с расписанием (разметка мероприятий JSON-LD или JSON-список мероприятий)
+    SCHEDULE_URL: str = os.getenv("SCHEDULE_URL", WEBSITE_URL)
+    # Как часто перепроверять расписание на сайте и сколько ждать ответа сайта, сек
+    SCHEDULE_REFRESH_INTERVAL: float = float(os.getenv("SCHEDULE_REFRESH_INTERVAL", "300"))
+    SCHEDULE_TIMEOUT: float = float(os.getenv("SCHEDULE_TIMEOUT", "15"))
+    # Файл кэша расписания (пустая строка - не сохранять) и сколько мероприятий показывать
+    SCHEDULE_CACHE_FILE: str = os.getenv("SCHEDULE_CACHE_FILE", "schedule_cache.json")
+    SCHEDULE_MAX_EVENTS: int = int(os.getenv("SCHEDULE_MAX_EVENTS", "10"))
     
+    @property
+    def default_operator_id(self) -> int:
+        """Оператор вопросов, у которых оператор не указан (созданных до появления операторов)."""
+        return self.OPERATOR_IDS[0]
+
+    @property
+    def staff_ids(self) -> set[int]:
+        """Администратор и операторы поддержки."""
+        return {self.ADMIN_ID, *self.OPERATOR_IDS}
+
+    def is_staff(self, user_id: int) -> bool:
+        """Администратор или оператор поддержки."""
+        return user_id == self.ADMIN_ID or user_id in self.OPERATOR_IDS
+
+    @property
+    def is_primary_worker(self) -> bool:
+        """Процесс, который управляет webhook (единственный или первый из нескольких)."""
+        return not self.WORKER_ID
+
     @property
     def webhook_path(self) -> str:
         """Возвращает путь webhook."""
@@ -47,9 +194,15 @@ class Config:
         """Проверяет корректность конфигурации."""
         if not self.BOT_TOKEN:
             raise ValueError("Токен бота не найден! Проверьте переменную окружения BOT_TOKEN")
+        if self.ASSIGNMENT_STRATEGY not in ("least_loaded", "round_robin"):
+            raise ValueError(f"Неизвестная стратегия распределения: {self.ASSIGNMENT_STRATEGY}")
+        if self.SNAPSHOT_FORMAT not in ("json", "compact", "binary"):
+            raise ValueError(f"Неизвестный формат снимка: {self.SNAPSHOT_FORMAT}")
+        if self.WORKERS > 1 and self.STORAGE_BACKEND != "sqlite":
+            # JSON-хранилище живет в памяти процесса: процессы перезаписывали бы файл друг друга
+            raise ValueError("WORKERS > 1 требует STORAGE_BACKEND=sqlite")
 
 
-# Создаем глобальный экземпляр конфигурации
+# Создаем глобальный экземпляр конфигурации (проверяется при запуске бота, в main)
 config = Config()
-config.validate()
 
@@ -1,132 +1,915 @@
-"""Модуль для работы с базой данных (JSON файл)."""
+"""Модуль для работы с базой данных (интерфейс хранилища и JSON файл)."""
+import asyncio
+import bisect
+import gc
+import itertools
 import json
 import logging
 import os
-from typing import Dict, Any, Optional
+import struct
+import sys
+import time
+from abc import ABC, abstractmethod
+from array import array
+from typing import Dict, Any, Iterator, List, Optional, TextIO, Tuple
 from datetime import datetime
 from config import config
+from services.metrics import metrics
 
 
-class QuestionsDatabase:
-    """Класс для работы с вопросами пользователей."""
-    
-    def __init__(self, file_path: str = None):
-        """Инициализация базы данных."""
+SAVE_SECONDS = metrics.histogram("bot_storage_save_seconds", "Время записи снимка базы")
+SNAPSHOT_BYTES = metrics.gauge("bot_storage_snapshot_bytes", "Размер снимка базы")
+JOURNAL_WRITE_SECONDS = metrics.histogram(
+    "bot_storage_journal_write_seconds", "Время записи пачки изменений в журнал"
+)
+
+
+# Версия схемы снимка questions.json: 1 - {uid: вопрос} с датами ISO (или
+# строкой вопроса в самом старом формате), 2 - {"version": 2, ...} с датами
+# в секундах Unix
+SCHEMA_VERSION = 2
+
+
+def _to_epoch(value: Any) -> Optional[float]:
+    """Время вопроса в секундах Unix из снимка любой версии (ISO или число)."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_iso(value: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(value).isoformat() if value is not None else None
+
+
+class QuestionRecord:
+    """Вопрос в памяти JSON хранилища (наружу отдается dict с датой ISO)."""
+
+    # Слоты вместо dict: время создания - число (секунды Unix), имена интернируются
+    __slots__ = (
+        "question", "username", "full_name", "created_at", "admin_ready_to_reply", "answered", "operator_id"
+    )
+
+    def __init__(self, question: str, username: Optional[str] = None, full_name: Optional[str] = None,
+                 created_at: Optional[float] = None, admin_ready_to_reply: bool = False,
+                 answered: bool = False, operator_id: Optional[int] = None):
+        self.question = question
+        # Одинаковые имена (и "—" без имени) хранятся одной строкой
+        self.username = sys.intern(username) if username else username
+        self.full_name = sys.intern(full_name) if full_name else full_name
+        self.created_at = created_at
+        self.admin_ready_to_reply = admin_ready_to_reply
+        self.answered = answered
+        self.operator_id = operator_id
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "QuestionRecord":
+        """Запись из снимка или журнала любой версии."""
+        if not isinstance(data, dict):
+            # Самый старый формат: строка с текстом вопроса
+            return cls(str(data), created_at=time.time())
+        return cls(
+            data.get("question") or "", data.get("username"), data.get("full_name"),
+            _to_epoch(data.get("created_at")), bool(data.get("admin_ready_to_reply", False)),
+            bool(data.get("answered", False)), data.get("operator_id")
+        )
+
+    def to_json(self) -> Dict[str, Any]:
+        """Вопрос для снимка и журнала (время числом)."""
+        return {
+            "question": self.question,
+            "username": self.username,
+            "full_name": self.full_name,
+            "created_at": self.created_at,
+            "admin_ready_to_reply": self.admin_ready_to_reply,
+            "answered": self.answered,
+            "operator_id": self.operator_id
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Вопрос в формате интерфейса хранилища (время ISO)."""
+        data = self.to_json()
+        data["created_at"] = _to_iso(self.created_at)
+        return data
+
+    def to_row(self, uid: int) -> list:
+        """Строка компактного снимка: [uid, поля в порядке __slots__]."""
+        return [
+            uid, self.question, self.username, self.full_name, self.created_at,
+            self.admin_ready_to_reply, self.answered, self.operator_id
+        ]
+
+    def update(self, fields: Dict[str, Any]) -> None:
+        """Применяет поля записи журнала "update"."""
+        for name, value in fields.items():
+            if name in self.__slots__:
+                setattr(self, name, _to_epoch(value) if name == "created_at" else value)
+
+
+# Двоичный снимок (SNAPSHOT_FORMAT=binary): заголовок, затем столбцы
+# записей - ID пользователей, время создания, флаги, операторы - и в конце
+# тексты (вопрос, username, имя) в UTF-8 через нулевой символ
+BINARY_MAGIC = b"USQS"
+BINARY_HEADER = struct.Struct("<4sHI")
+# Флаги записи: признаки вопроса и пустые (None) поля
+FLAG_READY = 1
+FLAG_ANSWERED = 2
+FLAG_NO_USERNAME = 4
+FLAG_NO_FULL_NAME = 8
+FLAG_NO_CREATED_AT = 16
+FLAG_NO_OPERATOR = 32
+
+
+def _encode_binary(rows: List[list]) -> bytes:
+    """Двоичный снимок из строк ``QuestionRecord.to_row``."""
+    uids = array("q")
+    created = array("d")
+    flags = array("B")
+    operators = array("q")
+    texts = []
+    for uid, question, username, full_name, created_at, ready, answered, operator_id in rows:
+        uids.append(uid)
+        created.append(created_at or 0.0)
+        flags.append(
+            (FLAG_READY if ready else 0) | (FLAG_ANSWERED if answered else 0)
+            | (FLAG_NO_USERNAME if username is None else 0) | (FLAG_NO_FULL_NAME if full_name is None else 0)
+            | (FLAG_NO_CREATED_AT if created_at is None else 0) | (FLAG_NO_OPERATOR if operator_id is None else 0)
+        )
+        operators.append(operator_id or 0)
+        # Нулевой символ - разделитель текстов (в сообщениях Telegram его не бывает)
+        texts += (question.replace("\0", ""), (username or "").replace("\0", ""),
+                  (full_name or "").replace("\0", ""))
+    if sys.byteorder != "little":
+        for column in (uids, created, operators):
+            column.byteswap()
+    return b"".join((
+        BINARY_HEADER.pack(BINARY_MAGIC, SCHEMA_VERSION, len(rows)),
+        uids.tobytes(), created.tobytes(), flags.tobytes(), operators.tobytes(),
+        "\0".join(texts).encode("utf-8")
+    ))
+
+
+def _decode_binary(raw: bytes) -> Dict[int, QuestionRecord]:
+    """Записи из двоичного снимка (ValueError, если он поврежден)."""
+    try:
+        _, version, count = BINARY_HEADER.unpack_from(raw)
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"неизвестная версия схемы {version}")
+        columns = []
+        offset = BINARY_HEADER.size
+        for typecode in ("q", "d", "B", "q"):
+            column = array(typecode)
+            size = column.itemsize * count
+            column.frombytes(raw[offset:offset + size])
+            offset += size
+            columns.append(column)
+        uids, created, flags, operators = columns
+        if sys.byteorder != "little":
+            for column in (uids, created, operators):
+                column.byteswap()
+        texts = raw[offset:].decode("utf-8").split("\0")
+    except struct.error as e:
+        raise ValueError(f"поврежденный двоичный снимок: {e}") from e
+    if len(operators) != count or count and len(texts) != 3 * count:
+        raise ValueError("поврежденный двоичный снимок: не хватает данных")
+    data = {}
+    text = iter(texts)
+    for uid, created_at, flag, operator_id, question, username, full_name in zip(
+        uids, created, flags, operators, text, text, text
+    ):
+        data[uid] = QuestionRecord(
+            question,
+            None if flag & FLAG_NO_USERNAME else username,
+            None if flag & FLAG_NO_FULL_NAME else full_name,
+            None if flag & FLAG_NO_CREATED_AT else created_at,
+            bool(flag & FLAG_READY), bool(flag & FLAG_ANSWERED),
+            None if flag & FLAG_NO_OPERATOR else operator_id
+        )
+    return data
+
+
+class SortedKeys:
+    """Отсортированный набор ключей блоками: вставка и удаление за O(log N + блок)."""
+
+    # Размер блока: при вдвое большем блок делится пополам
+    LOAD = 1000
+
+    def __init__(self, keys: Optional[List[Tuple[float, int]]] = None):
+        """``keys`` - уже отсортированные ключи."""
+        keys = keys or []
+        self._blocks = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._len = len(keys)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Tuple[float, int]]:
+        for block in self._blocks:
+            yield from block
+
+    def add(self, key: Tuple[float, int]) -> None:
+        """Добавляет ключ."""
+        self._len += 1
+        if not self._blocks:
+            self._blocks.append([key])
+            self._maxes.append(key)
+            return
+        pos = min(bisect.bisect_left(self._maxes, key), len(self._blocks) - 1)
+        block = self._blocks[pos]
+        bisect.insort(block, key)
+        self._maxes[pos] = block[-1]
+        if len(block) > 2 * self.LOAD:
+            self._blocks.insert(pos + 1, block[self.LOAD:])
+            del block[self.LOAD:]
+            self._maxes.insert(pos, block[-1])
+
+    def remove(self, key: Tuple[float, int]) -> None:
+        """Удаляет ключ (он должен быть в наборе)."""
+        pos = bisect.bisect_left(self._maxes, key)
+        block = self._blocks[pos]
+        del block[bisect.bisect_left(block, key)]
+        self._len -= 1
+        if block:
+            self._maxes[pos] = block[-1]
+        else:
+            del self._blocks[pos]
+            del self._maxes[pos]
+
+    def after(self, key: tuple) -> Iterator[Tuple[float, int]]:
+        """Ключи больше ``key`` по возрастанию."""
+        pos = bisect.bisect_right(self._maxes, key)
+        if pos < len(self._blocks):
+            block = self._blocks[pos]
+            yield from block[bisect.bisect_right(block, key):]
+        for block in self._blocks[pos + 1:]:
+            yield from block
+
+    def before(self, key: tuple) -> Iterator[Tuple[float, int]]:
+        """Ключи меньше ``key`` по убыванию."""
+        pos = bisect.bisect_left(self._maxes, key)
+        if pos < len(self._blocks):
+            block = self._blocks[pos]
+            yield from reversed(block[:bisect.bisect_left(block, key)])
+        for block in reversed(self._blocks[:pos]):
+            yield from reversed(block)
+
+
+class QuestionsStorage(ABC):
+    """Интерфейс хранилища вопросов, с которым работают обработчики.
+
+    Вопрос возвращается в виде dict с ключами ``question``, ``username``,
+    ``full_name``, ``created_at``, ``admin_ready_to_reply``, ``answered`` и
+    ``operator_id`` (оператор, которому назначен вопрос; None - оператор
+    по умолчанию).
+    """
+
+    @abstractmethod
+    def add_question(self, user_id: int, question: str, username: str = None,
+                     full_name: str = None, operator_id: Optional[int] = None) -> bool:
+        """Добавляет новый вопрос."""
+
+    @abstractmethod
+    def get_question(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Получает вопрос пользователя."""
+
+    @abstractmethod
+    def append_question(self, user_id: int, text: str) -> bool:
+        """Дописывает текст к вопросу пользователя (не длиннее MAX_QUESTION_LENGTH)."""
+
+    @abstractmethod
+    def set_admin_ready(self, user_id: int, operator_id: Optional[int] = None) -> bool:
+        """Помечает, что оператор (если указан - он же забирает вопрос себе) готов ответить.
+
+        У оператора остается одна такая пометка - на последнем выбранном вопросе.
+        """
+
+    @abstractmethod
+    def clear_admin_ready(self, user_id: int) -> bool:
+        """Снимает готовность оператора ответить (вопрос снова ждет ответа)."""
+
+    @abstractmethod
+    def mark_answered(self, user_id: int) -> bool:
+        """Помечает вопрос как отвеченный."""
+
+    @abstractmethod
+    def delete_question(self, user_id: int) -> bool:
+        """Удаляет вопрос."""
+
+    @abstractmethod
+    def get_pending_questions(self, limit: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Возвращает неотвеченные вопросы (самые старые первыми)."""
+
+    @abstractmethod
+    def get_pending_page(self, limit: int, after: Optional[Tuple[str, int]] = None,
+                         before: Optional[Tuple[str, int]] = None, created_before: Optional[str] = None,
+                         with_username: bool = False) -> List[Tuple[int, Dict[str, Any]]]:
+        """Возвращает страницу неотвеченных вопросов по курсору, самые старые первыми.
+
+        Курсор - ключ ``(created_at, user_id)`` вопроса: ``after`` - страница
+        сразу после него, ``before`` - сразу перед ним (без курсора - первая
+        страница). ``created_before`` оставляет вопросы, заданные раньше этого
+        времени (ISO), ``with_username`` - только пользователей с @username.
+        """
+
+    @abstractmethod
+    def get_ready_to_reply(self, operator_id: Optional[int] = None) -> Optional[tuple[int, Dict[str, Any]]]:
+        """Возвращает вопрос, на который готов ответить оператор (последний выбранный им)."""
+
+    @abstractmethod
+    def get_open_assignments(self) -> Dict[int, Optional[int]]:
+        """Возвращает операторов неотвеченных вопросов: ID пользователя -> ID оператора."""
+
+    @abstractmethod
+    def get_statistics(self) -> Dict[str, int]:
+        """Возвращает статистику по вопросам."""
+
+    @abstractmethod
+    def get_all_questions(self) -> Dict[str, Any]:
+        """Возвращает все вопросы (для админа)."""
+
+    async def open(self) -> None:
+        """Готовит хранилище к работе (загружает данные, если это нужно)."""
+
+    async def flush(self) -> bool:
+        """Дописывает отложенные изменения на диск."""
+        return True
+
+    def close(self) -> None:
+        """Освобождает ресурсы хранилища."""
+
+
+class QuestionsDatabase(QuestionsStorage):
+    """Хранилище вопросов в JSON файле: снимок и журнал изменений."""
+
+    def __init__(self, file_path: str = None, mode: str = None, lazy: bool = False,
+                 read_only: bool = False):
+        """Инициализация базы данных.
+
+        С ``lazy=True`` данные загружает ``open``, с ``read_only=True`` файлы
+        только читаются (снимок и журнал не меняются, поврежденный снимок -
+        ошибка загрузки).
+        """
         self.file_path = file_path or config.QUESTIONS_FILE
-        self._data: Dict[str, Any] = {}
-        self.load()
-    
+        self.journal_path = f"{self.file_path}.journal"
+        self.mode = mode or config.STORAGE_MODE
+        self.read_only = read_only
+        self._data: Dict[int, QuestionRecord] = {}
+        self._journal: Optional[TextIO] = None
+        self._journal_entries = 0
+        # Изменения, еще не записанные на диск
+        self._pending: List[Dict[str, Any]] = []
+        self._dirty = False
+        self._dirty_since: Optional[float] = None
+        self._last_change = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        # Отсортированные ключи (created_at, uid) неотвеченных вопросов
+        self._pending_index = SortedKeys()
+        self._pending_keys: Dict[int, Tuple[float, int]] = {}
+        # Вопросы, на которые операторы готовы ответить, в порядке пометки
+        self._ready: Dict[int, Dict[int, None]] = {}
+        self._ready_owners: Dict[int, int] = {}
+        self.loaded = False
+        if not lazy:
+            self.load()
+
+    @property
+    def journaled(self) -> bool:
+        """Включен ли режим журнала: изменения дописываются в ``<file>.journal``."""
+        return self.mode == "journal"
+
     def load(self) -> None:
-        """Загружает данные из файла."""
-        if os.path.exists(self.file_path):
-            try:
-                with open(self.file_path, "r", encoding="utf-8") as f:
-                    self._data = json.load(f)
-                logging.info(f"Загружено {len(self._data)} записей из {self.file_path}")
-            except json.JSONDecodeError as e:
-                logging.error(f"Ошибка парсинга JSON: {e}")
-                self._data = {}
-            except Exception as e:
-                logging.error(f"Ошибка загрузки вопросов: {e}")
-                self._data = {}
-        else:
-            self._data = {}
+        """Загружает снимок, проигрывает журнал и строит индексы."""
+        # Сотни тысяч новых объектов подряд запускают сборщик мусора снова и
+        # снова, хотя мусора нет: на время чтения снимка он выключается
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self._data, version = self._read_snapshot()
+            self._pending_index, self._pending_keys, self._ready_owners = self._build_indexes()
+        finally:
+            if gc_enabled:
+                gc.enable()
+        self._ready = {}
+        for uid, operator_id in self._ready_owners.items():
+            self._ready.setdefault(operator_id, {})[uid] = None
+        if self.journaled:
+            self._replay_journal()
+        if version < SCHEMA_VERSION and not self.read_only:
+            # Миграция выполняется один раз: снимок сразу пишется в новой схеме
+            logging.info(f"Снимок {self.file_path} переведен на схему версии {SCHEMA_VERSION}")
+            if self.journaled:
+                self.compact()
+            else:
+                self.save()
+        self.loaded = True
+
+    async def open(self) -> None:
+        """Загружает данные в пуле потоков, если хранилище создано с ``lazy=True``."""
+        if not self.loaded:
+            await asyncio.get_running_loop().run_in_executor(None, self.load)
+
+    def _read_snapshot(self) -> Tuple[Dict[int, QuestionRecord], int]:
+        """Читает снимок базы из файла, возвращает вопросы и версию схемы файла."""
+        if not os.path.exists(self.file_path):
             logging.info(f"Файл {self.file_path} не найден, создана новая база")
-    
+            return {}, SCHEMA_VERSION
+        try:
+            with open(self.file_path, "rb") as f:
+                raw = f.read()
+            if raw.startswith(BINARY_MAGIC):
+                data, version = _decode_binary(raw), SCHEMA_VERSION
+            else:
+                data, version = self._decode_snapshot(json.loads(raw))
+            del raw
+            logging.info(f"Загружено {len(data)} записей из {self.file_path}")
+            return data, version
+        except ValueError as e:
+            if self.read_only:
+                raise
+            # Не даем следующему сохранению затереть поврежденный или
+            # более новый, чем понимает эта версия бота, файл
+            broken_path = f"{self.file_path}.corrupt-{int(datetime.now().timestamp())}"
+            os.replace(self.file_path, broken_path)
+            logging.error(f"Ошибка чтения снимка: {e}, файл сохранен как {broken_path}")
+        except Exception as e:
+            if self.read_only:
+                raise
+            logging.error(f"Ошибка загрузки вопросов: {e}")
+        return {}, SCHEMA_VERSION
+
+    @staticmethod
+    def _decode_snapshot(raw: Dict[str, Any]) -> Tuple[Dict[int, QuestionRecord], int]:
+        """Переводит разобранный JSON снимка в записи текущей схемы."""
+        version = raw.get("version")
+        if not isinstance(version, int):
+            # Версия 1: ключи - ID пользователей
+            return {int(uid): QuestionRecord.from_dict(value) for uid, value in raw.items()}, 1
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"неизвестная версия схемы {version}")
+        if "rows" in raw:
+            return {row[0]: QuestionRecord(*row[1:]) for row in raw["rows"]}, version
+        return {int(uid): QuestionRecord.from_dict(value) for uid, value in raw["questions"].items()}, version
+
+    def _replay_journal(self) -> None:
+        """Применяет записи журнала поверх снимка."""
+        self._journal_entries = 0
+        if not os.path.exists(self.journal_path):
+            return
+        valid_size = 0
+        with open(self.journal_path, "rb") as f:
+            for raw_line in f:
+                try:
+                    if not raw_line.endswith(b"\n"):
+                        raise ValueError("неполная запись")
+                    self._apply(json.loads(raw_line))
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    # Оборванная запись в конце журнала после сбоя или запись
+                    # без нужных полей: дальше журнал не проигрывается
+                    logging.warning(f"Журнал {self.journal_path} обрезан на байте {valid_size}: {e}")
+                    break
+                valid_size += len(raw_line)
+                self._journal_entries += 1
+        if valid_size != os.path.getsize(self.journal_path) and not self.read_only:
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(valid_size)
+        logging.info(f"Проиграно {self._journal_entries} записей журнала {self.journal_path}")
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        """Применяет одну запись журнала к данным в памяти.
+
+        Все операции задают абсолютные значения, поэтому повторное
+        проигрывание журнала поверх более свежего снимка безопасно.
+        """
+        op = entry["op"]
+        uid = int(entry["uid"])
+        try:
+            if op == "put":
+                self._data[uid] = QuestionRecord.from_dict(entry["data"])
+            elif op == "update":
+                record = self._data.get(uid)
+                if record is not None:
+                    record.update(entry["fields"])
+            elif op == "delete":
+                self._data.pop(uid, None)
+            else:
+                raise ValueError(f"неизвестная операция {op!r}")
+        finally:
+            # Индексы должны совпадать с записью, даже если поля применились не все
+            self._reindex(uid)
+
+    @staticmethod
+    def _operator_of(record: QuestionRecord) -> int:
+        """Оператор вопроса (для старых записей - оператор по умолчанию)."""
+        return record.operator_id or config.default_operator_id
+
+    @staticmethod
+    def _pending_key(uid: int, record: Optional[QuestionRecord]) -> Optional[Tuple[float, int]]:
+        """Ключ записи в очереди неотвеченных или None, если вопрос не ожидает ответа."""
+        if record is not None and not record.answered:
+            return record.created_at or 0.0, uid
+        return None
+
+    def _reindex(self, uid: int) -> None:
+        """Обновляет индексы после изменения одной записи."""
+        record = self._data.get(uid)
+        new_key = self._pending_key(uid, record)
+        old_key = self._pending_keys.get(uid)
+        if old_key != new_key:
+            if old_key is not None:
+                self._pending_index.remove(old_key)
+                del self._pending_keys[uid]
+            if new_key is not None:
+                self._pending_index.add(new_key)
+                self._pending_keys[uid] = new_key
+        new_owner = (
+            self._operator_of(record)
+            if new_key is not None and record.admin_ready_to_reply else None
+        )
+        old_owner = self._ready_owners.get(uid)
+        if old_owner == new_owner:
+            return
+        if old_owner is not None:
+            queue = self._ready[old_owner]
+            del queue[uid]
+            if not queue:
+                del self._ready[old_owner]
+            del self._ready_owners[uid]
+        if new_owner is not None:
+            self._ready.setdefault(new_owner, {})[uid] = None
+            self._ready_owners[uid] = new_owner
+
+    def _build_indexes(self) -> Tuple[SortedKeys, Dict[int, Tuple[float, int]], Dict[int, int]]:
+        """Строит индексы заново по всем данным."""
+        keys = {}
+        for uid, record in self._data.items():
+            key = self._pending_key(uid, record)
+            if key is not None:
+                keys[uid] = key
+        ready_owners = {
+            uid: self._operator_of(self._data[uid]) for uid in keys
+            if self._data[uid].admin_ready_to_reply
+        }
+        return SortedKeys(sorted(keys.values())), keys, ready_owners
+
+    def check_indexes(self) -> List[str]:
+        """Сверяет индексы с данными (для тестов), возвращает список расхождений."""
+        index, keys, ready_owners = self._build_indexes()
+        problems = []
+        if list(index) != list(self._pending_index):
+            problems.append(f"очередь неотвеченных: {list(self._pending_index)} != {list(index)}")
+        if keys != self._pending_keys:
+            problems.append("ключи очереди неотвеченных не совпадают с данными")
+        if ready_owners != self._ready_owners:
+            problems.append(f"готовые к ответу: {self._ready_owners} != {ready_owners}")
+        queued = {uid: operator_id for operator_id, queue in self._ready.items() for uid in queue}
+        if queued != self._ready_owners:
+            problems.append("очереди готовых к ответу не совпадают с владельцами")
+        return problems
+
+    def _commit(self, entry: Dict[str, Any]) -> bool:
+        """Применяет изменение и сохраняет его на диск.
+
+        Внутри event loop запись откладывается и выполняется фоновым
+        сбросом (см. ``flush``), а метод сразу возвращает True.
+        """
+        if self.read_only:
+            raise RuntimeError(f"База {self.file_path} открыта только для чтения")
+        self._apply(entry)
+        if self.journaled:
+            self._pending.append(entry)
+        self._dirty = True
+        loop = self._running_loop()
+        if loop is None:
+            return self._flush_sync()
+        now = time.monotonic()
+        if self._dirty_since is None:
+            self._dirty_since = now
+        self._last_change = now
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_later())
+        return True
+
+    @staticmethod
+    def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+        """Возвращает работающий event loop, если отложенная запись включена."""
+        if not config.ASYNC_PERSISTENCE:
+            return None
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    def _take_pending(self) -> List[Dict[str, Any]]:
+        """Забирает накопленные изменения для записи."""
+        entries, self._pending = self._pending, []
+        self._dirty = False
+        self._dirty_since = None
+        return entries
+
+    def _restore_pending(self, entries: List[Dict[str, Any]]) -> None:
+        """Возвращает незаписанные изменения в очередь после ошибки."""
+        self._pending[:0] = entries
+        self._dirty = True
+        self._dirty_since = time.monotonic()
+
+    def _flush_sync(self) -> bool:
+        """Синхронно записывает накопленные изменения."""
+        entries = self._take_pending()
+        if self.journaled:
+            ok = self._write_journal(entries)
+            if ok and self._journal_entries >= config.JOURNAL_COMPACT_EVERY:
+                ok = self.compact()
+        else:
+            ok = self.save()
+        if not ok:
+            self._restore_pending(entries)
+        return ok
+
+    async def _flush_later(self) -> None:
+        """Ждет окончания серии изменений (но не дольше FLUSH_MAX_DELAY) и пишет ее."""
+        while self._dirty:
+            deadline = min(
+                self._last_change + config.FLUSH_DELAY,
+                self._dirty_since + config.FLUSH_MAX_DELAY
+            )
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            if not await self.flush():
+                await asyncio.sleep(config.FLUSH_MAX_DELAY)
+
+    async def flush(self) -> bool:
+        """Записывает все накопленные изменения одной операцией в пуле потоков.
+
+        Внутри event loop ``_commit`` не пишет на диск сам: запись выполняется
+        через FLUSH_DELAY после последнего изменения, но не позже FLUSH_MAX_DELAY.
+        """
+        async with self._flush_lock:
+            if not self._dirty:
+                return True
+            loop = asyncio.get_running_loop()
+            entries = self._take_pending()
+            if self.journaled:
+                ok = await loop.run_in_executor(None, self._write_journal, entries)
+                if ok and self._journal_entries >= config.JOURNAL_COMPACT_EVERY:
+                    snapshot = self._snapshot_copy()
+                    ok = await loop.run_in_executor(None, self._compact_snapshot, snapshot)
+            else:
+                snapshot = self._snapshot_copy()
+                ok = await loop.run_in_executor(None, self._write_snapshot, snapshot)
+            if not ok:
+                self._restore_pending(entries)
+            return ok
+
+    def _snapshot_copy(self) -> List[list]:
+        """Копия данных для записи снимка вне event loop."""
+        return [record.to_row(uid) for uid, record in self._data.items()]
+
+    @staticmethod
+    def _encode_snapshot(rows: List[list]) -> bytes:
+        """Снимок в формате SNAPSHOT_FORMAT."""
+        if config.SNAPSHOT_FORMAT == "binary":
+            return _encode_binary(rows)
+        if config.SNAPSHOT_FORMAT == "compact":
+            return json.dumps(
+                {"version": SCHEMA_VERSION, "rows": rows}, ensure_ascii=False, separators=(",", ":")
+            ).encode("utf-8")
+        return json.dumps({
+            "version": SCHEMA_VERSION,
+            "questions": {str(row[0]): dict(zip(QuestionRecord.__slots__, row[1:])) for row in rows}
+        }, ensure_ascii=False, indent=2).encode("utf-8")
+
+    def _write_journal(self, entries: List[Dict[str, Any]]) -> bool:
+        """Дописывает пачку записей в журнал."""
+        if not entries:
+            return True
+        started = time.perf_counter()
+        try:
+            if self._journal is None:
+                self._journal = open(self.journal_path, "a", encoding="utf-8")
+            self._journal.write("".join(
+                json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+                for entry in entries
+            ))
+            self._journal.flush()
+            if config.JOURNAL_FSYNC:
+                os.fsync(self._journal.fileno())
+        except Exception as e:
+            logging.error(f"Ошибка записи в журнал: {e}")
+            return False
+        JOURNAL_WRITE_SECONDS.observe(time.perf_counter() - started)
+        self._journal_entries += len(entries)
+        return True
+
+    def compact(self) -> bool:
+        """Сохраняет полный снимок и очищает журнал."""
+        return self._compact_snapshot(self._snapshot_copy())
+
+    def _compact_snapshot(self, rows: List[list]) -> bool:
+        """Сохраняет переданный снимок и очищает журнал."""
+        if not self._write_snapshot(rows):
+            return False
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        try:
+            open(self.journal_path, "w", encoding="utf-8").close()
+        except Exception as e:
+            logging.error(f"Ошибка очистки журнала: {e}")
+            return False
+        self._journal_entries = 0
+        return True
+
     def save(self) -> bool:
-        """Сохраняет данные в файл."""
+        """Сохраняет данные в файл (атомарно, через временный файл)."""
+        return self._write_snapshot(self._snapshot_copy())
+
+    def _write_snapshot(self, rows: List[list]) -> bool:
+        """Атомарно записывает снимок через временный файл."""
+        tmp_path = f"{self.file_path}.tmp"
+        started = time.perf_counter()
         try:
-            with open(self.file_path, "w", encoding="utf-8") as f:
-                json.dump(self._data, f, ensure_ascii=False, indent=2)
+            payload = self._encode_snapshot(rows)
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            os.replace(tmp_path, self.file_path)
+            SAVE_SECONDS.observe(time.perf_counter() - started)
+            SNAPSHOT_BYTES.set(size)
             return True
         except Exception as e:
             logging.error(f"Ошибка сохранения вопросов: {e}")
             return False
-    
-    def add_question(self, user_id: int, question: str, username: str = None, 
-                     full_name: str = None) -> bool:
+
+    def close(self) -> None:
+        """Дописывает изменения, сбрасывает журнал в снимок и закрывает файлы."""
+        if self.read_only:
+            return
+        if self._dirty:
+            self._flush_sync()
+        # Недогруженную базу (остановка во время загрузки) не сохраняем: журнал остается
+        if self.loaded and self.journaled and self._journal_entries:
+            self.compact()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def add_question(self, user_id: int, question: str, username: str = None,
+                     full_name: str = None, operator_id: Optional[int] = None) -> bool:
         """Добавляет новый вопрос."""
-        user_id_str = str(user_id)
-        self._data[user_id_str] = {
-            "question": question,
-            "username": username,
-            "full_name": full_name,
-            "created_at": datetime.now().isoformat(),
-            "admin_ready_to_reply": False,
-            "answered": False
-        }
-        return self.save()
-    
+        record = QuestionRecord(question, username, full_name, time.time(), operator_id=operator_id)
+        return self._commit({"op": "put", "uid": str(user_id), "data": record.to_json()})
+
     def get_question(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Получает вопрос пользователя."""
-        user_id_str = str(user_id)
-        return self._data.get(user_id_str)
-    
-    def set_admin_ready(self, user_id: int) -> bool:
-        """Помечает, что админ готов ответить."""
-        user_id_str = str(user_id)
-        if user_id_str in self._data:
-            if isinstance(self._data[user_id_str], dict):
-                self._data[user_id_str]["admin_ready_to_reply"] = True
-            else:
-                # Миграция старого формата
-                self._data[user_id_str] = {
-                    "question": self._data[user_id_str],
-                    "admin_ready_to_reply": True,
-                    "created_at": datetime.now().isoformat(),
-                    "answered": False
-                }
-            return self.save()
-        return False
-    
+        record = self._data.get(int(user_id))
+        return record.to_dict() if record is not None else None
+
+    def append_question(self, user_id: int, text: str) -> bool:
+        """Дописывает текст к вопросу пользователя (не длиннее MAX_QUESTION_LENGTH)."""
+        record = self._data.get(int(user_id))
+        if record is None:
+            return False
+        question = f"{record.question}\n{text}"[:config.MAX_QUESTION_LENGTH]
+        # В журнал пишем итоговый текст, чтобы повторное проигрывание не дублировало его
+        return self._commit({
+            "op": "update", "uid": str(user_id),
+            "fields": {"question": question}
+        })
+
+    def set_admin_ready(self, user_id: int, operator_id: Optional[int] = None) -> bool:
+        """Помечает, что оператор (если указан - он же забирает вопрос себе) готов ответить.
+
+        Пометка с предыдущего вопроса этого оператора снимается: его следующее
+        сообщение - ответ на вопрос, выбранный последним.
+        """
+        record = self._data.get(int(user_id))
+        if record is None:
+            return False
+        owner = operator_id or self._operator_of(record)
+        for uid in list(self._ready.get(owner, ())):
+            if uid != int(user_id):
+                self._commit({"op": "update", "uid": str(uid), "fields": {"admin_ready_to_reply": False}})
+        fields: Dict[str, Any] = {"admin_ready_to_reply": True}
+        if operator_id is not None:
+            fields["operator_id"] = operator_id
+        return self._commit({"op": "update", "uid": str(user_id), "fields": fields})
+
+    def clear_admin_ready(self, user_id: int) -> bool:
+        """Снимает готовность оператора ответить (вопрос снова ждет ответа)."""
+        record = self._data.get(int(user_id))
+        if record is None or not record.admin_ready_to_reply:
+            return False
+        return self._commit({
+            "op": "update", "uid": str(user_id),
+            "fields": {"admin_ready_to_reply": False}
+        })
+
     def mark_answered(self, user_id: int) -> bool:
         """Помечает вопрос как отвеченный."""
-        user_id_str = str(user_id)
-        if user_id_str in self._data:
-            if isinstance(self._data[user_id_str], dict):
-                self._data[user_id_str]["answered"] = True
-            return self.save()
-        return False
-    
+        if int(user_id) not in self._data:
+            return False
+        return self._commit({
+            "op": "update", "uid": str(user_id),
+            "fields": {"answered": True}
+        })
+
     def delete_question(self, user_id: int) -> bool:
         """Удаляет вопрос."""
-        user_id_str = str(user_id)
-        if user_id_str in self._data:
-            del self._data[user_id_str]
-            return self.save()
+        if int(user_id) in self._data:
+            return self._commit({"op": "delete", "uid": str(user_id)})
         return False
-    
-    def get_pending_questions(self) -> Dict[str, Dict[str, Any]]:
-        """Возвращает все неотвеченные вопросы."""
-        return {
-            uid: data for uid, data in self._data.items()
-            if isinstance(data, dict) and not data.get("answered", False)
-        }
-    
-    def get_ready_to_reply(self) -> Optional[tuple[int, Dict[str, Any]]]:
-        """Возвращает первый вопрос, на который админ готов ответить."""
-        for uid, data in self._data.items():
-            if isinstance(data, dict) and data.get("admin_ready_to_reply") and not data.get("answered"):
-                return int(uid), data
-        return None
-    
+
+    def get_pending_questions(self, limit: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Возвращает неотвеченные вопросы (самые старые первыми)."""
+        keys = itertools.islice(self._pending_index, limit)
+        return {str(uid): self._data[uid].to_dict() for _, uid in keys}
+
+    def get_pending_page(self, limit: int, after: Optional[Tuple[str, int]] = None,
+                         before: Optional[Tuple[str, int]] = None, created_before: Optional[str] = None,
+                         with_username: bool = False) -> List[Tuple[int, Dict[str, Any]]]:
+        """Возвращает страницу неотвеченных вопросов по курсору, самые старые первыми."""
+        index = self._pending_index
+        # Граница фильтра по времени: ключи (время,) меньше любых (время, uid)
+        end = (_to_epoch(created_before) or 0.0,) if created_before else None
+        if before is not None:
+            bound = self._cursor_key(before)
+            keys = index.before(min(bound, end) if end is not None else bound)
+        else:
+            keys = index.after(self._cursor_key(after)) if after is not None else iter(index)
+            if end is not None:
+                keys = itertools.takewhile(lambda key: key < end, keys)
+        page = []
+        for _, uid in keys:
+            if len(page) >= limit:
+                break
+            record = self._data[uid]
+            if with_username and not (record.username or "").startswith("@"):
+                continue
+            page.append((uid, record.to_dict()))
+        if before is not None:
+            page.reverse()
+        return page
+
+    def _cursor_key(self, cursor: Tuple[str, int]) -> Tuple[float, int]:
+        """Ключ очереди для курсора ``(created_at, user_id)`` страницы."""
+        # Строка ISO не всегда переводится обратно в то же число (доли
+        # микросекунды, переход на зимнее время): берем ключ самого вопроса
+        created_at, uid = cursor
+        key = self._pending_keys.get(uid)
+        if key is not None and (_to_iso(self._data[uid].created_at) or "") == created_at:
+            return key
+        return _to_epoch(created_at) or 0.0, uid
+
+    def get_ready_to_reply(self, operator_id: Optional[int] = None) -> Optional[tuple[int, Dict[str, Any]]]:
+        """Возвращает вопрос, на который готов ответить оператор."""
+        queue = self._ready.get(operator_id or config.default_operator_id)
+        if not queue:
+            return None
+        uid = next(iter(queue))
+        return uid, self._data[uid].to_dict()
+
+    def get_open_assignments(self) -> Dict[int, Optional[int]]:
+        """Возвращает операторов неотвеченных вопросов: ID пользователя -> ID оператора."""
+        return {uid: self._data[uid].operator_id for uid in self._pending_keys}
+
     def get_statistics(self) -> Dict[str, int]:
         """Возвращает статистику по вопросам."""
         total = len(self._data)
-        pending = sum(1 for d in self._data.values() 
-                     if isinstance(d, dict) and not d.get("answered", False))
+        pending = len(self._pending_keys)
         answered = total - pending
         return {
             "total": total,
             "pending": pending,
             "answered": answered
         }
-    
+
     def get_all_questions(self) -> Dict[str, Any]:
         """Возвращает все вопросы (для админа)."""
-        return self._data.copy()
+        return {str(uid): record.to_dict() for uid, record in self._data.items()}
+
+
+def create_database(backend: str = None, lazy: bool = False) -> QuestionsStorage:
+    """Создает хранилище, выбранное в конфигурации.
 
+    С ``lazy=True`` JSON хранилище загружается только в ``open``.
+    """
+    backend = backend or config.STORAGE_BACKEND
+    if backend == "sqlite":
+        from sqlite_database import SQLiteQuestionsDatabase
+        return SQLiteQuestionsDatabase()
+    if backend == "json":
+        return QuestionsDatabase(lazy=lazy)
+    raise ValueError(f"Неизвестное хранилище: {backend}")
 
-# Глобальный экземпляр базы данных
-db = QuestionsDatabase()
 
+# Глобальный экземпляр базы данных: импорт модулей бота не читает файл,
+# данные загружает ``await db.open()`` при запуске
+db: QuestionsStorage = create_database(lazy=True)
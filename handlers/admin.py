@@ -1,9 +1,29 @@
 """Обработчики команд администратора."""
+import asyncio
+import os
+import re
+import tempfile
+from datetime import date, datetime, timedelta
+from typing import Optional
 from aiogram import types, F
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
+from aiogram.types import InlineKeyboardMarkup
 from config import config
 from database import db
-from utils.keyboards import get_user_menu
+from services.archive import archive
+from services.broadcast import broadcaster
+from services.operators import operators
+from services.search import search_index
+from services.subscribers import subscribers
+from utils.helpers import format_age, format_pending_page
+from utils.keyboards import get_pending_keyboard, get_user_menu
+
+# Telegram принимает от ботов файлы до 50 МБ
+MAX_EXPORT_BYTES = 50 * 1024 * 1024
+
+# Фильтр /questions по возрасту: 30m, 2h, 1d (или 30м, 2ч, 1д)
+AGE_RE = re.compile(r"(\d+)([mhdмчд])")
+AGE_UNITS = {"m": 60, "м": 60, "h": 3600, "ч": 3600, "d": 86400, "д": 86400}
 
 
 async def cmd_stats(message: types.Message) -> None:
@@ -19,40 +39,230 @@ async def cmd_stats(message: types.Message) -> None:
         f"⏳ Ожидают ответа: {stats['pending']}\n"
         f"✅ Отвечено: {stats['answered']}"
     )
+    if len(config.OPERATOR_IDS) > 1:
+        stats_text += "\n\n👥 **Открытые вопросы операторов:**\n" + "\n".join(
+            f"• {operator_id}: {load}" for operator_id, load in operators.stats().items()
+        )
     
     await message.answer(stats_text, parse_mode="Markdown")
 
 
-async def cmd_questions(message: types.Message) -> None:
-    """Обработчик команды /questions - показывает все неотвеченные вопросы."""
+def parse_questions_filters(args: str) -> Optional[tuple[int, bool]]:
+    """Разбирает фильтры /questions: возраст вопроса в секундах и наличие @username.
+
+    Понимает ``старше 2ч``, ``30m``, ``1д`` и ``@``; None - если аргументы не разобраны.
+    """
+    older_than = 0
+    with_username = False
+    for arg in (args or "").lower().split():
+        match = AGE_RE.fullmatch(arg)
+        if arg == "@":
+            with_username = True
+        elif match:
+            older_than = int(match.group(1)) * AGE_UNITS[match.group(2)]
+        elif arg != "старше":
+            return None
+    return older_than, with_username
+
+
+def render_pending_page(older_than: int, with_username: bool,
+                        after: Optional[tuple[str, int]] = None,
+                        before: Optional[tuple[str, int]] = None) -> Optional[tuple[str, InlineKeyboardMarkup]]:
+    """Готовит страницу /questions по курсору (None, если вопросов нет).
+
+    Страница читается из упорядоченной очереди хранилища с позиции курсора,
+    поэтому ее стоимость не зависит от того, сколько вопросов ждут ответа.
+    """
+    page_size = config.QUESTIONS_PAGE_SIZE
+    created_before = (
+        (datetime.now() - timedelta(seconds=older_than)).isoformat() if older_than else None
+    )
+    # На один вопрос больше: есть ли следующая страница в том же направлении
+    items = db.get_pending_page(page_size + 1, after=after, before=before,
+                                created_before=created_before, with_username=with_username)
+    if not items and (after or before):
+        # Вопросы за курсором уже закрыты: показываем начало очереди
+        return render_pending_page(older_than, with_username)
+    if not items:
+        return None
+    more = len(items) > page_size
+    items = items[-page_size:] if before is not None else items[:page_size]
+    first = (items[0][1].get("created_at") or "", items[0][0])
+    last = (items[-1][1].get("created_at") or "", items[-1][0])
+    # В обратном направлении - один вопрос, чтобы не читать лишнего
+    if before is not None:
+        has_prev = more
+        has_next = bool(db.get_pending_page(1, after=last, created_before=created_before,
+                                            with_username=with_username))
+    else:
+        has_next = more
+        has_prev = after is not None and bool(db.get_pending_page(
+            1, before=first, created_before=created_before, with_username=with_username
+        ))
+    filters_text = "".join((
+        f" старше {format_age(older_than)}" if older_than else "",
+        " с @username" if with_username else ""
+    ))
+    filters = f"{older_than}{'u' if with_username else ''}"
+    return (
+        format_pending_page(items, filters_text),
+        get_pending_keyboard([user_id for user_id, _ in items], filters,
+                             first if has_prev else None, last if has_next else None)
+    )
+
+
+async def cmd_questions(message: types.Message, command: CommandObject) -> None:
+    """Обработчик команды /questions [старше 2h] [@] - неотвеченные вопросы по страницам."""
     if message.from_user.id != config.ADMIN_ID:
         await message.answer("❌ Эта команда доступна только администратору.")
         return
     
-    pending = db.get_pending_questions()
+    filters = parse_questions_filters(command.args)
+    if filters is None:
+        await message.answer("📋 Формат: /questions [старше 30m|2h|1d] [@ - только с username]")
+        return
     
-    if not pending:
+    rendered = render_pending_page(*filters)
+    if rendered is None:
         await message.answer("✅ Нет неотвеченных вопросов!")
         return
     
-    questions_text = "📋 **Неотвеченные вопросы:**\n\n"
+    text, markup = rendered
+    await message.answer(text, reply_markup=markup)
+
+
+async def questions_page_callback(callback: types.CallbackQuery) -> None:
+    """Обработчик перехода по страницам /questions."""
+    if callback.from_user.id != config.ADMIN_ID:
+        await callback.answer("❌ Нет доступа", show_alert=True)
+        return
+    
+    try:
+        # qp_<n|p>_<возраст>[u]_<created_at>_<user_id>
+        _, direction, filters, created_at, user_id_str = callback.data.split("_", 4)
+        cursor = (created_at, int(user_id_str))
+        older_than = int(filters.rstrip("u"))
+    except ValueError:
+        await callback.answer("❌ Ошибка обработки", show_alert=True)
+        return
+    
+    rendered = render_pending_page(
+        older_than, filters.endswith("u"),
+        after=cursor if direction == "n" else None,
+        before=cursor if direction == "p" else None
+    )
+    if rendered is None:
+        await callback.message.edit_text("✅ Нет неотвеченных вопросов!")
+        await callback.answer()
+        return
+    
+    text, markup = rendered
+    if text != callback.message.text or markup != callback.message.reply_markup:
+        await callback.message.edit_text(text, reply_markup=markup)
+    await callback.answer()
+
+
+async def cmd_export(message: types.Message, command: CommandObject) -> None:
+    """Обработчик команды /export [с YYYY-MM-DD] [по YYYY-MM-DD] - выгрузка архива в CSV."""
+    if message.from_user.id != config.ADMIN_ID:
+        await message.answer("❌ Эта команда доступна только администратору.")
+        return
+    
+    try:
+        dates = [date.fromisoformat(arg) for arg in (command.args or "").split()[:2]]
+    except ValueError:
+        await message.answer("❌ Формат: /export [2024-01-01] [2024-01-31]")
+        return
+    since = dates[0] if dates else None
+    until = dates[1] if len(dates) > 1 else None
+    
+    fd, path = tempfile.mkstemp(prefix="export-", suffix=".csv")
+    os.close(fd)
+    try:
+        # Архив читается по сегментам и пишется в файл построчно, в отдельном потоке
+        count = await asyncio.get_running_loop().run_in_executor(
+            None, archive.export_csv, path, since, until
+        )
+        if not count:
+            await message.answer("📭 В архиве нет вопросов за этот период.")
+            return
+        if os.path.getsize(path) > MAX_EXPORT_BYTES:
+            await message.answer("❌ Выгрузка слишком большая, укажите период короче.")
+            return
+        period = "-".join(day.isoformat() for day in dates) or "all"
+        await message.answer_document(
+            types.FSInputFile(path, filename=f"questions-{period}.csv"),
+            caption=f"📦 Вопросов в выгрузке: {count}"
+        )
+    finally:
+        os.remove(path)
+
+
+async def cmd_search(message: types.Message, command: CommandObject) -> None:
+    """Обработчик команды /search <слова> - поиск по вопросам и ответам."""
+    if message.from_user.id != config.ADMIN_ID:
+        await message.answer("❌ Эта команда доступна только администратору.")
+        return
+    
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer("🔎 Формат: /search возврат билетов")
+        return
+    
+    rendered = search_index.start(query)
+    if rendered is None:
+        await message.answer(f"🔎 По запросу «{query}» ничего не найдено.")
+        return
+    
+    text, markup = rendered
+    await message.answer(text, reply_markup=markup)
+
+
+async def search_page_callback(callback: types.CallbackQuery) -> None:
+    """Обработчик листания страниц результатов поиска."""
+    if callback.from_user.id != config.ADMIN_ID:
+        await callback.answer("❌ Нет доступа", show_alert=True)
+        return
+    
+    try:
+        _, search_id_str, page_str = callback.data.split("_", 2)
+        rendered = search_index.render(int(search_id_str), int(page_str))
+    except ValueError:
+        await callback.answer("❌ Ошибка обработки", show_alert=True)
+        return
+    
+    if rendered is None:
+        await callback.answer("Результаты устарели, повторите /search", show_alert=True)
+        return
+    
+    text, markup = rendered
+    if text != callback.message.text or markup != callback.message.reply_markup:
+        await callback.message.edit_text(text, reply_markup=markup)
+    await callback.answer()
+
+
+async def cmd_broadcast(message: types.Message, command: CommandObject) -> None:
+    """Обработчик команды /broadcast <текст> - рассылка всем пользователям бота."""
+    if message.from_user.id != config.ADMIN_ID:
+        await message.answer("❌ Эта команда доступна только администратору.")
+        return
     
-    for user_id_str, data in list(pending.items())[:10]:  # Показываем первые 10
-        user_id = int(user_id_str)
-        question = data.get("question", "N/A")
-        username = data.get("username", f"ID{user_id}")
-        created_at = data.get("created_at", "N/A")
-        
-        questions_text += (
-            f"🆔 {user_id} ({username})\n"
-            f"❓ {question[:50]}{'...' if len(question) > 50 else ''}\n"
-            f"📅 {created_at}\n\n"
+    text = (command.args or "").strip()
+    if not text:
+        await message.answer(
+            "📣 Формат: /broadcast <текст объявления>\n"
+            "/broadcast stop - остановить рассылку\n\n"
+            f"👥 Пользователей в рассылке: {len(subscribers)}"
         )
+        return
     
-    if len(pending) > 10:
-        questions_text += f"... и еще {len(pending) - 10} вопросов"
+    if text.lower() == "stop":
+        if not broadcaster.cancel():
+            await message.answer("📣 Рассылка не идет.")
+        return
     
-    await message.answer(questions_text, parse_mode="Markdown")
+    if not broadcaster.start(text, message.chat.id):
+        await message.answer("⏳ Уже идет рассылка. Остановить: /broadcast stop")
 
 
 async def stats_button_handler(message: types.Message) -> None:
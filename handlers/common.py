@@ -1,23 +1,27 @@
 """Обработчики общих команд."""
 from aiogram import types, F
 from aiogram.filters import Command
+from aiogram.methods import SendMessage
 from config import config
+from services.schedule import schedule
+from services.subscribers import subscribers
 from utils.keyboards import get_user_menu
 from utils.helpers import format_user_info
 
 
-async def cmd_start(message: types.Message) -> None:
+async def cmd_start(message: types.Message) -> SendMessage:
     """Обработчик команды /start."""
     is_admin = message.from_user.id == config.ADMIN_ID
+    subscribers.add(message.from_user.id)
     greeting = "🎭 Админка" if is_admin else "🎭 Добро пожаловать в Usupovo Life Hall!"
     
-    await message.answer(
+    return message.answer(
         greeting,
         reply_markup=get_user_menu(is_admin=is_admin)
     )
 
 
-async def cmd_help(message: types.Message) -> None:
+async def cmd_help(message: types.Message) -> SendMessage:
     """Обработчик команды /help."""
     help_text = (
         "📖 **Доступные команды:**\n\n"
@@ -29,15 +33,15 @@ async def cmd_help(message: types.Message) -> None:
         "💡 Используйте кнопки меню для навигации."
     )
     
-    await message.answer(help_text, parse_mode="Markdown")
+    return message.answer(help_text, parse_mode="Markdown")
 
 
-async def info_handler(message: types.Message) -> None:
-    """Обработчик кнопок 'Расписание' и 'Купить билеты'."""
+async def info_handler(message: types.Message) -> SendMessage:
+    """Обработчик кнопок 'Расписание' и 'Купить билеты' (готовый текст из кэша)."""
     if "Расписание" in message.text:
-        text = f"📆 Расписание мероприятий:\n{config.WEBSITE_URL}"
+        text = schedule.schedule_text()
     else:
-        text = f"🎟️ Купить билеты:\n{config.WEBSITE_URL}"
+        text = schedule.tickets_text()
     
-    await message.answer(text)
+    return message.answer(text, disable_web_page_preview=True)
 
@@ -1,93 +1,157 @@
 """Обработчики системы поддержки."""
 import logging
+from datetime import datetime
+from typing import Optional
 from aiogram import types, F
+from aiogram.exceptions import TelegramForbiddenError
 from aiogram.filters import Command
+from aiogram.methods import SendMessage
 from config import config
 from database import db
-from utils.keyboards import get_admin_inline_keyboard
-from utils.helpers import format_user_info, format_question_message, format_answer_message
+from services.archive import (
+    archive, RESOLUTION_ANSWERED, RESOLUTION_AUTO, RESOLUTION_CLOSED, RESOLUTION_UNREACHABLE
+)
+from services.digest import notifier
+from services.operators import operators
+from services.search import search_index
+from services.outbound import outbound, PRIORITY_USER
+from services.subscribers import subscribers
+from services.suggestions import suggestions
+from services.timers import timers
+from utils.keyboards import MENU_BUTTONS, is_question_list, remove_question_buttons
+from utils.helpers import format_user_info, format_answer_message
 
 
-async def support_handler(message: types.Message) -> None:
+def resolve_question(user_id: int, question_data: dict, resolution: str,
+                     operator_id: Optional[int] = None, answer: Optional[str] = None) -> None:
+    """Переносит закрытый вопрос в архив и убирает его из рабочей базы."""
+    record = archive.add(user_id, question_data, resolution, operator_id=operator_id, answer=answer)
+    search_index.add_archived(record)
+    if resolution == RESOLUTION_ANSWERED and config.SUGGESTIONS_ENABLED:
+        suggestions.add(record["question"] or "", answer)
+    db.delete_question(user_id)
+    operators.release(user_id)
+    timers.forget(user_id)
+
+
+async def deliver_answer(target_id: int, question_data: dict, answer: str, operator_id: int) -> None:
+    """Отправляет ответ автору вопроса и переносит вопрос в архив.
+
+    Если пользователь заблокировал бота, вопрос закрывается как недоставленный,
+    а TelegramForbiddenError пробрасывается дальше. При других ошибках вопрос
+    остается в базе.
+    """
+    try:
+        await outbound.send_message(
+            target_id,
+            format_answer_message(answer),
+            priority=PRIORITY_USER,
+            parse_mode="Markdown"
+        )
+    except TelegramForbiddenError:
+        subscribers.remove(target_id)
+        resolve_question(target_id, question_data, RESOLUTION_UNREACHABLE, operator_id=operator_id, answer=answer)
+        raise
+    
+    # Переносим в архив: запись хранит resolution=answered, отдельная отметка в базе не нужна
+    resolve_question(target_id, question_data, RESOLUTION_ANSWERED, operator_id=operator_id, answer=answer)
+
+
+async def support_handler(message: types.Message) -> Optional[SendMessage]:
     """Обработчик кнопки 'Поддержка'."""
-    if message.from_user.id != config.ADMIN_ID:
-        await message.answer("💬 Напишите ваш вопрос, и мы обязательно ответим!")
+    if not config.is_staff(message.from_user.id):
+        return message.answer("💬 Напишите ваш вопрос, и мы обязательно ответим!")
 
 
-async def handle_user_question(message: types.Message) -> None:
+async def handle_user_question(message: types.Message) -> Optional[SendMessage]:
     """Обработчик вопроса от пользователя."""
     user = message.from_user
     
     # Пропускаем команды и кнопки меню
-    if message.text in ["📅 Расписание", "🎫 Купить билеты", "📞 Поддержка", "📊 Статистика"]:
-        return
+    if message.text in MENU_BUTTONS:
+        return None
     
-    # Сохраняем вопрос
+    subscribers.add(user.id)
     username, full_name = format_user_info(user)
+    suggested = suggestions.suggest(message.text) if config.SUGGESTIONS_ENABLED else []
+    
+    # Уверенная подсказка: бот отвечает сам, если у пользователя нет открытого вопроса
+    auto_answer = None
+    if suggested and suggestions.auto_reply and db.get_question(user.id) is None:
+        auto_answer = suggestions.auto_answer(user.id, suggested)
+    if auto_answer is not None:
+        question_data = {
+            "question": message.text,
+            "username": username,
+            "full_name": full_name,
+            "created_at": datetime.now().isoformat()
+        }
+        resolve_question(user.id, question_data, RESOLUTION_AUTO, answer=auto_answer)
+        return message.answer(
+            format_answer_message(auto_answer)
+            + "\n\nЕсли ответ не помог, напишите еще раз - вопрос получит оператор.",
+            parse_mode="Markdown"
+        )
+    
+    # Сохраняем вопрос и назначаем его оператору
+    operator_id = operators.assign(user.id)
     db.add_question(
         user_id=user.id,
         question=message.text,
         username=username,
-        full_name=full_name
+        full_name=full_name,
+        operator_id=operator_id
     )
+    question_data = db.get_question(user.id)
+    search_index.add_open(user.id, question_data)
+    timers.track(user.id, question_data.get("created_at"))
     
-    await message.answer("✅ Ваш вопрос принят! Ожидайте ответа от нашей поддержки.")
-    
-    # Отправляем уведомление админу
-    question_msg = format_question_message(
+    # Уведомляем оператора (отдельным сообщением или в сводке при наплыве)
+    notifier.notify(
         user_id=user.id,
         question=message.text,
         username=username,
-        full_name=full_name
+        full_name=full_name,
+        operator_id=operator_id,
+        suggestions=suggested
     )
     
-    await message.bot.send_message(
-        config.ADMIN_ID,
-        question_msg,
-        reply_markup=get_admin_inline_keyboard(user.id)
-    )
+    return message.answer("✅ Ваш вопрос принят! Ожидайте ответа от нашей поддержки.")
 
 
 async def handle_admin_reply(message: types.Message) -> None:
-    """Обработчик ответа админа на вопрос."""
+    """Обработчик ответа оператора на вопрос."""
     # Пропускаем команды и кнопки меню
-    if message.text in ["📅 Расписание", "🎫 Купить билеты", "📞 Поддержка", "📊 Статистика"]:
+    if message.text in MENU_BUTTONS:
         return
     
-    # Проверяем, есть ли вопрос, на который админ готов ответить
-    ready = db.get_ready_to_reply()
+    # Проверяем, есть ли вопрос, на который этот оператор готов ответить
+    ready = db.get_ready_to_reply(message.from_user.id)
     
     if not ready:
-        # Если админ пишет что-то, но нет готового вопроса, игнорируем
+        # Если оператор пишет что-то, но нет готового вопроса, игнорируем
         return
     
     target_id, question_data = ready
     
     try:
-        # Отправляем ответ пользователю
-        answer_text = format_answer_message(message.text)
-        await message.bot.send_message(
-            target_id,
-            answer_text,
-            parse_mode="Markdown"
-        )
-        
-        # Помечаем как отвеченный и удаляем
-        db.mark_answered(target_id)
-        db.delete_question(target_id)
-        
+        await deliver_answer(target_id, question_data, message.text, message.from_user.id)
         await message.answer(f"✅ Ответ отправлен пользователю (ID: {target_id})!")
         
+    except TelegramForbiddenError as e:
+        # Пользователь заблокировал бота - ответ доставить невозможно
+        await message.answer(f"❌ Пользователь недоступен: {e}")
+        
     except Exception as e:
+        # Вопрос остается в базе: следующее сообщение админа будет новой попыткой
         logger = logging.getLogger(__name__)
         logger.error(f"Ошибка отправки ответа: {e}", exc_info=True)
-        await message.answer(f"❌ Ошибка отправки: {e}")
-        db.delete_question(target_id)
+        await message.answer(f"❌ Ошибка отправки: {e}\nВопрос сохранен, можно отправить ответ еще раз.")
 
 
 async def answer_callback(callback: types.CallbackQuery) -> None:
     """Обработчик callback для ответа на вопрос."""
-    if callback.from_user.id != config.ADMIN_ID:
+    if not config.is_staff(callback.from_user.id):
         await callback.answer("❌ Нет доступа", show_alert=True)
         return
     
@@ -99,15 +163,26 @@ async def answer_callback(callback: types.CallbackQuery) -> None:
         return
     
     question_data = db.get_question(target_id)
+    # В сводке и в /questions на сообщении несколько вопросов: убираем только кнопки этого
+    in_digest = is_question_list(callback.message.reply_markup)
     
     if not question_data:
+        operators.release(target_id)
+        if in_digest:
+            await callback.message.edit_reply_markup(
+                reply_markup=remove_question_buttons(callback.message.reply_markup, target_id)
+            )
+            await callback.answer("❌ Вопрос не найден или уже удален.", show_alert=True)
+            return
         await callback.message.edit_text("❌ Вопрос не найден или уже удален.")
         await callback.answer()
         return
     
     if action == "ans":
-        # Помечаем, что админ готов ответить
-        db.set_admin_ready(target_id)
+        # Оператор забирает вопрос себе: следующее его сообщение - ответ на него
+        db.set_admin_ready(target_id, callback.from_user.id)
+        operators.transfer(target_id, callback.from_user.id)
+        timers.ready(target_id)
         await callback.message.answer(
             f"✏️ Введите ответ для пользователя (ID: {target_id}):\n\n"
             f"Вопрос: {question_data.get('question', 'N/A')}"
@@ -116,7 +191,77 @@ async def answer_callback(callback: types.CallbackQuery) -> None:
     
     elif action == "close":
         # Закрываем вопрос без ответа
-        db.delete_question(target_id)
-        await callback.message.edit_text("❌ Вопрос закрыт без ответа.")
+        resolve_question(
+            target_id, question_data, RESOLUTION_CLOSED, operator_id=callback.from_user.id
+        )
+        if in_digest:
+            await callback.message.edit_reply_markup(
+                reply_markup=remove_question_buttons(callback.message.reply_markup, target_id)
+            )
+        else:
+            await callback.message.edit_text("❌ Вопрос закрыт без ответа.")
         await callback.answer("Вопрос закрыт")
 
+
+async def digest_page_callback(callback: types.CallbackQuery) -> None:
+    """Обработчик листания страниц сводки вопросов."""
+    if not config.is_staff(callback.from_user.id):
+        await callback.answer("❌ Нет доступа", show_alert=True)
+        return
+    
+    try:
+        _, digest_id_str, page_str = callback.data.split("_", 2)
+        rendered = notifier.render(int(digest_id_str), int(page_str))
+    except ValueError:
+        await callback.answer("❌ Ошибка обработки", show_alert=True)
+        return
+    
+    if rendered is None:
+        await callback.answer("Сводка устарела, используйте /questions", show_alert=True)
+        return
+    
+    text, markup = rendered
+    if text != callback.message.text or markup != callback.message.reply_markup:
+        await callback.message.edit_text(text, reply_markup=markup)
+    await callback.answer()
+
+
+
+async def suggestion_callback(callback: types.CallbackQuery) -> None:
+    """Обработчик кнопки отправки подсказанного ответа."""
+    if not config.is_staff(callback.from_user.id):
+        await callback.answer("❌ Нет доступа", show_alert=True)
+        return
+    
+    try:
+        _, user_id_str, key = callback.data.split("_", 2)
+        target_id = int(user_id_str)
+    except ValueError:
+        await callback.answer("❌ Ошибка обработки", show_alert=True)
+        return
+    
+    question_data = db.get_question(target_id)
+    if not question_data:
+        await callback.message.edit_reply_markup(reply_markup=None)
+        await callback.answer("❌ Вопрос не найден или уже закрыт.", show_alert=True)
+        return
+    
+    answer = suggestions.answer(key)
+    if answer is None:
+        await callback.answer("Подсказка устарела, ответьте вручную", show_alert=True)
+        return
+    
+    try:
+        await deliver_answer(target_id, question_data, answer, callback.from_user.id)
+    except TelegramForbiddenError as e:
+        await callback.message.edit_reply_markup(reply_markup=None)
+        await callback.answer(f"❌ Пользователь недоступен: {e}", show_alert=True)
+        return
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Ошибка отправки подсказки: {e}", exc_info=True)
+        await callback.answer(f"❌ Ошибка отправки: {e}", show_alert=True)
+        return
+    
+    short = answer[:300] + ("..." if len(answer) > 300 else "")
+    await callback.message.edit_text(f"✅ Пользователю {target_id} отправлен ответ-подсказка:\n\n{short}")
+    await callback.answer("Ответ отправлен")
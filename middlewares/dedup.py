@@ -0,0 +1,172 @@
+"""Отбрасывание повторно доставленных обновлений по update_id."""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from config import config
+
+
+logger = logging.getLogger(__name__)
+
+
+class SharedUpdateLog:
+    """Общий для нескольких процессов бота журнал обработанных update_id в SQLite.
+
+    Повторная доставка может прийти в другой процесс, поэтому при
+    WORKERS > 1 обновление обрабатывает тот процесс, который первым
+    записал его update_id в таблицу.
+    """
+
+    def __init__(self, file_path: str, ttl: float):
+        self.ttl = ttl
+        self._conn = sqlite3.connect(file_path, isolation_level=None, timeout=config.SQLITE_BUSY_TIMEOUT)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS processed_updates ("
+            "update_id INTEGER PRIMARY KEY, seen_at REAL NOT NULL)"
+        )
+
+    def claim(self, update_id: int) -> bool:
+        """Записывает update_id; False, если его уже записал другой процесс."""
+        return self._conn.execute(
+            "INSERT OR IGNORE INTO processed_updates (update_id, seen_at) VALUES (?, ?)",
+            (update_id, time.time())
+        ).rowcount > 0
+
+    def prune(self) -> None:
+        """Удаляет записи старше ttl."""
+        self._conn.execute("DELETE FROM processed_updates WHERE seen_at < ?", (time.time() - self.ttl,))
+
+
+class UpdateDeduplicator:
+    """Ограниченный по размеру и времени набор недавно обработанных update_id.
+
+    Набор периодически сохраняется в файл, чтобы после перезапуска
+    отбрасывать повторную доставку уже обработанных обновлений. Сохраняются
+    именно номера обработанных обновлений, а не максимальный номер:
+    обновление, отклоненное раньше (503 при перегрузке или прогреве), после
+    перезапуска будет обработано. Восстановленные номера, как и остальные,
+    забываются через ``ttl`` секунд после того, как были получены.
+
+    С ``shared`` обновления, не найденные в памяти, дополнительно
+    проверяются по общему журналу процессов (файл состояния тогда не нужен).
+    """
+
+    def __init__(self, max_size: int = None, ttl: float = None, state_file: str = None,
+                 shared: Optional[SharedUpdateLog] = None):
+        self.max_size = max_size or config.DEDUP_MAX_SIZE
+        self.ttl = ttl or config.DEDUP_TTL
+        self.state_file = config.DEDUP_STATE_FILE if state_file is None else state_file
+        self.shared = shared
+        self._seen: "OrderedDict[int, float]" = OrderedDict()
+        # Новые update_id с последнего сохранения
+        self.unsaved = 0
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self) -> None:
+        """Восстанавливает обработанные update_id из файла."""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать {self.state_file}: {e}")
+            return
+        # Файл старого формата (только максимальный номер) не используется
+        age = time.time() - state.get("saved_at", 0)
+        if age > self.ttl:
+            return
+        seen_at = time.monotonic() - age
+        for update_id in state.get("seen", [])[-self.max_size:]:
+            self._seen[update_id] = seen_at
+
+    def state(self) -> Dict[str, Any]:
+        """Состояние для сохранения; снимается в потоке event loop."""
+        self.unsaved = 0
+        return {"seen": list(self._seen), "saved_at": time.time()}
+
+    def save(self, state: Optional[Dict[str, Any]] = None) -> None:
+        """Сохраняет обработанные update_id (атомарно), если появились новые."""
+        if not self.state_file or (state is None and not self.unsaved):
+            return
+        state = state or self.state()
+        tmp_path = f"{self.state_file}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            logger.error(f"Ошибка сохранения {self.state_file}: {e}")
+
+    def seen(self, update_id: int) -> bool:
+        """Проверяет, встречалось ли обновление, и запоминает его."""
+        if update_id in self._seen:
+            self.hits += 1
+            return True
+        now = time.monotonic()
+        self._seen[update_id] = now
+        if self.shared is not None and not self.shared.claim(update_id):
+            self.hits += 1
+            return True
+        while self._seen and (
+            len(self._seen) > self.max_size or next(iter(self._seen.values())) < now - self.ttl
+        ):
+            self._seen.popitem(last=False)
+        self.unsaved += 1
+        self.misses += 1
+        return False
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики кэша."""
+        return {
+            "size": len(self._seen),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+class DedupMiddleware(BaseMiddleware):
+    """Внешний middleware для Update: пропускает каждое update_id один раз."""
+
+    def __init__(self, deduplicator: UpdateDeduplicator):
+        self.deduplicator = deduplicator
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        if self.deduplicator.seen(event.update_id):
+            logger.info(f"Повторное обновление {event.update_id} пропущено")
+            return None
+        if self.deduplicator.unsaved >= config.DEDUP_SAVE_EVERY:
+            if self.deduplicator.shared is not None:
+                self.deduplicator.unsaved = 0
+                self.deduplicator.shared.prune()
+            elif self.deduplicator.state_file:
+                asyncio.get_running_loop().run_in_executor(
+                    None, self.deduplicator.save, self.deduplicator.state()
+                )
+        return await handler(event, data)
+
+
+# Глобальный экземпляр кэша обновлений (при нескольких процессах - с общим журналом)
+if config.WORKERS > 1:
+    deduplicator = UpdateDeduplicator(
+        state_file="", shared=SharedUpdateLog(config.SQLITE_FILE, config.DEDUP_TTL)
+    )
+else:
+    deduplicator = UpdateDeduplicator()
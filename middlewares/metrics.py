@@ -0,0 +1,81 @@
+"""Метрики обработки обновлений."""
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+from services.metrics import Histogram, metrics
+
+
+UPDATES = metrics.counter("bot_updates_total", "Обновления по типу", label="type")
+UPDATE_SECONDS = metrics.histogram("bot_update_seconds", "Полное время обработки обновления")
+HANDLER_SECONDS = metrics.histogram(
+    "bot_handler_seconds", "Время работы обработчика", label="handler"
+)
+API_SECONDS = metrics.histogram("bot_api_request_seconds", "Время запроса к Bot API", label="method")
+API_ERRORS = metrics.counter("bot_api_errors_total", "Ошибки запросов к Bot API по типу", label="error")
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Внешний middleware для Update: число обновлений по типу и время обработки."""
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        UPDATES.labels(event.event_type).inc()
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            UPDATE_SECONDS.observe(time.perf_counter() - started)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Внутренний middleware: гистограмма времени работы по обработчикам."""
+
+    def __init__(self):
+        # Гистограмма на функцию-обработчик, чтобы не искать ее по имени на каждом обновлении
+        self._histograms: Dict[Callable, Histogram] = {}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        callback = data["handler"].callback
+        histogram = self._histograms.get(callback)
+        if histogram is None:
+            histogram = self._histograms[callback] = HANDLER_SECONDS.labels(callback.__name__)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            histogram.observe(time.perf_counter() - started)
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: время и ошибки всех запросов к Bot API."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        histogram = API_SECONDS.labels(method.__api_method__)
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            API_ERRORS.labels(type(e).__name__).inc()
+            raise
+        finally:
+            histogram.observe(time.perf_counter() - started)
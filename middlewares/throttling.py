@@ -0,0 +1,109 @@
+"""Защита системы поддержки от флуда вопросами."""
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import Message
+
+from config import config
+from database import db
+from services.search import search_index
+from utils.keyboards import MENU_BUTTONS
+
+# Сколько пользователей держать в памяти одновременно
+MAX_TRACKED_USERS = 100_000
+
+
+class _UserState:
+    """Состояние лимита пользователя: корзина токенов и флаги отправленных уведомлений."""
+
+    __slots__ = ("tokens", "updated", "limit_notified", "merge_notified")
+
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated = now
+        # Предупреждение о лимите - один раз, пока лимит исчерпан
+        self.limit_notified = False
+        # Уведомление о дописанном сообщении - один раз на вопрос
+        self.merge_notified = False
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Ограничивает частоту вопросов и объединяет сообщения, идущие подряд.
+
+    Работает для обработчиков с флагом ``throttle``. Сообщение, пришедшее
+    в течение QUESTION_MERGE_WINDOW после открытого вопроса пользователя,
+    дописывается к нему без нового уведомления админа. Время вопроса
+    берется из базы, поэтому объединение работает и при нескольких
+    процессах бота. Сверх лимита
+    (корзина токенов на пользователя) сообщения отбрасываются. Память
+    ограничена: записи простаивающих пользователей удаляются.
+    """
+
+    def __init__(self, burst: int = None, period: float = None, merge_window: float = None):
+        self.burst = burst or config.THROTTLE_BURST
+        self.rate = self.burst / (period or config.THROTTLE_PERIOD)
+        self.merge_window = config.QUESTION_MERGE_WINDOW if merge_window is None else merge_window
+        # Через столько секунд простоя состояние пользователя не отличается от нового
+        self.idle_ttl = max(self.merge_window, self.burst / self.rate)
+        self._users: "OrderedDict[int, _UserState]" = OrderedDict()
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any]
+    ) -> Any:
+        if not get_flag(data, "throttle") or not event.from_user or event.text in MENU_BUTTONS:
+            return await handler(event, data)
+
+        now = time.monotonic()
+        state = self._get_state(event.from_user.id, now)
+
+        state.tokens = min(self.burst, state.tokens + (now - state.updated) * self.rate)
+        state.updated = now
+        if state.tokens < 1:
+            if not state.limit_notified:
+                state.limit_notified = True
+                await event.answer("⏳ Слишком много сообщений. Подождите немного, пожалуйста.")
+            return None
+        state.tokens -= 1
+        state.limit_notified = False
+
+        if self._can_merge(event.from_user.id):
+            db.append_question(event.from_user.id, event.text)
+            search_index.add_open(event.from_user.id, db.get_question(event.from_user.id))
+            if not state.merge_notified:
+                state.merge_notified = True
+                await event.answer("📝 Сообщение добавлено к вашему вопросу.")
+            return None
+
+        state.merge_notified = False
+        return await handler(event, data)
+
+    def _can_merge(self, user_id: int) -> bool:
+        """Есть ли у пользователя свежий открытый вопрос, который админ еще не взял в работу."""
+        question: Optional[Dict[str, Any]] = db.get_question(user_id)
+        if not question or question.get("admin_ready_to_reply") or question.get("answered"):
+            return False
+        try:
+            created_at = datetime.fromisoformat(question.get("created_at") or "")
+        except ValueError:
+            return False
+        return datetime.now() - created_at < timedelta(seconds=self.merge_window)
+
+    def _get_state(self, user_id: int, now: float) -> _UserState:
+        """Возвращает состояние пользователя, попутно удаляя простаивающие."""
+        state = self._users.pop(user_id, None)
+        while self._users:
+            oldest = next(iter(self._users.values()))
+            if oldest.updated >= now - self.idle_ttl and len(self._users) < MAX_TRACKED_USERS:
+                break
+            self._users.popitem(last=False)
+        if state is None:
+            state = _UserState(self.burst, now)
+        self._users[user_id] = state
+        return state
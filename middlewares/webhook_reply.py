@@ -0,0 +1,30 @@
+"""Отправка ответа обработчика в теле ответа на webhook."""
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.methods import TelegramMethod
+from aiogram.types import TelegramObject
+
+
+class WebhookReplyMiddleware(BaseMiddleware):
+    """Внутренний middleware: решает, как выполнить метод, который вернул обработчик.
+
+    Обработчик может не вызывать ``message.answer(...)``, а вернуть его
+    (``return message.answer(...)``). С флагом ``webhook_reply`` метод
+    передается дальше пулу обработчиков webhook, и тот по возможности
+    отправляет его в теле ответа на webhook-запрос. Без флага метод
+    выполняется сразу обычным запросом к API.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        result = await handler(event, data)
+        if isinstance(result, TelegramMethod) and not get_flag(data, "webhook_reply"):
+            await data["bot"](result)
+            return None
+        return result
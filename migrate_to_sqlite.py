@@ -0,0 +1,37 @@
+"""Однократный перенос вопросов из questions.json в SQLite.
+
+Использование:
+    python migrate_to_sqlite.py [--source questions.json] [--target questions.db]
+"""
+import argparse
+import logging
+
+from config import config
+from database import QuestionsDatabase
+from sqlite_database import SQLiteQuestionsDatabase
+
+
+def main() -> None:
+    """Переносит вопросы (снимок и журнал) из JSON хранилища в SQLite."""
+    parser = argparse.ArgumentParser(description="Перенос questions.json в SQLite")
+    parser.add_argument("--source", default=config.QUESTIONS_FILE, help="JSON файл с вопросами")
+    parser.add_argument("--target", default=config.SQLITE_FILE, help="Файл базы SQLite")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+
+    # Исходный файл не меняется: по нему можно вернуться на JSON
+    source = QuestionsDatabase(file_path=args.source, mode="journal", read_only=True)
+    target = SQLiteQuestionsDatabase(file_path=args.target)
+    try:
+        count = target.import_questions(source.get_all_questions())
+    finally:
+        source.close()
+        target.close()
+
+    logging.info(f"✅ Перенесено {count} вопросов из {args.source} в {args.target}")
+    logging.info("Установите STORAGE_BACKEND=sqlite, чтобы бот использовал новую базу")
+
+
+if __name__ == "__main__":
+    main()
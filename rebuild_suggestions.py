@@ -0,0 +1,34 @@
+"""Построение индекса подсказок ответов по архиву вопросов.
+
+Запускается без бота (например, по расписанию или после изменения
+SUGGEST_DIM); бот подхватит новый индекс при следующем запуске.
+
+Использование:
+    python rebuild_suggestions.py [--archive archive] [--output suggestions.npz]
+"""
+import argparse
+import logging
+
+from config import config
+from services.archive import QuestionArchive
+from services.suggestions import SuggestionIndex
+
+
+def main() -> None:
+    """Строит индекс подсказок по отвеченным вопросам из архива."""
+    parser = argparse.ArgumentParser(description="Построение индекса подсказок по архиву")
+    parser.add_argument("--archive", default=config.ARCHIVE_DIR, help="Папка архива вопросов")
+    parser.add_argument("--output", default=config.SUGGEST_INDEX_FILE, help="Файл индекса подсказок")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+
+    index = SuggestionIndex(file_path=args.output)
+    index.rebuild(QuestionArchive(args.archive).records())
+    index.save()
+
+    logging.info(f"✅ Индекс подсказок ({len(index)} ответов) записан в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
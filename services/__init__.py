@@ -0,0 +1 @@
+"""Фоновые сервисы бота."""
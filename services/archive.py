@@ -0,0 +1,258 @@
+"""Архив отвеченных и закрытых вопросов в сжатых сегментах."""
+import asyncio
+import csv
+import gzip
+import json
+import logging
+import os
+import re
+import time
+import zlib
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# archive-<дата>-<номер>[-w<процесс>].jsonl.gz
+SEGMENT_RE = re.compile(r"^archive-(\d{8})-(\d{4})(?:-w\d+)?\.jsonl\.gz$")
+
+# Как закрыт вопрос
+RESOLUTION_ANSWERED = "answered"
+RESOLUTION_CLOSED = "closed"
+RESOLUTION_UNREACHABLE = "unreachable"
+# Бот ответил сам уверенной подсказкой
+RESOLUTION_AUTO = "auto"
+# Вопрос остался без ответа дольше срока хранения
+RESOLUTION_EXPIRED = "expired"
+
+# Колонки выгрузки /export
+EXPORT_FIELDS = (
+    "resolved_at", "resolution", "user_id", "username", "full_name", "operator_id",
+    "created_at", "response_seconds", "question", "answer"
+)
+
+
+class QuestionArchive:
+    """Хранит историю закрытых вопросов вне рабочей базы.
+
+    Каждая запись - строка JSON в gzip-сегменте ``ARCHIVE_DIR``. Сегменты
+    только дописываются; новый сегмент начинается при смене даты, после
+    ARCHIVE_SEGMENT_BYTES несжатых данных и при каждом запуске бота, так
+    что недописанный после сбоя сегмент больше не меняется. Внутри event
+    loop записи копятся в памяти и пишутся пачкой в пуле потоков (см.
+    ``flush``); читатель видит их после сброса пачки.
+
+    Чтение (``records``) идет потоково, сегмент за сегментом, и не держит
+    архив в памяти целиком.
+    """
+
+    def __init__(self, directory: str = None, segment_bytes: int = None):
+        self.directory = directory or config.ARCHIVE_DIR
+        self.segment_bytes = segment_bytes or config.ARCHIVE_SEGMENT_BYTES
+        # Каждый процесс бота пишет в свои сегменты
+        self._suffix = "" if config.WORKER_ID is None else f"-w{config.WORKER_ID}"
+        self._file: Optional[gzip.GzipFile] = None
+        self._day: Optional[str] = None
+        self._written = 0
+        self.path: Optional[str] = None
+        # Записи, ждущие сброса на диск: (дата закрытия, строка JSONL)
+        self._buffer: List[Tuple[str, bytes]] = []
+        self._buffered_bytes = 0
+        self._buffered_since: Optional[float] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_now: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    def add(self, user_id: int, question_data: Dict[str, Any], resolution: str,
+            operator_id: Optional[int] = None, answer: Optional[str] = None) -> Dict[str, Any]:
+        """Записывает закрытый вопрос в архив и возвращает запись."""
+        resolved_at = datetime.now()
+        created_at = question_data.get("created_at")
+        try:
+            response_seconds = round(
+                (resolved_at - datetime.fromisoformat(created_at)).total_seconds(), 3
+            )
+        except (TypeError, ValueError):
+            response_seconds = None
+        record = {
+            "user_id": user_id,
+            "username": question_data.get("username"),
+            "full_name": question_data.get("full_name"),
+            "question": question_data.get("question"),
+            "answer": answer,
+            "resolution": resolution,
+            "operator_id": operator_id or question_data.get("operator_id"),
+            "created_at": created_at,
+            "resolved_at": resolved_at.isoformat(),
+            "response_seconds": response_seconds
+        }
+        self.append(record)
+        return record
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Добавляет запись в архив.
+
+        Без работающего event loop (или с ASYNC_PERSISTENCE=0) запись сразу
+        пишется на диск.
+        """
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        self._buffer.append((datetime.now().strftime("%Y%m%d"), line))
+        self._buffered_bytes += len(line)
+        loop = self._running_loop()
+        if loop is None:
+            self._write_lines(self._take_buffer())
+            return
+        if self._buffered_since is None:
+            self._buffered_since = time.monotonic()
+        if self._buffered_bytes >= config.ARCHIVE_FLUSH_BYTES and (
+                self._flush_now is None or self._flush_now.done()):
+            # Большая пачка: пишем, не дожидаясь таймера
+            self._flush_now = loop.create_task(self.flush())
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_later())
+
+    @staticmethod
+    def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+        """Возвращает работающий event loop, если отложенная запись включена."""
+        if not config.ASYNC_PERSISTENCE:
+            return None
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    def _take_buffer(self) -> List[Tuple[str, bytes]]:
+        """Забирает накопленные записи для записи на диск."""
+        lines, self._buffer = self._buffer, []
+        self._buffered_bytes = 0
+        self._buffered_since = None
+        return lines
+
+    async def _flush_later(self) -> None:
+        """Сбрасывает накопленные записи не позже ARCHIVE_FLUSH_DELAY после первой."""
+        while self._buffered_since is not None:
+            delay = self._buffered_since + config.ARCHIVE_FLUSH_DELAY - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Записывает накопленные записи одной пачкой в пуле потоков."""
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            lines = self._take_buffer()
+            await asyncio.get_running_loop().run_in_executor(None, self._write_lines, lines)
+
+    def _write_lines(self, lines: List[Tuple[str, bytes]]) -> None:
+        """Дописывает пачку записей и один раз сбрасывает поток сжатия на диск."""
+        if not lines:
+            return
+        try:
+            for day, line in lines:
+                if self._file is None or day != self._day or self._written >= self.segment_bytes:
+                    self._rotate(day)
+                self._file.write(line)
+                self._written += len(line)
+            self._file.flush()
+        except OSError as e:
+            # Ошибка архива не должна мешать ответу пользователю
+            logger.error(f"Ошибка записи в архив: {e}")
+            self._close_file()
+
+    def _rotate(self, day: str) -> None:
+        """Закрывает текущий сегмент и начинает новый."""
+        self._close_file()
+        os.makedirs(self.directory, exist_ok=True)
+        sequence = max(
+            (int(match.group(2)) for match in map(SEGMENT_RE.match, os.listdir(self.directory))
+             if match and match.group(1) == day),
+            default=0
+        )
+        while True:
+            sequence += 1
+            path = os.path.join(self.directory, f"archive-{day}-{sequence:04d}{self._suffix}.jsonl.gz")
+            try:
+                # "x": существующий сегмент никогда не перезаписываем
+                self._file = gzip.open(path, "xb")
+                break
+            except FileExistsError:
+                continue
+        self.path = path
+        self._day = day
+        self._written = 0
+        logger.info(f"Новый сегмент архива {path}")
+
+    def segments(self, since: Optional[date] = None, until: Optional[date] = None) -> Iterator[str]:
+        """Пути сегментов за период (включительно) по порядку дат."""
+        if not os.path.isdir(self.directory):
+            return
+        since_key = since.strftime("%Y%m%d") if since else None
+        until_key = until.strftime("%Y%m%d") if until else None
+        matches = sorted(
+            (match.group(1), match.group(2), match.group(0))
+            for match in map(SEGMENT_RE.match, os.listdir(self.directory)) if match
+        )
+        for day, _, name in matches:
+            if since_key and day < since_key or until_key and day > until_key:
+                continue
+            yield os.path.join(self.directory, name)
+
+    def records(self, since: Optional[date] = None, until: Optional[date] = None) -> Iterator[Dict[str, Any]]:
+        """Записи архива за период (по дате закрытия, включительно), по одной."""
+        since_key = since.isoformat() if since else None
+        until_key = until.isoformat() if until else None
+        for path in self.segments(since, until):
+            for record in self._read_segment(path):
+                day = (record.get("resolved_at") or "")[:10]
+                if since_key and day < since_key or until_key and day > until_key:
+                    continue
+                yield record
+
+    @staticmethod
+    def _read_segment(path: str) -> Iterator[Dict[str, Any]]:
+        """Читает записи сегмента построчно."""
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # Оборванная строка в конце сегмента после сбоя
+                        logger.warning(f"Пропущена поврежденная запись архива в {path}")
+        except (EOFError, zlib.error, gzip.BadGzipFile) as e:
+            # Открытый или недописанный сегмент: все записанные до этого места уже прочитаны
+            logger.debug(f"Сегмент {path} не завершен: {e}")
+
+    def export_csv(self, path: str, since: Optional[date] = None, until: Optional[date] = None) -> int:
+        """Выгружает записи архива в CSV потоково и возвращает их число."""
+        count = 0
+        # utf-8-sig: Excel правильно открывает кириллицу
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for record in self.records(since, until):
+                writer.writerow(record)
+                count += 1
+        return count
+
+    def close(self) -> None:
+        """Дописывает оставшиеся записи и завершает текущий сегмент."""
+        self._write_lines(self._take_buffer())
+        self._close_file()
+
+    def _close_file(self) -> None:
+        """Закрывает файл текущего сегмента."""
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError as e:
+                logger.error(f"Ошибка закрытия сегмента архива: {e}")
+            self._file = None
+
+
+# Глобальный архив вопросов
+archive = QuestionArchive()
@@ -0,0 +1,247 @@
+"""Рассылка объявлений всем пользователям из реестра подписчиков."""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set, Tuple
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.methods import EditMessageText
+
+from config import config
+from services.outbound import outbound, PRIORITY_ADMIN, PRIORITY_BROADCAST
+from services.subscribers import subscribers
+from utils.helpers import format_broadcast_progress
+
+logger = logging.getLogger(__name__)
+
+
+class Broadcaster:
+    """Отправляет текст всем подписчикам через очередь исходящих сообщений.
+
+    Подписчики обходятся по возрастанию id, в очереди одновременно не
+    больше ``concurrency`` сообщений рассылки: скорость задает общий лимит
+    OutboundDispatcher, а ответы пользователям идут впереди рассылки.
+    Прогресс (id, до которого все сообщения уже отправлены) сохраняется в
+    файл не реже раза в ``checkpoint_interval`` секунд и при остановке, так
+    что после перезапуска рассылка продолжается с места остановки. Кто
+    заблокировал бота или удалил аккаунт, удаляется из реестра.
+
+    Админу приходит сообщение о ходе рассылки, которое обновляется раз в
+    ``report_interval`` секунд.
+    """
+
+    def __init__(self, state_file: str = None, concurrency: int = None,
+                 report_interval: float = None, checkpoint_interval: float = None):
+        root, ext = os.path.splitext(state_file or config.BROADCAST_STATE_FILE)
+        # Каждый процесс бота ведет свою рассылку
+        suffix = "" if config.WORKER_ID is None else f"-w{config.WORKER_ID}"
+        self.state_file = f"{root}{suffix}{ext}"
+        self.concurrency = concurrency or config.BROADCAST_CONCURRENCY
+        self.report_interval = report_interval or config.BROADCAST_REPORT_INTERVAL
+        self.checkpoint_interval = checkpoint_interval or config.BROADCAST_CHECKPOINT_INTERVAL
+        self._state: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._cancelled = False
+        self._started = 0.0
+        self._report_text = ""
+
+    @property
+    def running(self) -> bool:
+        """Идет ли рассылка."""
+        return self._task is not None and not self._task.done()
+
+    def start(self, text: str, chat_id: int) -> bool:
+        """Начинает рассылку ``text``; отчет уходит в чат ``chat_id``.
+
+        False, если уже идет другая рассылка.
+        """
+        if self.running:
+            return False
+        self._state = {
+            "text": text, "chat_id": chat_id, "message_id": None, "cursor": 0,
+            "total": 0, "sent": 0, "failed": 0, "pruned": 0, "elapsed": 0.0
+        }
+        self._save()
+        self._launch()
+        return True
+
+    def resume(self) -> bool:
+        """Продолжает рассылку, прерванную перезапуском бота."""
+        if self.running or not os.path.exists(self.state_file):
+            return False
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                self._state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Не удалось прочитать {self.state_file}: {e}")
+            return False
+        logger.info(f"📣 Продолжаем рассылку с подписчика {self._state['cursor']}")
+        self._launch()
+        return True
+
+    def cancel(self) -> bool:
+        """Останавливает рассылку без возможности продолжить."""
+        if not self.running:
+            return False
+        self._cancelled = self._stopping = True
+        return True
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Останавливает рассылку при выключении бота, сохраняя прогресс.
+
+        Отправленные в очередь сообщения успевают уйти, если очередь
+        исходящих сообщений еще работает.
+        """
+        if not self.running:
+            return
+        self._stopping = True
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def stats(self) -> Dict[str, float]:
+        """Счетчики текущей (или последней) рассылки."""
+        if self._state is None:
+            return {"running": 0}
+        state = self._state
+        elapsed = self._elapsed()
+        done = state["sent"] + state["failed"] + state["pruned"]
+        return {
+            "running": int(self.running),
+            "total": state["total"],
+            "sent": state["sent"],
+            "failed": state["failed"],
+            "pruned": state["pruned"],
+            "per_sec": done / elapsed if elapsed else 0.0
+        }
+
+    def _launch(self) -> None:
+        self._stopping = self._cancelled = False
+        self._task = asyncio.create_task(self._run())
+
+    def _elapsed(self) -> float:
+        state = self._state
+        return state["elapsed"] + (time.monotonic() - self._started if self.running else 0.0)
+
+    async def _run(self) -> None:
+        state = self._state
+        self._started = time.monotonic()
+        # Подписчики, которых добавили другие процессы бота
+        await asyncio.get_running_loop().run_in_executor(None, subscribers.refresh)
+        targets = subscribers.snapshot(after=state["cursor"])
+        state["total"] = state["sent"] + state["failed"] + state["pruned"] + len(targets)
+        # Сообщения в порядке постановки в очередь: курсор двигается, когда уходит самое раннее
+        queued: Deque[Tuple[int, asyncio.Future]] = deque()
+        in_flight: Set[asyncio.Future] = set()
+        last_checkpoint = last_report = time.monotonic()
+        await self._report("идет")
+        try:
+            for user_id in targets:
+                if self._stopping:
+                    break
+                while len(in_flight) >= self.concurrency:
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    self._advance(queued)
+                future = outbound.send_message(user_id, state["text"], priority=PRIORITY_BROADCAST)
+                queued.append((user_id, future))
+                in_flight.add(future)
+
+                now = time.monotonic()
+                if now - last_checkpoint >= self.checkpoint_interval:
+                    self._advance(queued)
+                    self._save()
+                    last_checkpoint = now
+                if now - last_report >= self.report_interval:
+                    await self._report("идет")
+                    last_report = now
+            if in_flight:
+                await asyncio.wait(in_flight)
+            self._advance(queued)
+        finally:
+            # При отмене задачи (не успели дождаться очереди) курсор стоит на последнем
+            # отправленном подряд сообщении: после перезапуска повторятся только неотправленные
+            self._advance(queued)
+            state["elapsed"] = self._elapsed()
+            self._started = time.monotonic()
+            finished = not self._stopping or self._cancelled
+            if finished:
+                self._remove_state()
+            else:
+                self._save()
+
+        if self._cancelled:
+            await self._report("остановлена")
+        elif self._stopping:
+            await self._report("прервана перезапуском, продолжится после запуска")
+        else:
+            await self._report("завершена")
+            logger.info(
+                f"📣 Рассылка завершена: отправлено {state['sent']}, удалено {state['pruned']}, "
+                f"ошибок {state['failed']} за {state['elapsed']:.0f} с"
+            )
+
+    def _advance(self, queued: Deque[Tuple[int, asyncio.Future]]) -> None:
+        """Учитывает отправленные подряд сообщения и сдвигает курсор."""
+        state = self._state
+        while queued and queued[0][1].done():
+            user_id, future = queued.popleft()
+            error = None if future.cancelled() else future.exception()
+            if error is None and not future.cancelled():
+                state["sent"] += 1
+            elif isinstance(error, TelegramForbiddenError) or (
+                isinstance(error, TelegramBadRequest) and "chat not found" in str(error)
+            ):
+                subscribers.remove(user_id)
+                state["pruned"] += 1
+            else:
+                state["failed"] += 1
+            state["cursor"] = user_id
+
+    async def _report(self, status: str) -> None:
+        """Отправляет или обновляет сообщение админу о ходе рассылки."""
+        state = self._state
+        text = format_broadcast_progress(
+            state["sent"], state["failed"], state["pruned"], state["total"], self._elapsed(), status
+        )
+        if text == self._report_text:
+            return
+        self._report_text = text
+        try:
+            if state["message_id"] is None:
+                message = await outbound.send_message(state["chat_id"], text, priority=PRIORITY_ADMIN)
+                state["message_id"] = message.message_id
+            else:
+                await outbound.submit(EditMessageText(
+                    chat_id=state["chat_id"], message_id=state["message_id"], text=text
+                ), PRIORITY_ADMIN)
+        except Exception as e:
+            logger.warning(f"Не удалось обновить отчет о рассылке: {e}")
+
+    def _save(self) -> None:
+        """Сохраняет прогресс рассылки (атомарно)."""
+        state = dict(self._state, elapsed=self._elapsed())
+        tmp_path = f"{self.state_file}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            logger.error(f"Ошибка сохранения {self.state_file}: {e}")
+
+    def _remove_state(self) -> None:
+        try:
+            os.remove(self.state_file)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Ошибка удаления {self.state_file}: {e}")
+
+
+# Глобальная рассылка
+broadcaster = Broadcaster()
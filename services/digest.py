@@ -0,0 +1,129 @@
+"""Уведомления операторов о новых вопросах со сводками при наплыве."""
+import asyncio
+import itertools
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+
+from aiogram.types import InlineKeyboardMarkup
+
+from config import config
+from database import db
+from services.outbound import outbound, PRIORITY_ADMIN
+from utils.helpers import format_question_message, format_digest_message
+from utils.keyboards import get_admin_inline_keyboard, get_digest_keyboard
+
+# Сколько последних сводок помнить для листания страниц
+MAX_DIGESTS = 100
+
+
+class _Window:
+    """Окно сводки одного оператора."""
+
+    __slots__ = ("arrivals", "buffer", "flush_handle")
+
+    def __init__(self):
+        self.arrivals: deque[float] = deque()
+        self.buffer: list[tuple[int, str, str]] = []
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+
+
+class AdminNotifier:
+    """Отправляет операторам уведомления о назначенных им вопросах.
+
+    Пока вопросов мало, каждый приходит отдельным сообщением. Если за
+    DIGEST_WINDOW секунд оператору пришло DIGEST_THRESHOLD вопросов и
+    больше, новые вопросы копятся и раз в окно отправляются ему одной
+    сводкой со страницами.
+    """
+
+    def __init__(self, enabled: bool = None, window: float = None,
+                 threshold: int = None, page_size: int = None):
+        self.enabled = config.DIGEST_ENABLED if enabled is None else enabled
+        self.window = window or config.DIGEST_WINDOW
+        self.threshold = threshold or config.DIGEST_THRESHOLD
+        self.page_size = page_size or config.DIGEST_PAGE_SIZE
+        self._windows: Dict[int, _Window] = {}
+        self._digests: "OrderedDict[int, list[tuple[int, str, str]]]" = OrderedDict()
+        self._ids = itertools.count(1)
+
+    def notify(self, user_id: int, question: str, username: str, full_name: str,
+               operator_id: Optional[int] = None, suggestions: list = ()) -> None:
+        """Уведомляет оператора о новом вопросе (сразу или в ближайшей сводке).
+
+        Подсказки ответов показываются только в отдельном уведомлении.
+        """
+        operator_id = operator_id or config.default_operator_id
+        window = self._windows.get(operator_id)
+        if window is None:
+            window = self._windows[operator_id] = _Window()
+        if not self._burst(window):
+            outbound.send_message(
+                operator_id,
+                format_question_message(user_id, question, username, full_name, suggestions),
+                priority=PRIORITY_ADMIN,
+                reply_markup=get_admin_inline_keyboard(user_id, suggestions)
+            )
+            return
+        window.buffer.append((user_id, username, question))
+        if window.flush_handle is None:
+            window.flush_handle = asyncio.get_running_loop().call_later(
+                self.window, self.flush, operator_id
+            )
+
+    def _burst(self, window: _Window) -> bool:
+        """Учитывает вопрос и проверяет, идет ли сейчас наплыв у оператора."""
+        if not self.enabled:
+            return False
+        now = time.monotonic()
+        window.arrivals.append(now)
+        while window.arrivals and window.arrivals[0] < now - self.window:
+            window.arrivals.popleft()
+        return len(window.arrivals) > self.threshold or window.flush_handle is not None
+
+    def flush(self, operator_id: Optional[int] = None) -> None:
+        """Отправляет накопленные вопросы оператора одной сводкой."""
+        operator_id = operator_id or config.default_operator_id
+        window = self._windows.get(operator_id)
+        if window is None:
+            return
+        window.flush_handle = None
+        items, window.buffer = window.buffer, []
+        if not items:
+            return
+        digest_id = next(self._ids)
+        self._digests[digest_id] = items
+        while len(self._digests) > MAX_DIGESTS:
+            self._digests.popitem(last=False)
+        text, markup = self.render(digest_id, 0)
+        outbound.send_message(operator_id, text, priority=PRIORITY_ADMIN, reply_markup=markup)
+
+    def flush_all(self) -> None:
+        """Отправляет все накопленные сводки, не дожидаясь конца окна (при остановке)."""
+        for operator_id, window in self._windows.items():
+            if window.flush_handle is not None:
+                window.flush_handle.cancel()
+                self.flush(operator_id)
+
+    def render(self, digest_id: int, page: int) -> Optional[tuple[str, InlineKeyboardMarkup]]:
+        """Готовит текст и клавиатуру страницы сводки (None, если сводка забыта)."""
+        items = self._digests.get(digest_id)
+        if items is None:
+            return None
+        # Закрытые и отвеченные вопросы в сводке не показываем
+        items = [item for item in items if db.get_question(item[0])]
+        if not items:
+            return "✅ Все вопросы из сводки обработаны.", InlineKeyboardMarkup(inline_keyboard=[])
+        pages = (len(items) + self.page_size - 1) // self.page_size
+        page = min(max(page, 0), pages - 1)
+        start = page * self.page_size
+        page_items = items[start:start + self.page_size]
+        text = format_digest_message(page_items, start + 1, page, pages, len(items))
+        markup = get_digest_keyboard(
+            digest_id, [user_id for user_id, _, _ in page_items], start + 1, page, pages
+        )
+        return text, markup
+
+
+# Глобальный экземпляр уведомлений операторов
+notifier = AdminNotifier()
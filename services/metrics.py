@@ -0,0 +1,179 @@
+"""Метрики в формате Prometheus (без внешних зависимостей)."""
+import asyncio
+import bisect
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple, Union
+
+# Границы корзин гистограмм по умолчанию, сек
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    """Счетчик."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+class Gauge:
+    """Текущее значение."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Histogram:
+    """Гистограмма с заранее выделенным массивом корзин."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        # Последняя корзина - +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+Metric = Union[Counter, Gauge, Histogram]
+
+
+class MetricFamily:
+    """Метрика с необязательной меткой: значения по метке создаются один раз."""
+
+    def __init__(self, name: str, kind: str, help_text: str, label: Optional[str],
+                 factory: Callable[[], Metric]):
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.label = label
+        self._factory = factory
+        self._children: Dict[str, Metric] = {}
+        self._default: Optional[Metric] = None if label else factory()
+
+    def labels(self, value: str) -> Metric:
+        """Метрика для значения метки."""
+        child = self._children.get(value)
+        if child is None:
+            child = self._children[value] = self._factory()
+        return child
+
+    def samples(self) -> Iterable[Tuple[str, Metric]]:
+        if self._default is not None:
+            yield "", self._default
+        for value, child in self._children.items():
+            yield f'{self.label}="{_escape(value)}"', child
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(*parts: str) -> str:
+    parts = [part for part in parts if part]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """Реестр метрик и вывод в текстовом формате Prometheus."""
+
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+        self._callbacks: Dict[str, Tuple[str, Callable[[], Dict[str, float]]]] = {}
+
+    def _register(self, name: str, kind: str, help_text: str, label: Optional[str],
+                  factory: Callable[[], Metric]) -> Union[Metric, MetricFamily]:
+        """Регистрирует метрику: без метки возвращает ее саму, с меткой - семейство."""
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = MetricFamily(name, kind, help_text, label, factory)
+        return family if label else family._default
+
+    def counter(self, name: str, help_text: str, label: str = None) -> Union[Counter, MetricFamily]:
+        return self._register(name, "counter", help_text, label, Counter)
+
+    def gauge(self, name: str, help_text: str, label: str = None) -> Union[Gauge, MetricFamily]:
+        return self._register(name, "gauge", help_text, label, Gauge)
+
+    def histogram(self, name: str, help_text: str, label: str = None,
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Union[Histogram, MetricFamily]:
+        return self._register(name, "histogram", help_text, label, lambda: Histogram(buckets))
+
+    def gauge_callback(self, prefix: str, help_text: str,
+                       callback: Callable[[], Dict[str, float]]) -> None:
+        """Регистрирует набор значений, которые читаются при выводе (``prefix_<ключ>``)."""
+        self._callbacks[prefix] = (help_text, callback)
+
+    def render(self) -> str:
+        """Выводит все метрики в текстовом формате Prometheus."""
+        lines = []
+        for family in self._families.values():
+            lines.append(f"# HELP {family.name} {family.help_text}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for label, metric in family.samples():
+                if isinstance(metric, Histogram):
+                    cumulative = 0
+                    for bound, count in zip(metric.bounds + (float("inf"),), metric.counts):
+                        cumulative += count
+                        le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                        lines.append(f"{family.name}_bucket{_labels(label, le)} {cumulative}")
+                    lines.append(f"{family.name}_sum{_labels(label)} {metric.sum}")
+                    lines.append(f"{family.name}_count{_labels(label)} {metric.count}")
+                else:
+                    lines.append(f"{family.name}{_labels(label)} {metric.value}")
+        for prefix, (help_text, callback) in self._callbacks.items():
+            for key, value in callback().items():
+                name = f"{prefix}_{key}"
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Глобальный реестр метрик
+metrics = MetricsRegistry()
+
+LOOP_LAG = metrics.histogram("bot_event_loop_lag_seconds", "Задержка event loop")
+
+
+class LoopLagMonitor:
+    """Фоновая задача: измеряет, насколько позже запланированного просыпается event loop."""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            LOOP_LAG.observe(max(0.0, time.monotonic() - started - self.interval))
+
+
+# Глобальный монитор задержки event loop
+loop_monitor = LoopLagMonitor()
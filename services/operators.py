@@ -0,0 +1,101 @@
+"""Распределение вопросов между операторами поддержки."""
+from typing import Dict, Iterable, Optional
+
+from config import config
+
+
+class OperatorBalancer:
+    """Назначает новые вопросы операторам и учитывает их нагрузку.
+
+    Нагрузка оператора - число его открытых вопросов. Стратегия
+    "least_loaded" выбирает наименее загруженного оператора, "round_robin" -
+    следующего по кругу. Операторы хранятся в корзинах по нагрузке, поэтому
+    назначение, передача и освобождение вопроса работают за O(1).
+
+    Состояние восстанавливается из базы при запуске (``restore``). При
+    нескольких процессах бота каждый процесс учитывает только свои
+    назначения.
+    """
+
+    def __init__(self, operator_ids: Iterable[int] = None, strategy: str = None):
+        self.operator_ids = list(operator_ids or config.OPERATOR_IDS)
+        self.strategy = strategy or config.ASSIGNMENT_STRATEGY
+        self._owners: Dict[int, int] = {}
+        self._loads: Dict[int, int] = {}
+        # Нагрузка -> операторы с такой нагрузкой (в порядке попадания в корзину)
+        self._buckets: Dict[int, Dict[int, None]] = {}
+        self._min_load = 0
+        self._next = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self._owners.clear()
+        self._loads = dict.fromkeys(self.operator_ids, 0)
+        self._buckets = {0: dict.fromkeys(self.operator_ids)}
+        self._min_load = 0
+
+    def restore(self, assignments: Dict[int, Optional[int]]) -> None:
+        """Восстанавливает нагрузку по открытым вопросам из базы."""
+        self._reset()
+        for user_id, operator_id in assignments.items():
+            self._take(user_id, operator_id or config.default_operator_id)
+
+    def assign(self, user_id: int) -> int:
+        """Возвращает оператора для вопроса пользователя.
+
+        Если у пользователя уже есть открытый вопрос, он остается у того же
+        оператора.
+        """
+        operator_id = self._owners.get(user_id)
+        if operator_id is not None:
+            return operator_id
+        if self.strategy == "round_robin":
+            operator_id = self.operator_ids[self._next % len(self.operator_ids)]
+            self._next += 1
+        else:
+            operator_id = next(iter(self._buckets[self._min_load]))
+        self._take(user_id, operator_id)
+        return operator_id
+
+    def transfer(self, user_id: int, operator_id: int) -> None:
+        """Передает вопрос другому оператору (он взял вопрос в работу)."""
+        if self._owners.get(user_id) != operator_id:
+            self.release(user_id)
+            self._take(user_id, operator_id)
+
+    def release(self, user_id: int) -> None:
+        """Снимает вопрос с оператора (вопрос отвечен или закрыт)."""
+        operator_id = self._owners.pop(user_id, None)
+        if operator_id is not None:
+            self._move(operator_id, -1)
+
+    def operator_of(self, user_id: int) -> Optional[int]:
+        """Оператор открытого вопроса пользователя."""
+        return self._owners.get(user_id)
+
+    def stats(self) -> Dict[int, int]:
+        """Нагрузка по операторам."""
+        return dict(self._loads)
+
+    def _take(self, user_id: int, operator_id: int) -> None:
+        # Вопросы, взятые не оператором (например, администратором), нагрузку не меняют
+        if operator_id in self._loads:
+            self._owners[user_id] = operator_id
+            self._move(operator_id, 1)
+
+    def _move(self, operator_id: int, delta: int) -> None:
+        """Переносит оператора в корзину соседней нагрузки."""
+        old = self._loads[operator_id]
+        new = old + delta
+        bucket = self._buckets[old]
+        del bucket[operator_id]
+        if not bucket:
+            del self._buckets[old]
+        self._buckets.setdefault(new, {})[operator_id] = None
+        self._loads[operator_id] = new
+        if new < self._min_load or self._min_load not in self._buckets:
+            self._min_load = new
+
+
+# Глобальный распределитель вопросов
+operators = OperatorBalancer()
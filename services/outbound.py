@@ -0,0 +1,254 @@
+"""Очередь исходящих запросов к Bot API с ограничением скорости."""
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Dict, Optional, Set
+
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from aiogram.methods import SendMessage, TelegramMethod
+
+from config import config
+
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты: меньше - раньше. Ответы пользователям идут впереди уведомлений админу,
+# рассылка - после всех остальных сообщений.
+PRIORITY_USER = 0
+PRIORITY_ADMIN = 1
+PRIORITY_BROADCAST = 2
+
+# Сколько корзин чатов держать, прежде чем чистить простаивающие
+MAX_CHAT_BUCKETS = 10_000
+
+# После стольких ответов 429 подряд (в разные чаты) ограничение считается общим
+FLOOD_STREAK = 3
+
+
+class TokenBucket:
+    """Корзина токенов: ``rate`` токенов в секунду, не больше ``capacity``."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Через сколько секунд будет доступен токен (0 - уже доступен)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self, now: float) -> float:
+        """Забирает токен (в долг, если его нет) и возвращает время ожидания."""
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """Запрещает отправку на ``seconds`` секунд (после RetryAfter)."""
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def idle(self, now: float) -> bool:
+        """Корзина полна и может быть удалена без потери состояния."""
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _Job:
+    """Запрос в очереди на отправку."""
+
+    __slots__ = ("priority", "seq", "method", "future", "enqueued_at", "attempts")
+
+    def __init__(self, priority: int, seq: int, method: TelegramMethod, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.method = method
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+    def __lt__(self, other: "_Job") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class OutboundDispatcher:
+    """Единая точка отправки запросов к Bot API.
+
+    Соблюдает общий лимит и лимит на чат (корзины токенов), отдает
+    приоритет ответам пользователям, повторяет запрос после RetryAfter и
+    сетевых ошибок. Работает с любым ``bot``, который можно вызвать как
+    ``await bot(method)`` - в том числе с ``Bot`` на фейковой сессии.
+    """
+
+    def __init__(self, global_rate: float = None, chat_rate: float = None,
+                 chat_burst: int = None, workers: int = None, max_retries: int = None):
+        # Лимит Telegram общий для бота: при нескольких процессах делим его между ними
+        self.global_rate = global_rate or config.OUTBOUND_GLOBAL_RATE / config.WORKERS
+        self.chat_rate = chat_rate or config.OUTBOUND_CHAT_RATE
+        self.chat_burst = chat_burst or config.OUTBOUND_CHAT_BURST
+        self.workers = workers or config.OUTBOUND_WORKERS
+        self.max_retries = config.OUTBOUND_MAX_RETRIES if max_retries is None else max_retries
+        self._bot: Any = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._global = TokenBucket(self.global_rate, self.global_rate)
+        self._chats: Dict[Any, TokenBucket] = {}
+        self._seq = itertools.count()
+        self._outstanding: Set[asyncio.Future] = set()
+        # Ответы 429 подряд, без успешной отправки между ними
+        self._flood_streak = 0
+        # Счетчики
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    @property
+    def running(self) -> bool:
+        """Запущены ли обработчики очереди."""
+        return bool(self._tasks)
+
+    def start(self, bot: Any) -> None:
+        """Запускает обработчики очереди."""
+        if self.running:
+            return
+        self._bot = bot
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Дожидается отправки оставшихся запросов и останавливает обработчики."""
+        if self._outstanding:
+            await asyncio.wait(set(self._outstanding), timeout=timeout)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, method: TelegramMethod, priority: int = PRIORITY_ADMIN) -> asyncio.Future:
+        """Ставит запрос в очередь и возвращает future с его результатом.
+
+        Future можно не ждать: ошибки отправки в этом случае только логируются.
+        """
+        if not self.running:
+            raise RuntimeError("OutboundDispatcher не запущен")
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(self._on_done)
+        self._outstanding.add(future)
+        self._queue.put_nowait(_Job(priority, next(self._seq), method, future))
+        return future
+
+    def send_message(self, chat_id: int, text: str, priority: int = PRIORITY_ADMIN,
+                     **kwargs: Any) -> asyncio.Future:
+        """Ставит в очередь sendMessage."""
+        return self.submit(SendMessage(chat_id=chat_id, text=text, **kwargs), priority)
+
+    def _on_done(self, future: asyncio.Future) -> None:
+        self._outstanding.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"Не удалось отправить запрос: {future.exception()}")
+
+    def stats(self) -> Dict[str, float]:
+        """Счетчики очереди."""
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "in_flight": len(self._outstanding),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "latency_avg": self.latency_total / self.sent if self.sent else 0.0,
+            "latency_max": self.latency_max
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            except Exception as e:
+                logger.error(f"Ошибка обработчика исходящей очереди: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def _chat_bucket(self, chat_id: Any, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHAT_BUCKETS:
+                self._chats = {cid: b for cid, b in self._chats.items() if not b.idle(now)}
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _defer(self, job: _Job, delay: float) -> None:
+        """Возвращает запрос в очередь через ``delay`` секунд."""
+        asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, job)
+
+    async def _process(self, job: _Job) -> None:
+        if job.future.done():
+            return
+        now = time.monotonic()
+        chat_id = getattr(job.method, "chat_id", None)
+        bucket = self._chat_bucket(chat_id, now) if chat_id is not None else None
+        if bucket is not None:
+            wait = bucket.delay(now)
+            if wait > 0:
+                # Не занимаем обработчик, пока чат исчерпал лимит
+                self._defer(job, wait)
+                return
+            bucket.consume(now)
+        wait = self._global.consume(now)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        try:
+            result = await self._bot(job.method)
+        except TelegramRetryAfter as e:
+            if bucket is not None:
+                bucket.pause(e.retry_after)
+            self._flood_streak += 1
+            # Рассылка упирается в общий лимит бота: ждут все чаты, а не только этот
+            if job.priority == PRIORITY_BROADCAST or self._flood_streak >= FLOOD_STREAK:
+                self._global.pause(e.retry_after)
+            self._retry(job, e, e.retry_after)
+            return
+        except (TelegramNetworkError, TelegramServerError) as e:
+            self._retry(job, e, min(0.5 * 2 ** job.attempts, 30))
+            return
+        except Exception as e:
+            self._fail(job, e)
+            return
+
+        self._flood_streak = 0
+        latency = time.monotonic() - job.enqueued_at
+        self.sent += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        if not job.future.done():
+            job.future.set_result(result)
+
+    def _fail(self, job: _Job, error: Exception) -> None:
+        self.failed += 1
+        if not job.future.done():
+            job.future.set_exception(error)
+
+    def _retry(self, job: _Job, error: Exception, delay: float) -> None:
+        if job.attempts >= self.max_retries:
+            self._fail(job, error)
+            return
+        job.attempts += 1
+        self.retried += 1
+        logger.info(f"Повтор запроса через {delay} с (попытка {job.attempts}): {error}")
+        self._defer(job, delay)
+
+
+# Глобальный экземпляр очереди исходящих сообщений
+outbound = OutboundDispatcher()
@@ -0,0 +1,371 @@
+"""Расписание и билеты с сайта: кэш в памяти с фоновым обновлением."""
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+import aiohttp
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Разметка мероприятий schema.org на страницах сайта
+JSON_LD_RE = re.compile(
+    r"<script[^>]*type\s*=\s*[\"']application/ld\+json[\"'][^>]*>(.*?)</script>",
+    re.IGNORECASE | re.DOTALL
+)
+
+WEEKDAYS = ("пн", "вт", "ср", "чт", "пт", "сб", "вс")
+CURRENCIES = {"RUB": "₽", "RUR": "₽", "USD": "$", "EUR": "€"}
+
+# Пауза между попытками после ошибки сайта, сек (растет вдвое до интервала обновления)
+MIN_RETRY_DELAY = 10.0
+
+
+def _walk(node: Any) -> Iterator[Dict[str, Any]]:
+    """Все объекты JSON-LD, включая вложенные в @graph и списки."""
+    if isinstance(node, list):
+        for item in node:
+            yield from _walk(item)
+    elif isinstance(node, dict):
+        yield node
+        for key in ("@graph", "itemListElement", "item", "subEvent"):
+            if key in node:
+                yield from _walk(node[key])
+
+
+def _is_event(node: Dict[str, Any]) -> bool:
+    types = node.get("@type")
+    types = types if isinstance(types, list) else [types]
+    return any(isinstance(kind, str) and kind.endswith("Event") for kind in types)
+
+
+def _text(value: Any) -> Optional[str]:
+    """Строка из значения JSON-LD (строка или объект с name)."""
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, dict):
+        value = value.get("name")
+    return str(value).strip() if value else None
+
+
+def _offer(offers: Any) -> Dict[str, Any]:
+    """Цена, ссылка и наличие билетов из offers (одно предложение или несколько)."""
+    offers = offers if isinstance(offers, list) else [offers]
+    prices = []
+    result: Dict[str, Any] = {"url": None, "price": None, "currency": None, "sold_out": bool(offers)}
+    for offer in offers:
+        if not isinstance(offer, dict):
+            continue
+        result["url"] = result["url"] or offer.get("url")
+        result["currency"] = result["currency"] or offer.get("priceCurrency")
+        for key in ("price", "lowPrice"):
+            try:
+                prices.append(float(str(offer[key]).replace(",", ".")))
+            except (KeyError, TypeError, ValueError):
+                pass
+        if "SoldOut" not in str(offer.get("availability", "")):
+            result["sold_out"] = False
+    if prices:
+        result["price"] = min(prices)
+    return result
+
+
+def parse_events(body: str) -> List[Dict[str, Any]]:
+    """Мероприятия из HTML с разметкой JSON-LD или из JSON (список мероприятий).
+
+    Возвращает словари name, start, location, url, price, currency, sold_out,
+    отсортированные по дате начала.
+    """
+    stripped = body.lstrip()
+    if stripped.startswith(("[", "{")):
+        chunks = [stripped]
+    else:
+        chunks = JSON_LD_RE.findall(body)
+    events = {}
+    for chunk in chunks:
+        try:
+            data = json.loads(chunk)
+        except ValueError:
+            continue
+        for node in _walk(data):
+            if not _is_event(node) and not ("startDate" in node and "name" in node):
+                continue
+            name = _text(node.get("name"))
+            start = node.get("startDate")
+            if not name or not isinstance(start, str):
+                continue
+            offer = _offer(node.get("offers") or [])
+            event = {
+                "name": name,
+                "start": start,
+                "location": _text(node.get("location")),
+                "url": offer["url"] or node.get("url"),
+                "price": offer["price"],
+                "currency": offer["currency"],
+                "sold_out": offer["sold_out"]
+            }
+            # Одно мероприятие может быть размечено на странице дважды
+            events[(name, start)] = event
+    return sorted(events.values(), key=lambda event: event["start"])
+
+
+def _parse_start(value: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _format_start(start: datetime) -> str:
+    text = f"{start:%d.%m} ({WEEKDAYS[start.weekday()]})"
+    if (start.hour, start.minute) != (0, 0):
+        text += f" {start:%H:%M}"
+    return text
+
+
+def _format_price(event: Dict[str, Any]) -> Optional[str]:
+    if event["sold_out"]:
+        return "билеты проданы"
+    if event["price"] is None:
+        return None
+    if not event["price"]:
+        return "вход свободный"
+    currency = CURRENCIES.get(event["currency"] or "RUB", event["currency"])
+    return f"от {event['price']:g} {currency}"
+
+
+def upcoming(events: List[Dict[str, Any]], limit: int) -> List[tuple[datetime, Dict[str, Any]]]:
+    """Ближайшие ``limit`` мероприятий, которые еще не начались."""
+    result = []
+    for event in events:
+        start = _parse_start(event["start"])
+        if start is None:
+            continue
+        # Время показываем как на сайте, а сравниваем в часовом поясе мероприятия;
+        # мероприятие на весь день (дата без времени) показывается до конца дня
+        now = datetime.now(start.tzinfo)
+        if start >= now or (len(event["start"]) <= 10 and start.date() == now.date()):
+            result.append((start, event))
+            if len(result) >= limit:
+                break
+    return result
+
+
+def render_schedule(events: List[Dict[str, Any]], limit: int, website: str) -> Optional[str]:
+    """Текст для кнопки «Расписание» (None, если ближайших мероприятий нет)."""
+    items = upcoming(events, limit)
+    if not items:
+        return None
+    lines = ["📆 Расписание мероприятий:\n"]
+    for start, event in items:
+        lines.append(f"🎭 {event['name']}\n🗓 {_format_start(start)}")
+        if event["location"]:
+            lines.append(f"📍 {event['location']}")
+        price = _format_price(event)
+        if price:
+            lines.append(f"🎟️ {price}")
+        lines.append("")
+    lines.append(f"Подробнее: {website}")
+    return "\n".join(lines)
+
+
+def render_tickets(events: List[Dict[str, Any]], limit: int, website: str) -> Optional[str]:
+    """Текст для кнопки «Купить билеты» (None, если билетов в продаже нет)."""
+    items = [(start, event) for start, event in upcoming(events, limit) if not event["sold_out"]]
+    if not items:
+        return None
+    lines = ["🎟️ Купить билеты:\n"]
+    for start, event in items:
+        price = _format_price(event)
+        lines.append(f"🎭 {event['name']}, {_format_start(start)}{f' - {price}' if price else ''}")
+        lines.append(f"👉 {event['url'] or website}\n")
+    lines.append(f"Все мероприятия: {website}")
+    return "\n".join(lines)
+
+
+class ScheduleCache:
+    """Готовые тексты расписания и билетов, собранные со страницы сайта.
+
+    Обработчики кнопок берут текст из памяти и не ходят на сайт. Фоновая
+    задача раз в ``refresh_interval`` секунд перепроверяет страницу
+    условным запросом (If-None-Match / If-Modified-Since): если сайт
+    ответил 304, тексты только пересобираются, чтобы прошедшие
+    мероприятия пропали. Пока идет обновление или сайт недоступен,
+    пользователи получают прежний текст (stale-while-revalidate); если
+    текст устарел больше чем на два интервала, обновление запускается и
+    из обработчика - но одно на всех, сколько бы ни было запросов.
+
+    Загруженные мероприятия и валидаторы сохраняются в ``cache_file``,
+    так что после перезапуска расписание доступно сразу.
+    """
+
+    def __init__(self, url: str = None, refresh_interval: float = None, timeout: float = None,
+                 cache_file: str = None, limit: int = None):
+        self.url = url or config.SCHEDULE_URL
+        self.refresh_interval = refresh_interval or config.SCHEDULE_REFRESH_INTERVAL
+        self.timeout = timeout or config.SCHEDULE_TIMEOUT
+        self.cache_file = config.SCHEDULE_CACHE_FILE if cache_file is None else cache_file
+        self.limit = limit or config.SCHEDULE_MAX_EVENTS
+        self.events: List[Dict[str, Any]] = []
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        # Когда страница последний раз проверена (time.time(), 0 - ни разу)
+        self.checked_at = 0.0
+        self._schedule_text: Optional[str] = None
+        self._tickets_text: Optional[str] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Счетчики
+        self.fetches = 0
+        self.not_modified = 0
+        self.errors = 0
+
+    @property
+    def running(self) -> bool:
+        """Запущено ли фоновое обновление."""
+        return self._task is not None
+
+    def start(self) -> None:
+        """Загружает сохраненный кэш и запускает фоновое обновление."""
+        if self.running:
+            return
+        self._load()
+        self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает обновление и закрывает HTTP-сессию."""
+        for task in (self._task, self._refresh_task):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._task = self._refresh_task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def schedule_text(self) -> str:
+        """Текст расписания из памяти."""
+        self._revalidate_if_stale()
+        return self._schedule_text or f"📆 Расписание мероприятий:\n{config.WEBSITE_URL}"
+
+    def tickets_text(self) -> str:
+        """Текст о билетах из памяти."""
+        self._revalidate_if_stale()
+        return self._tickets_text or f"🎟️ Купить билеты:\n{config.WEBSITE_URL}"
+
+    def stats(self) -> Dict[str, float]:
+        """Счетчики кэша."""
+        return {
+            "events": len(self.events),
+            "age_seconds": time.time() - self.checked_at if self.checked_at else -1,
+            "fetches": self.fetches,
+            "not_modified": self.not_modified,
+            "errors": self.errors
+        }
+
+    def refresh(self) -> "asyncio.Task[bool]":
+        """Запускает обновление, если оно еще не идет; возвращает его задачу."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+        return self._refresh_task
+
+    def _revalidate_if_stale(self) -> None:
+        if self.running and time.time() - self.checked_at > 2 * self.refresh_interval:
+            self.refresh()
+
+    async def _run(self) -> None:
+        delay = MIN_RETRY_DELAY
+        while True:
+            if time.time() - self.checked_at >= self.refresh_interval:
+                ok = await asyncio.shield(self.refresh())
+            else:
+                ok = True
+            if ok:
+                delay = MIN_RETRY_DELAY
+                wait = self.refresh_interval - (time.time() - self.checked_at)
+            else:
+                wait, delay = delay, min(delay * 2, self.refresh_interval)
+            await asyncio.sleep(max(wait, 1.0))
+
+    async def _refresh(self) -> bool:
+        """Проверяет страницу сайта; False, если сайт недоступен."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        try:
+            async with self._session.get(self.url, headers=headers) as response:
+                if response.status == 304:
+                    self.not_modified += 1
+                else:
+                    response.raise_for_status()
+                    body = await response.text()
+                    events = parse_events(body)
+                    if not events and self.events:
+                        # Страница без разметки (например, заглушка хостинга) не стирает расписание
+                        raise ValueError("на странице нет мероприятий")
+                    self.fetches += 1
+                    self.events = events
+                    self.etag = response.headers.get("ETag")
+                    self.last_modified = response.headers.get("Last-Modified")
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            self.errors += 1
+            logger.warning(f"Не удалось обновить расписание с {self.url}: {e}")
+            # Прежние мероприятия остаются, но прошедшие убираются из текста
+            self._render()
+            return False
+        self.checked_at = time.time()
+        self._render()
+        if response.status != 304:
+            await asyncio.get_running_loop().run_in_executor(None, self._save)
+        return True
+
+    def _render(self) -> None:
+        self._schedule_text = render_schedule(self.events, self.limit, config.WEBSITE_URL)
+        self._tickets_text = render_tickets(self.events, self.limit, config.WEBSITE_URL)
+
+    def _load(self) -> None:
+        """Восстанавливает мероприятия и валидаторы из файла кэша."""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать {self.cache_file}: {e}")
+            return
+        if state.get("url") != self.url:
+            return
+        self.events = state.get("events", [])
+        self.etag = state.get("etag")
+        self.last_modified = state.get("last_modified")
+        self.checked_at = state.get("checked_at", 0.0)
+        self._render()
+
+    def _save(self) -> None:
+        """Сохраняет мероприятия и валидаторы (атомарно)."""
+        if not self.cache_file:
+            return
+        tmp_path = f"{self.cache_file}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "url": self.url, "etag": self.etag, "last_modified": self.last_modified,
+                    "checked_at": self.checked_at, "events": self.events
+                }, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            logger.error(f"Ошибка сохранения {self.cache_file}: {e}")
+
+
+# Глобальный кэш расписания
+schedule = ScheduleCache()
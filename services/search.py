@@ -0,0 +1,285 @@
+"""Полнотекстовый поиск по вопросам и ответам."""
+import bisect
+import heapq
+import itertools
+import logging
+import math
+import re
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from aiogram.types import InlineKeyboardMarkup
+
+from config import config
+from services.archive import archive
+from utils.helpers import format_search_results
+from utils.keyboards import get_search_keyboard
+
+logger = logging.getLogger(__name__)
+
+# Статус вопроса, который еще не закрыт
+STATUS_OPEN = "open"
+
+# Сколько последних поисков помнить для листания страниц
+MAX_SEARCHES = 100
+
+TOKEN_RE = re.compile(r"[0-9a-zа-я]+")
+CYRILLIC_RE = re.compile(r"[а-я]")
+
+STOP_WORDS = frozenset({
+    "а", "без", "бы", "в", "во", "вы", "да", "для", "до", "его", "ее", "если", "есть",
+    "же", "за", "и", "из", "или", "им", "их", "к", "как", "ко", "ли", "мне", "мы", "на",
+    "не", "нет", "ни", "но", "о", "об", "он", "она", "они", "от", "по", "при", "с", "со",
+    "так", "то", "у", "уже", "что", "это", "я"
+})
+
+# Окончания существительных и прилагательных для упрощенного стемминга
+# (сначала длинные); личные окончания глаголов совпадают с концами основ
+# существительных (билет, возврат) и не отсекаются
+ENDINGS = sorted({
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "иях", "ием", "ией",
+    "ов", "ев", "ей", "ой", "ий", "ый", "ая", "яя", "ое", "ее", "ие", "ые", "ую", "юю",
+    "ых", "их", "ым", "им", "ом", "ем", "ах", "ях", "ам", "ям", "ть",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й"
+}, key=len, reverse=True)
+# Основа после отсечения окончания не короче
+MIN_STEM = 3
+
+
+def stem(word: str) -> str:
+    """Отсекает у русского слова возвратную частицу и окончание."""
+    if not CYRILLIC_RE.search(word):
+        return word
+    for suffix in ("ся", "сь"):
+        if word.endswith(suffix) and len(word) - 2 >= MIN_STEM:
+            word = word[:-2]
+            break
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def normalize(text: str) -> List[str]:
+    """Разбивает текст на термы: нижний регистр, ё -> е, без стоп-слов, основы слов."""
+    words = TOKEN_RE.findall((text or "").lower().replace("ё", "е"))
+    return [stem(word) for word in words if word not in STOP_WORDS]
+
+
+class SearchDocument:
+    """Найденный вопрос: открытый или из архива."""
+
+    __slots__ = ("user_id", "username", "question", "answer", "status", "date")
+
+    def __init__(self, user_id: int, username: Optional[str], question: str,
+                 answer: Optional[str], status: str, date: Optional[str]):
+        self.user_id = user_id
+        self.username = username
+        self.question = question
+        self.answer = answer
+        self.status = status
+        self.date = date
+
+    def terms(self) -> set[str]:
+        return set(normalize(f"{self.question} {self.answer or ''} {self.username or ''}"))
+
+
+class SearchIndex:
+    """Инвертированный индекс по тексту вопросов, ответов и именам пользователей.
+
+    Терм - основа слова после нормализации (``normalize``), для каждого
+    терма хранится массив номеров документов. Индекс обновляется при
+    записи: новый или дополненный вопрос заменяет прежний документ
+    пользователя, закрытый вопрос становится документом архива. Замененные
+    документы помечаются удаленными и выбрасываются при компактизации.
+
+    Ранжирование - сумма IDF совпавших термов, при равенстве новые
+    документы выше. Индекс строится из архива и открытых вопросов при
+    запуске (``rebuild``); при нескольких процессах бота каждый процесс
+    видит записи других процессов только после перезапуска.
+    """
+
+    def __init__(self, max_results: int = None, page_size: int = None):
+        self.max_results = max_results or config.SEARCH_MAX_RESULTS
+        self.page_size = page_size or config.SEARCH_PAGE_SIZE
+        self._docs: List[Optional[SearchDocument]] = []
+        self._postings: Dict[str, array] = {}
+        # ID пользователя -> номер документа его открытого вопроса
+        self._open: Dict[int, int] = {}
+        self._removed = 0
+        self._searches: "OrderedDict[int, tuple[str, List[SearchDocument]]]" = OrderedDict()
+        self._ids = itertools.count(1)
+
+    def __len__(self) -> int:
+        return len(self._docs) - self._removed
+
+    def rebuild(self, open_questions: Dict[str, Dict[str, Any]]) -> None:
+        """Строит индекс заново по архиву и открытым вопросам (``{user_id: вопрос}``)."""
+        self._docs.clear()
+        self._postings.clear()
+        self._open.clear()
+        self._removed = 0
+        for record in archive.records():
+            self._add(self._archived_document(record))
+        for user_id, question_data in open_questions.items():
+            self.add_open(int(user_id), question_data)
+        logger.info(f"Поисковый индекс: {len(self)} документов, {len(self._postings)} термов")
+
+    def add_open(self, user_id: int, question_data: Optional[Dict[str, Any]]) -> None:
+        """Индексирует новый или дополненный открытый вопрос пользователя."""
+        self._remove_open(user_id)
+        if question_data:
+            self._open[user_id] = self._add(SearchDocument(
+                user_id, question_data.get("username"), question_data.get("question") or "",
+                None, STATUS_OPEN, question_data.get("created_at")
+            ))
+
+    def add_archived(self, record: Dict[str, Any]) -> None:
+        """Заменяет открытый вопрос пользователя записью архива."""
+        self._remove_open(record["user_id"])
+        self._add(self._archived_document(record))
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[SearchDocument]:
+        """Возвращает самые подходящие документы (не больше ``limit``)."""
+        limit = limit or self.max_results
+        total = len(self._docs)
+        # [вес, номера документов, текущая позиция] по возрастанию веса; вес -
+        # IDF в целых миллионных, чтобы суммы не зависели от порядка сложения
+        lists = []
+        for term in set(normalize(query)):
+            postings = self._postings.get(term)
+            if postings:
+                weight = round(math.log(1 + total / len(postings)) * 1_000_000)
+                lists.append([weight, postings, len(postings) - 1])
+        lists.sort(key=lambda item: item[0])
+        docs = self._docs
+        best: List[tuple[int, int]] = []
+        # Документы просматриваются от новых к старым (при равной оценке выше
+        # новый). Когда лучшие набраны, частые термы, которые вместе не
+        # набирают оценку худшего из лучших, сами кандидатов не дают
+        # (MaxScore): кандидаты берутся из редких списков, а частые только
+        # проверяются бинарным поиском
+        essential = 0
+        non_essential_score = 0
+        while True:
+            candidates = [item for item in lists[essential:] if item[2] >= 0]
+            if not candidates:
+                break
+            doc_id = max(item[1][item[2]] for item in candidates)
+            score = 0
+            for item in candidates:
+                if item[1][item[2]] == doc_id:
+                    score += item[0]
+                    item[2] -= 1
+            if docs[doc_id] is None:
+                continue
+            for item in lists[:essential]:
+                position = bisect.bisect_right(item[1], doc_id, 0, item[2] + 1) - 1
+                item[2] = position
+                if position >= 0 and item[1][position] == doc_id:
+                    score += item[0]
+            if len(best) < limit:
+                heapq.heappush(best, (score, doc_id))
+            elif score > best[0][0]:
+                heapq.heapreplace(best, (score, doc_id))
+            else:
+                continue
+            if len(best) == limit:
+                while essential < len(lists) and non_essential_score + lists[essential][0] <= best[0][0]:
+                    non_essential_score += lists[essential][0]
+                    essential += 1
+                if 0 < essential < len(lists) and sum(item[0] for item in lists[essential:]) <= best[0][0]:
+                    # Оставшиеся частые термы и без редких не набирают порог:
+                    # кандидат должен быть в обоих группах, пересекаем их целиком
+                    self._finish_by_intersection(lists, essential, best)
+                    break
+        best.sort(reverse=True)
+        return [docs[doc_id] for _, doc_id in best]
+
+    def _finish_by_intersection(self, lists: List[list], essential: int, best: List[tuple[int, int]]) -> None:
+        """Досчитывает лучшие по документам, которые есть и в частых, и в редких списках."""
+        essential_ids = set().union(*(item[1][:item[2] + 1] for item in lists[essential:]))
+        other_ids = set().union(*(item[1][:item[2] + 1] for item in lists[:essential]))
+        for doc_id in sorted(essential_ids & other_ids, reverse=True):
+            if self._docs[doc_id] is None:
+                continue
+            score = 0
+            for weight, postings, position in lists:
+                found = bisect.bisect_right(postings, doc_id, 0, position + 1) - 1
+                if found >= 0 and postings[found] == doc_id:
+                    score += weight
+            if score > best[0][0]:
+                heapq.heapreplace(best, (score, doc_id))
+
+    def start(self, query: str) -> Optional[tuple[str, InlineKeyboardMarkup]]:
+        """Выполняет поиск и готовит первую страницу (None, если ничего не найдено)."""
+        results = self.search(query)
+        if not results:
+            return None
+        search_id = next(self._ids)
+        self._searches[search_id] = (query, results)
+        while len(self._searches) > MAX_SEARCHES:
+            self._searches.popitem(last=False)
+        return self.render(search_id, 0)
+
+    def render(self, search_id: int, page: int) -> Optional[tuple[str, InlineKeyboardMarkup]]:
+        """Готовит текст и клавиатуру страницы результатов (None, если поиск забыт)."""
+        saved = self._searches.get(search_id)
+        if saved is None:
+            return None
+        query, results = saved
+        pages = (len(results) + self.page_size - 1) // self.page_size
+        page = min(max(page, 0), pages - 1)
+        start = page * self.page_size
+        text = format_search_results(query, results[start:start + self.page_size], start + 1, page, pages)
+        return text, get_search_keyboard(search_id, page, pages)
+
+    @staticmethod
+    def _archived_document(record: Dict[str, Any]) -> SearchDocument:
+        return SearchDocument(
+            record["user_id"], record.get("username"), record.get("question") or "",
+            record.get("answer"), record.get("resolution"), record.get("resolved_at")
+        )
+
+    def _add(self, doc: SearchDocument) -> int:
+        doc_id = len(self._docs)
+        self._docs.append(doc)
+        self._index(doc_id, doc.terms())
+        return doc_id
+
+    def _index(self, doc_id: int, terms: Iterable[str]) -> None:
+        postings = self._postings
+        for term in terms:
+            ids = postings.get(term)
+            if ids is None:
+                ids = postings[term] = array("I")
+            ids.append(doc_id)
+
+    def _remove_open(self, user_id: int) -> None:
+        doc_id = self._open.pop(user_id, None)
+        if doc_id is None:
+            return
+        self._docs[doc_id] = None
+        self._removed += 1
+        if self._removed > max(1000, len(self._docs) // 2):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Перенумеровывает документы без удаленных и перестраивает списки термов."""
+        remap = {}
+        docs = []
+        for doc_id, doc in enumerate(self._docs):
+            if doc is not None:
+                remap[doc_id] = len(docs)
+                docs.append(doc)
+        self._docs = docs
+        self._postings.clear()
+        for doc_id, doc in enumerate(docs):
+            self._index(doc_id, doc.terms())
+        self._open = {user_id: remap[doc_id] for user_id, doc_id in self._open.items()}
+        self._removed = 0
+
+
+# Глобальный поисковый индекс
+search_index = SearchIndex()
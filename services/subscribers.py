@@ -0,0 +1,130 @@
+"""Реестр пользователей, которым бот может отправлять рассылки."""
+import logging
+import os
+import sys
+from array import array
+from typing import BinaryIO, Optional, Set
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Размер записи файла реестра (int64)
+RECORD_SIZE = 8
+
+
+class SubscriberRegistry:
+    """Пользователи, которые писали боту (/start или вопрос).
+
+    В памяти - множество id, на диске - журнал из 8-байтовых записей
+    (``array('q')``, little-endian): новый пользователь дописывается в
+    конец, удаленный (заблокировал бота) - записью с минусом. Повторные
+    /start файл не трогают, поэтому запись идет только при первом
+    обращении пользователя.
+
+    Процессы бота дописывают в один файл; ``refresh`` дочитывает записи
+    других процессов с места, где остановилось прошлое чтение. Файл
+    переписывается без удаленных записей при загрузке, если их накопилось
+    больше, чем живых (только при одном процессе).
+    """
+
+    def __init__(self, file_path: str = None):
+        self.file_path = file_path or config.SUBSCRIBERS_FILE
+        self._ids: Set[int] = set()
+        self._offset = 0
+        self._file: Optional[BinaryIO] = None
+        self.pruned = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._ids
+
+    def load(self) -> None:
+        """Читает реестр с диска целиком."""
+        self._ids = set()
+        self._offset = 0
+        records = self.refresh()
+        if config.WORKERS == 1 and records > 2 * len(self._ids) + 1000:
+            self._rewrite()
+
+    def refresh(self) -> int:
+        """Дочитывает записи, добавленные после прошлого чтения; возвращает число записей в файле."""
+        if not os.path.exists(self.file_path):
+            return 0
+        with open(self.file_path, "rb") as f:
+            f.seek(self._offset)
+            raw = f.read()
+        # Недописанная после сбоя запись не читается
+        raw = raw[:len(raw) - len(raw) % RECORD_SIZE]
+        records = array("q")
+        records.frombytes(raw)
+        if sys.byteorder == "big":
+            records.byteswap()
+        ids = self._ids
+        for value in records:
+            if value > 0:
+                ids.add(value)
+            else:
+                ids.discard(-value)
+        self._offset += len(raw)
+        return self._offset // RECORD_SIZE
+
+    def add(self, user_id: int) -> bool:
+        """Добавляет пользователя; False, если он уже в реестре."""
+        if user_id in self._ids or user_id <= 0:
+            return False
+        self._ids.add(user_id)
+        self._append(user_id)
+        return True
+
+    def remove(self, user_id: int) -> bool:
+        """Удаляет пользователя (заблокировал бота или удалил аккаунт)."""
+        if user_id not in self._ids:
+            return False
+        self._ids.discard(user_id)
+        self._append(-user_id)
+        self.pruned += 1
+        return True
+
+    def snapshot(self, after: int = 0) -> array:
+        """Id пользователей больше ``after`` по возрастанию (порядок рассылки)."""
+        return array("q", sorted(user_id for user_id in self._ids if user_id > after))
+
+    def close(self) -> None:
+        """Закрывает файл реестра."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _append(self, value: int) -> None:
+        records = array("q", (value,))
+        if sys.byteorder == "big":
+            records.byteswap()
+        try:
+            if self._file is None:
+                # Без буфера: запись в 8 байт в режиме дозаписи не перемешается с записями других процессов
+                self._file = open(self.file_path, "ab", buffering=0)
+            self._file.write(records.tobytes())
+        except OSError as e:
+            logger.error(f"Ошибка записи реестра подписчиков {self.file_path}: {e}")
+
+    def _rewrite(self) -> None:
+        """Переписывает файл только с живыми записями (атомарно)."""
+        records = self.snapshot()
+        if sys.byteorder == "big":
+            records.byteswap()
+        tmp_path = f"{self.file_path}.tmp"
+        try:
+            self.close()
+            with open(tmp_path, "wb") as f:
+                f.write(records.tobytes())
+            os.replace(tmp_path, self.file_path)
+            self._offset = len(records) * RECORD_SIZE
+        except OSError as e:
+            logger.error(f"Ошибка сжатия реестра подписчиков {self.file_path}: {e}")
+
+
+# Глобальный реестр подписчиков
+subscribers = SubscriberRegistry()
@@ -0,0 +1,247 @@
+"""Подсказки ответов на новые вопросы по прошлым ответам операторов."""
+import hashlib
+import json
+import logging
+import os
+import time
+import zlib
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from config import config
+from services.archive import RESOLUTION_ANSWERED
+from services.search import normalize
+
+logger = logging.getLogger(__name__)
+
+# Не отвечать автоматически одному пользователю чаще, сек: если подсказка
+# не помогла, следующий вопрос получит оператор
+AUTO_REPLY_COOLDOWN = 3600
+
+
+def answer_key(answer: str) -> str:
+    """Короткий ключ текста ответа: одинаковый во всех процессах бота."""
+    return hashlib.blake2b(answer.strip().encode("utf-8"), digest_size=6).hexdigest()
+
+
+class SuggestionIndex:
+    """Ищет прошлые вопросы, похожие на новый, и предлагает их ответы.
+
+    Вопрос превращается в вектор TF-IDF хешированных признаков: основы
+    слов (как в поиске) и символьные триграммы основ, так что опечатки и
+    другие формы слова тоже совпадают. Векторы последних SUGGEST_MAX_ITEMS
+    отвеченных вопросов - строки матрицы NumPy, нормированные по длине;
+    похожесть нового вопроса на все прошлые - одно умножение матрицы на
+    вектор (косинусная мера).
+
+    Индекс дополняется при каждом ответе оператора. IDF для новых строк
+    берется текущий, а все строки пересчитываются, когда их с прошлого
+    пересчета добавилось больше десятой части. Индекс сохраняется в
+    SUGGEST_INDEX_FILE при остановке и может быть построен заново по архиву
+    без бота (``rebuild_suggestions.py``).
+    """
+
+    def __init__(self, dim: int = None, max_items: int = None, min_score: float = None,
+                 auto_reply: float = None, file_path: str = None):
+        self.dim = dim or config.SUGGEST_DIM
+        self.max_items = max_items or config.SUGGEST_MAX_ITEMS
+        self.min_score = config.SUGGEST_MIN_SCORE if min_score is None else min_score
+        self.auto_reply = config.SUGGEST_AUTO_REPLY if auto_reply is None else auto_reply
+        self.file_path = file_path or config.SUGGEST_INDEX_FILE
+        self._auto_replied: "OrderedDict[int, float]" = OrderedDict()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+        self._df = np.zeros(self.dim, dtype=np.float64)
+        self._size = 0
+        # Слот матрицы -> признаки вопроса, ответ и его ключ
+        self._features: List[tuple[np.ndarray, np.ndarray]] = []
+        self._answers: List[str] = []
+        self._keys: List[str] = []
+        # Ключ ответа -> последний слот с этим ответом
+        self._slot_of: Dict[str, int] = {}
+        self._next_slot = 0
+        self._stale = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, question: str, answer: str) -> None:
+        """Добавляет отвеченный вопрос (самый старый вытесняется, если индекс полон)."""
+        answer = (answer or "").strip()
+        indices, counts = self._hash(question)
+        if not answer or not len(indices):
+            return
+        if self._size < self.max_items:
+            slot = self._size
+            self._size += 1
+            if slot >= len(self._matrix):
+                capacity = min(self.max_items, max(64, len(self._matrix) * 2))
+                matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+                matrix[:slot] = self._matrix[:slot]
+                self._matrix = matrix
+            self._features.append((indices, counts))
+            self._answers.append(answer)
+            self._keys.append("")
+        else:
+            slot = self._next_slot
+            self._next_slot = (slot + 1) % self.max_items
+            self._df[self._features[slot][0]] -= 1
+            if self._slot_of.get(self._keys[slot]) == slot:
+                del self._slot_of[self._keys[slot]]
+            self._features[slot] = (indices, counts)
+            self._answers[slot] = answer
+        key = answer_key(answer)
+        self._keys[slot] = key
+        self._slot_of[key] = slot
+        self._df[indices] += 1
+        self._matrix[slot] = self._weigh(indices, counts)
+        self._stale += 1
+        if self._stale > max(100, self._size // 10):
+            self._reweigh()
+
+    def suggest(self, question: str, limit: int = None) -> List[tuple[str, float, str]]:
+        """Лучшие ответы на похожие вопросы: [(ключ ответа, похожесть, ответ)]."""
+        limit = limit or config.SUGGEST_COUNT
+        if not self._size:
+            return []
+        indices, counts = self._hash(question)
+        if not len(indices):
+            return []
+        scores = self._matrix[:self._size] @ self._weigh(indices, counts)
+        # С запасом: у похожих вопросов часто один и тот же ответ
+        top = min(self._size, limit * 4)
+        candidates = np.argpartition(-scores, top - 1)[:top]
+        result = []
+        seen = set()
+        for slot in candidates[np.argsort(-scores[candidates])]:
+            score = float(scores[slot])
+            if score < self.min_score or len(result) >= limit:
+                break
+            key = self._keys[slot]
+            if key not in seen:
+                seen.add(key)
+                result.append((key, score, self._answers[slot]))
+        return result
+
+    def answer(self, key: str) -> Optional[str]:
+        """Текст ответа по ключу (None, если ответ уже вытеснен из индекса)."""
+        slot = self._slot_of.get(key)
+        return self._answers[slot] if slot is not None else None
+
+    def auto_answer(self, user_id: int, suggestions: List[tuple[str, float, str]]) -> Optional[str]:
+        """Ответ, который можно отправить сразу, без оператора (если подсказка уверенная)."""
+        if not self.auto_reply or not suggestions or suggestions[0][1] < self.auto_reply:
+            return None
+        now = time.monotonic()
+        while self._auto_replied and next(iter(self._auto_replied.values())) < now - AUTO_REPLY_COOLDOWN:
+            self._auto_replied.popitem(last=False)
+        if user_id in self._auto_replied:
+            return None
+        self._auto_replied[user_id] = now
+        return suggestions[0][2]
+
+    def rebuild(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Строит индекс заново по записям архива (берет последние отвеченные)."""
+        recent = deque(
+            ((record.get("question") or "", record["answer"]) for record in records
+             if record.get("resolution") == RESOLUTION_ANSWERED and record.get("answer")),
+            maxlen=self.max_items
+        )
+        self._reset()
+        for question, answer in recent:
+            self.add(question, answer)
+        self._reweigh()
+        logger.info(f"Индекс подсказок: {self._size} ответов")
+
+    def save(self, file_path: str = None) -> None:
+        """Сохраняет индекс (через временный файл, чтобы не оставить его недописанным)."""
+        file_path = file_path or self.file_path
+        order = [(slot + self._next_slot) % self._size for slot in range(self._size)] if self._size else []
+        features = [self._features[slot] for slot in order]
+        temp_path = f"{file_path}.tmp"
+        with open(temp_path, "wb") as f:
+            np.savez(
+                f,
+                dim=np.array(self.dim),
+                indices=np.concatenate([indices for indices, _ in features] or [np.zeros(0, np.int64)]),
+                counts=np.concatenate([counts for _, counts in features] or [np.zeros(0, np.float32)]),
+                lengths=np.array([len(indices) for indices, _ in features], dtype=np.int64),
+                # Тексты ответов - JSON в байтах, без pickle
+                answers=np.frombuffer(
+                    json.dumps([self._answers[slot] for slot in order], ensure_ascii=False).encode("utf-8"),
+                    dtype=np.uint8
+                )
+            )
+        os.replace(temp_path, file_path)
+
+    def load(self, file_path: str = None) -> bool:
+        """Загружает сохраненный индекс; False, если файла нет или он другого размера признаков."""
+        file_path = file_path or self.file_path
+        if not os.path.exists(file_path):
+            return False
+        with np.load(file_path) as data:
+            if int(data["dim"]) != self.dim:
+                logger.warning(f"Индекс подсказок {file_path} построен с другим SUGGEST_DIM")
+                return False
+            answers = json.loads(data["answers"].tobytes().decode("utf-8"))
+            bounds = np.cumsum(data["lengths"])[:-1]
+            indices = np.split(data["indices"], bounds) if len(answers) else []
+            counts = np.split(data["counts"], bounds) if len(answers) else []
+        self._reset()
+        for answer, item_indices, item_counts in list(zip(answers, indices, counts))[-self.max_items:]:
+            self._add_features(item_indices, item_counts, answer)
+        self._reweigh()
+        logger.info(f"Загружен индекс подсказок: {self._size} ответов")
+        return True
+
+    def _add_features(self, indices: np.ndarray, counts: np.ndarray, answer: str) -> None:
+        """Добавляет готовые признаки вопроса (при загрузке, без пересчета строк)."""
+        self._features.append((indices, counts))
+        self._answers.append(answer)
+        key = answer_key(answer)
+        self._keys.append(key)
+        self._slot_of[key] = self._size
+        self._df[indices] += 1
+        self._size += 1
+
+    def _hash(self, text: str) -> tuple[np.ndarray, np.ndarray]:
+        """Хешированные признаки текста: номера признаков и их частоты со знаком."""
+        buckets: Dict[int, float] = {}
+        for term in normalize(text):
+            padded = f" {term} "
+            for gram in (term, *(padded[i:i + 3] for i in range(len(padded) - 2))):
+                value = zlib.crc32(gram.encode("utf-8"))
+                index = value % self.dim
+                # Знак из старшего бита: коллизии хешей чаще гасят друг друга, чем складываются
+                buckets[index] = buckets.get(index, 0.0) + (1.0 if value & 0x80000000 else -1.0)
+        return (
+            np.fromiter(buckets.keys(), dtype=np.int64, count=len(buckets)),
+            np.fromiter(buckets.values(), dtype=np.float32, count=len(buckets))
+        )
+
+    def _idf(self) -> np.ndarray:
+        return (np.log((1 + self._size) / (1 + self._df)) + 1).astype(np.float32)
+
+    def _weigh(self, indices: np.ndarray, counts: np.ndarray, idf: np.ndarray = None) -> np.ndarray:
+        """Нормированный вектор TF-IDF."""
+        idf = self._idf() if idf is None else idf
+        vector = np.zeros(self.dim, dtype=np.float32)
+        vector[indices] = counts * idf[indices]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _reweigh(self) -> None:
+        """Пересчитывает все строки матрицы с текущими IDF."""
+        self._matrix = np.zeros((max(self._size, len(self._matrix)), self.dim), dtype=np.float32)
+        idf = self._idf()
+        for slot, (indices, counts) in enumerate(self._features):
+            self._matrix[slot] = self._weigh(indices, counts, idf)
+        self._stale = 0
+
+
+# Глобальный индекс подсказок
+suggestions = SuggestionIndex()
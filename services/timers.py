@@ -0,0 +1,255 @@
+"""Таймеры открытых вопросов: напоминания о сроке ответа, тайм-аут ответа и срок хранения."""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import config
+from database import db
+from services.archive import RESOLUTION_EXPIRED
+from services.outbound import outbound, PRIORITY_ADMIN
+from utils.helpers import format_age, format_sla_reminder
+from utils.keyboards import get_admin_inline_keyboard, get_pending_keyboard
+
+logger = logging.getLogger(__name__)
+
+# Виды таймеров
+SLA = "sla"
+READY = "ready"
+EXPIRE = "expire"
+
+# Сколько таймеров обработать подряд, прежде чем отдать управление event loop
+FIRE_BATCH = 100
+
+
+def _epoch(created_at: Optional[str]) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(created_at).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class QuestionTimers:
+    """Один планировщик на все открытые вопросы.
+
+    Таймеры лежат в куче ``(срок, номер, user_id, вид, created_at)``, и
+    одна задача спит до ближайшего срока, сколько бы вопросов ни было.
+    Переназначенный или отмененный таймер не удаляется из кучи: в
+    ``_live`` хранится номер действующего таймера каждого вида, а старые
+    записи пропускаются при извлечении (куча пересобирается, когда
+    таких записей становится больше, чем живых).
+
+    Виды таймеров:
+
+    * ``sla`` - вопрос ждет ответа дольше QUESTION_SLA: оператору уходит
+      напоминание (напоминания, сработавшие вместе, - одним сообщением);
+    * ``ready`` - оператор нажал «Ответить», но за REPLY_READY_TIMEOUT
+      не ответил: готовность снимается, и его следующее сообщение не
+      уйдет случайно автору этого вопроса;
+    * ``expire`` - вопрос без ответа дольше QUESTION_RETENTION
+      закрывается и переносится в архив.
+
+    Перед срабатыванием таймер сверяется с базой: вопрос, на который уже
+    ответили или который задан заново, пропускается. При запуске таймеры
+    строятся за один проход по открытым вопросам (``rebuild``); вопросы,
+    срок ответа которых прошел, пока бот не работал, повторно не
+    напоминаются. При нескольких процессах каждый ведет таймеры вопросов,
+    которые получил сам, а при запуске таймеры строит первый процесс.
+    """
+
+    def __init__(self, sla: float = None, ready_timeout: float = None, retention: float = None):
+        self.sla = config.QUESTION_SLA if sla is None else sla
+        self.ready_timeout = config.REPLY_READY_TIMEOUT if ready_timeout is None else ready_timeout
+        self.retention = config.QUESTION_RETENTION if retention is None else retention
+        self._heap: List[Tuple[float, int, int, str, Optional[str]]] = []
+        self._live: Dict[Tuple[int, str], int] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._resolve: Optional[Callable[..., None]] = None
+        # Напоминания, сработавшие за один проход: оператор -> вопросы
+        self._overdue: Dict[int, List[Tuple[int, Dict[str, Any]]]] = {}
+        # Счетчики
+        self.reminded = 0
+        self.ready_expired = 0
+        self.expired = 0
+
+    @property
+    def running(self) -> bool:
+        """Запущен ли планировщик."""
+        return self._task is not None
+
+    def start(self, resolve: Callable[..., None]) -> None:
+        """Запускает планировщик.
+
+        ``resolve(user_id, question_data, resolution)`` закрывает вопрос с
+        истекшим сроком хранения (перенос в архив и снятие с оператора).
+        """
+        if self.running:
+            return
+        self._resolve = resolve
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает планировщик."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def rebuild(self, pending: Dict[str, Dict[str, Any]]) -> None:
+        """Строит таймеры по открытым вопросам базы в пуле потоков.
+
+        Готовая куча подменяется, и планировщик будится уже в потоке event loop.
+        """
+        heap, live = await asyncio.get_running_loop().run_in_executor(None, self._build, pending)
+        self._heap = heap
+        self._live = live
+        self._wakeup.set()
+
+    def _build(self, pending: Dict[str, Dict[str, Any]]) -> Tuple[list, dict]:
+        """Кучу и номера действующих таймеров за один проход по открытым вопросам."""
+        now = time.time()
+        heap = []
+        live = {}
+        for user_id_str, data in pending.items():
+            user_id = int(user_id_str)
+            created_at = data.get("created_at")
+            created = _epoch(created_at)
+            timers = []
+            if created is not None:
+                if self.sla and created + self.sla > now:
+                    timers.append((created + self.sla, SLA))
+                if self.retention:
+                    timers.append((created + self.retention, EXPIRE))
+            if self.ready_timeout and data.get("admin_ready_to_reply"):
+                # Когда оператор нажал «Ответить», база не хранит: отсчет начинается заново
+                timers.append((now + self.ready_timeout, READY))
+            for when, kind in timers:
+                seq = next(self._seq)
+                live[(user_id, kind)] = seq
+                heap.append((when, seq, user_id, kind, created_at))
+        heapq.heapify(heap)
+        return heap, live
+
+    def track(self, user_id: int, created_at: Optional[str]) -> None:
+        """Ставит таймеры нового вопроса: напоминание и срок хранения."""
+        created = _epoch(created_at)
+        if created is None:
+            return
+        if self.sla:
+            self._schedule(user_id, SLA, created + self.sla, created_at)
+        if self.retention:
+            self._schedule(user_id, EXPIRE, created + self.retention, created_at)
+
+    def ready(self, user_id: int) -> None:
+        """Ставит тайм-аут ответа: оператор нажал «Ответить»."""
+        if self.ready_timeout:
+            self._schedule(user_id, READY, time.time() + self.ready_timeout, None)
+
+    def forget(self, user_id: int) -> None:
+        """Отменяет таймеры вопроса (вопрос закрыт)."""
+        for kind in (SLA, READY, EXPIRE):
+            self._live.pop((user_id, kind), None)
+        if len(self._heap) > 2 * len(self._live) + 1000:
+            self._heap = [entry for entry in self._heap if self._live.get((entry[2], entry[3])) == entry[1]]
+            heapq.heapify(self._heap)
+
+    def stats(self) -> Dict[str, float]:
+        """Счетчики планировщика."""
+        return {
+            "timers": len(self._live),
+            "heap": len(self._heap),
+            "next_in": self._heap[0][0] - time.time() if self._heap else -1,
+            "reminded": self.reminded,
+            "ready_expired": self.ready_expired,
+            "expired": self.expired
+        }
+
+    def _schedule(self, user_id: int, kind: str, when: float, created_at: Optional[str]) -> None:
+        seq = next(self._seq)
+        self._live[(user_id, kind)] = seq
+        heapq.heappush(self._heap, (when, seq, user_id, kind, created_at))
+        # Будим планировщик, только если этот таймер стал ближайшим
+        if self._heap[0][1] == seq:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            fired = 0
+            expired = self.expired
+            while self._heap and self._heap[0][0] <= time.time():
+                _, seq, user_id, kind, created_at = heapq.heappop(self._heap)
+                if self._live.get((user_id, kind)) != seq:
+                    continue
+                del self._live[(user_id, kind)]
+                try:
+                    self._fire(user_id, kind, created_at)
+                except Exception as e:
+                    logger.error(f"Ошибка таймера {kind} вопроса {user_id}: {e}", exc_info=True)
+                fired += 1
+                if fired % FIRE_BATCH == 0:
+                    # Разбор накопившихся таймеров (например, при запуске) не задерживает обновления
+                    await asyncio.sleep(0)
+            self._send_reminders()
+            if self.expired > expired:
+                logger.info(
+                    f"⌛ Вопросов без ответа дольше {format_age(int(self.retention))} "
+                    f"перенесено в архив: {self.expired - expired}"
+                )
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _fire(self, user_id: int, kind: str, created_at: Optional[str]) -> None:
+        question_data = db.get_question(user_id)
+        if question_data is None or question_data.get("answered"):
+            return
+        if kind != READY and question_data.get("created_at") != created_at:
+            # Пользователь задал новый вопрос: у него свои таймеры
+            return
+        operator_id = question_data.get("operator_id") or config.default_operator_id
+
+        if kind == SLA:
+            self._overdue.setdefault(operator_id, []).append((user_id, question_data))
+            self.reminded += 1
+        elif kind == READY:
+            if not question_data.get("admin_ready_to_reply") or not db.clear_admin_ready(user_id):
+                return
+            self.ready_expired += 1
+            outbound.send_message(
+                operator_id,
+                f"⌛ Ответ пользователю (ID: {user_id}) не пришел за {format_age(int(self.ready_timeout))}, "
+                f"вопрос снова ждет ответа. Чтобы ответить, нажмите «💬 Ответить» еще раз.",
+                priority=PRIORITY_ADMIN,
+                reply_markup=get_admin_inline_keyboard(user_id)
+            )
+        elif kind == EXPIRE:
+            self.expired += 1
+            self._resolve(user_id, question_data, RESOLUTION_EXPIRED)
+
+    def _send_reminders(self) -> None:
+        """Отправляет операторам накопленные напоминания (одно сообщение на оператора)."""
+        overdue, self._overdue = self._overdue, {}
+        page_size = config.QUESTIONS_PAGE_SIZE
+        for operator_id, items in overdue.items():
+            shown = items[:page_size]
+            outbound.send_message(
+                operator_id,
+                format_sla_reminder(
+                    shown, len(items), format_age(int(self.sla)),
+                    questions_hint=operator_id == config.ADMIN_ID
+                ),
+                priority=PRIORITY_ADMIN,
+                reply_markup=get_pending_keyboard([user_id for user_id, _ in shown], "0", None, None)
+            )
+
+
+# Глобальный планировщик таймеров вопросов
+timers = QuestionTimers()
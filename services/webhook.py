@@ -0,0 +1,194 @@
+"""Обработка webhook-обновлений ограниченным пулом обработчиков."""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+
+from config import config
+
+
+logger = logging.getLogger(__name__)
+
+
+def chat_key(update: Dict[str, Any]) -> Any:
+    """Определяет чат (или пользователя) обновления для сохранения порядка."""
+    for key, event in update.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        chat = event.get("chat") or (event.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+        sender = event.get("from") or event.get("user")
+        if sender:
+            return sender["id"]
+    return update.get("update_id")
+
+
+class UpdateWorkerPool:
+    """Пул обработчиков обновлений с ограниченными очередями.
+
+    Обновления распределяются по очередям по чату, поэтому обновления
+    одного чата обрабатываются строго по порядку, а разные чаты -
+    параллельно. Размер очередей ограничен, при переполнении ``submit``
+    возвращает False.
+
+    Если вместе с обновлением передан future ``reply``, метод, который вернул
+    обработчик, не выполняется, а передается в этот future - его отправит
+    webhook-обработчик в теле ответа Telegram. Если future к этому моменту
+    уже отменен (ответ на webhook ушел), метод выполняется обычным запросом.
+
+    Пока событие ``ready`` не установлено (бот загружает базу), обновления
+    копятся в очередях и обрабатываются после загрузки.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, workers: int = None,
+                 max_queue: int = None, enqueue_timeout: float = None,
+                 ready: Optional[asyncio.Event] = None, **data: Any):
+        self.dispatcher = dispatcher
+        self.ready = ready
+        self.workers = workers or config.WEBHOOK_WORKERS
+        self.max_queue = max_queue or config.WEBHOOK_MAX_QUEUE
+        self.enqueue_timeout = (
+            config.WEBHOOK_ENQUEUE_TIMEOUT if enqueue_timeout is None else enqueue_timeout
+        )
+        self.data = data
+        self._queues: list[asyncio.Queue] = []
+        self._tasks: list[asyncio.Task] = []
+        # Счетчики
+        self.busy = 0
+        self.busy_seconds = 0.0
+        self.processed = 0
+        self.rejected = 0
+        self.webhook_replies = 0
+        self._started_at = 0.0
+
+    def start(self) -> None:
+        """Запускает обработчики."""
+        if self._tasks:
+            return
+        shard_size = max(1, self.max_queue // self.workers)
+        self._queues = [asyncio.Queue(maxsize=shard_size) for _ in range(self.workers)]
+        self._tasks = [asyncio.create_task(self._worker(queue)) for queue in self._queues]
+        self._started_at = time.monotonic()
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Дорабатывает очереди и останавливает обработчики."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)), timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Не дождались обработки {self.queue_depth} обновлений")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, bot: Bot, update: Dict[str, Any],
+                     reply: Optional[asyncio.Future] = None) -> bool:
+        """Ставит обновление в очередь его чата; False, если очередь переполнена."""
+        self.start()
+        queue = self._queues[hash(chat_key(update)) % self.workers]
+        item = (bot, update, reply)
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(queue.put(item), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                return False
+        return True
+
+    @property
+    def queue_depth(self) -> int:
+        """Число обновлений в очередях."""
+        return sum(queue.qsize() for queue in self._queues)
+
+    def stats(self) -> Dict[str, float]:
+        """Счетчики пула."""
+        uptime = time.monotonic() - self._started_at if self._tasks else 0.0
+        return {
+            "queue_depth": self.queue_depth,
+            "workers": self.workers,
+            "busy": self.busy,
+            "utilization": self.busy_seconds / (uptime * self.workers) if uptime else 0.0,
+            "processed": self.processed,
+            "rejected": self.rejected,
+            "webhook_replies": self.webhook_replies
+        }
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        if self.ready is not None:
+            await self.ready.wait()
+        while True:
+            bot, update, reply = await queue.get()
+            self.busy += 1
+            started = time.monotonic()
+            try:
+                result = await self._process(bot, update)
+                await self._reply(bot, result, reply)
+            except Exception as e:
+                logger.error(f"Ошибка обработки обновления: {e}", exc_info=True)
+            finally:
+                if reply is not None and not reply.done():
+                    reply.set_result(None)
+                self.busy -= 1
+                self.busy_seconds += time.monotonic() - started
+                self.processed += 1
+                queue.task_done()
+
+    async def _process(self, bot: Bot, update: Dict[str, Any]) -> Any:
+        return await self.dispatcher.feed_raw_update(bot=bot, update=update, **self.data)
+
+    async def _reply(self, bot: Bot, result: Any, reply: Optional[asyncio.Future]) -> None:
+        """Отдает метод в ответ на webhook, а если поздно - выполняет его сам."""
+        if not isinstance(result, TelegramMethod):
+            return
+        if reply is not None and not reply.done():
+            reply.set_result(result)
+            self.webhook_replies += 1
+            return
+        await self.dispatcher.silent_call_request(bot=bot, result=result)
+
+
+class PooledRequestHandler(SimpleRequestHandler):
+    """Webhook-обработчик: передает обновление в пул и отвечает Telegram.
+
+    Ответ ждет окончания обработки не дольше ``reply_timeout``: если
+    обработчик вернул метод Bot API, он уходит в теле ответа на webhook
+    вместо отдельного запроса. Если пул переполнен, отвечает 503 -
+    Telegram повторит доставку позже.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, pool: Optional[UpdateWorkerPool] = None,
+                 reply_timeout: float = None, ready: Optional[asyncio.Event] = None, **data: Any):
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, **data)
+        self.pool = pool or UpdateWorkerPool(dispatcher, ready=ready, **data)
+        self.reply_timeout = config.WEBHOOK_REPLY_TIMEOUT if reply_timeout is None else reply_timeout
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+        reply = asyncio.get_running_loop().create_future() if self.reply_timeout > 0 else None
+        if not await self.pool.submit(bot, update, reply):
+            return web.Response(status=503, text="Overloaded")
+        result = None
+        if reply is not None:
+            try:
+                # По таймауту future отменяется, и метод выполнит сам пул
+                result = await asyncio.wait_for(reply, self.reply_timeout)
+            except asyncio.TimeoutError:
+                pass
+        return web.Response(body=self._build_response_writer(bot=bot, result=result))
+
+    async def close(self) -> None:
+        """Дорабатывает очередь обновлений и закрывает сессию бота."""
+        await self.pool.stop()
+        await super().close()
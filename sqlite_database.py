@@ -0,0 +1,286 @@
+"""Хранилище вопросов в SQLite."""
+import logging
+import sqlite3
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from datetime import datetime
+from config import config
+from database import QuestionsStorage
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    user_id INTEGER PRIMARY KEY,
+    question TEXT NOT NULL,
+    username TEXT,
+    full_name TEXT,
+    created_at TEXT NOT NULL,
+    admin_ready_to_reply INTEGER NOT NULL DEFAULT 0,
+    answered INTEGER NOT NULL DEFAULT 0,
+    operator_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_questions_pending
+    ON questions (created_at) WHERE answered = 0;
+CREATE INDEX IF NOT EXISTS idx_questions_ready
+    ON questions (created_at) WHERE admin_ready_to_reply = 1 AND answered = 0;
+"""
+
+# Версия схемы в PRAGMA user_version: шаги _migrate выполняются по одному разу
+SCHEMA_VERSION = 1
+
+COLUMNS = (
+    "user_id, question, username, full_name, created_at, admin_ready_to_reply, answered, operator_id"
+)
+
+# Запросы задаются константами: sqlite3 кэширует подготовленные выражения по тексту
+SQL_UPSERT = (
+    f"INSERT OR REPLACE INTO questions ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SQL_GET = f"SELECT {COLUMNS} FROM questions WHERE user_id = ?"
+SQL_APPEND = (
+    "UPDATE questions SET question = substr(question || char(10) || ?, 1, ?) WHERE user_id = ?"
+)
+SQL_SET_READY = (
+    "UPDATE questions SET admin_ready_to_reply = 1, operator_id = COALESCE(?, operator_id) "
+    "WHERE user_id = ?"
+)
+# У оператора один вопрос, на который он отвечает: выбор нового снимает пометку с прежнего
+SQL_CLEAR_OPERATOR_READY = (
+    "UPDATE questions SET admin_ready_to_reply = 0 "
+    "WHERE admin_ready_to_reply = 1 AND answered = 0 AND user_id != ? AND COALESCE(operator_id, ?) = ?"
+)
+SQL_GET_OPERATOR = "SELECT operator_id FROM questions WHERE user_id = ?"
+SQL_CLEAR_READY = "UPDATE questions SET admin_ready_to_reply = 0 WHERE user_id = ? AND admin_ready_to_reply = 1"
+SQL_SET_ANSWERED = "UPDATE questions SET answered = 1 WHERE user_id = ?"
+SQL_DELETE = "DELETE FROM questions WHERE user_id = ?"
+SQL_PENDING = (
+    f"SELECT {COLUMNS} FROM questions WHERE answered = 0 ORDER BY created_at LIMIT ?"
+)
+# Страница очереди по курсору (created_at, user_id): user_id - rowid, он есть
+# в частичном индексе idx_questions_pending, и страница читается по индексу
+# с позиции курсора. ? = 0 отключает фильтр по @username
+SQL_PENDING_AFTER = (
+    f"SELECT {COLUMNS} FROM questions WHERE answered = 0 AND (created_at, user_id) > (?, ?) "
+    "AND created_at < ? AND (? = 0 OR username LIKE '@%') "
+    "ORDER BY created_at, user_id LIMIT ?"
+)
+# Назад граница по времени сливается с курсором (иначе планировщик берет
+# за верхнюю границу ее, а не курсор, и читает все вопросы между ними)
+SQL_PENDING_BEFORE = (
+    f"SELECT {COLUMNS} FROM questions WHERE answered = 0 AND (created_at, user_id) < (?, ?) "
+    "AND (? = 0 OR username LIKE '@%') "
+    "ORDER BY created_at DESC, user_id DESC LIMIT ?"
+)
+# Курсор и граница времени, когда они не заданы: раньше и позже любой даты ISO
+NO_CURSOR = ("", 0)
+NO_TIME_LIMIT = "9999"
+# Вопросы без оператора (созданные до появления операторов) относятся к оператору по умолчанию
+SQL_READY = (
+    f"SELECT {COLUMNS} FROM questions "
+    "WHERE admin_ready_to_reply = 1 AND answered = 0 AND COALESCE(operator_id, ?) = ? "
+    "ORDER BY created_at LIMIT 1"
+)
+SQL_OPEN_ASSIGNMENTS = "SELECT user_id, operator_id FROM questions WHERE answered = 0"
+SQL_COUNT_TOTAL = "SELECT COUNT(*) FROM questions"
+SQL_COUNT_PENDING = "SELECT COUNT(*) FROM questions WHERE answered = 0"
+SQL_ALL = f"SELECT {COLUMNS} FROM questions ORDER BY created_at"
+
+
+def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    """Преобразует строку таблицы в формат вопроса."""
+    return {
+        "question": row["question"],
+        "username": row["username"],
+        "full_name": row["full_name"],
+        "created_at": row["created_at"],
+        "admin_ready_to_reply": bool(row["admin_ready_to_reply"]),
+        "answered": bool(row["answered"]),
+        "operator_id": row["operator_id"]
+    }
+
+
+class SQLiteQuestionsDatabase(QuestionsStorage):
+    """Хранилище вопросов в SQLite (WAL) с индексами по состоянию вопроса.
+
+    Базу могут одновременно открывать несколько процессов бота: каждое
+    изменение - одно выражение SQL в собственной транзакции, поэтому
+    процессы сразу видят изменения друг друга, а блокировку записи
+    ждут до SQLITE_BUSY_TIMEOUT.
+    """
+
+    def __init__(self, file_path: str = None):
+        """Открывает базу и создает схему."""
+        self.file_path = file_path or config.SQLITE_FILE
+        self._conn = sqlite3.connect(
+            self.file_path, isolation_level=None, timeout=config.SQLITE_BUSY_TIMEOUT
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._conn.executescript(SCHEMA)
+        logging.info(f"Открыта база SQLite {self.file_path}")
+
+    def _migrate(self) -> None:
+        """Добавляет колонки, появившиеся после создания базы, и обновляет схему."""
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(questions)")}
+        if columns and "operator_id" not in columns:
+            try:
+                self._conn.execute("ALTER TABLE questions ADD COLUMN operator_id INTEGER")
+            except sqlite3.OperationalError as e:
+                # Колонку мог одновременно добавить другой процесс бота
+                if "duplicate column" not in str(e):
+                    raise
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            # Индекс по одному флагу answered из первой версии схемы мешал
+            # планировщику выбрать частичные индексы
+            self._conn.execute("DROP INDEX IF EXISTS idx_questions_answered")
+        if version < SCHEMA_VERSION:
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def add_question(self, user_id: int, question: str, username: str = None,
+                     full_name: str = None, operator_id: Optional[int] = None) -> bool:
+        """Добавляет новый вопрос."""
+        self._conn.execute(SQL_UPSERT, (
+            user_id, question, username, full_name,
+            datetime.now().isoformat(), 0, 0, operator_id
+        ))
+        return True
+
+    def get_question(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Получает вопрос пользователя."""
+        row = self._conn.execute(SQL_GET, (user_id,)).fetchone()
+        return _row_to_dict(row) if row else None
+
+    def append_question(self, user_id: int, text: str) -> bool:
+        """Дописывает текст к вопросу пользователя (не длиннее MAX_QUESTION_LENGTH)."""
+        return self._conn.execute(
+            SQL_APPEND, (text, config.MAX_QUESTION_LENGTH, user_id)
+        ).rowcount > 0
+
+    def set_admin_ready(self, user_id: int, operator_id: Optional[int] = None) -> bool:
+        """Помечает, что оператор (если указан - он же забирает вопрос себе) готов ответить.
+
+        Пометка с предыдущего вопроса этого оператора снимается: его следующее
+        сообщение - ответ на вопрос, выбранный последним.
+        """
+        default = config.default_operator_id
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            owner = operator_id
+            if owner is None:
+                row = self._conn.execute(SQL_GET_OPERATOR, (user_id,)).fetchone()
+                owner = row["operator_id"] if row else None
+            owner = owner or default
+            self._conn.execute(SQL_CLEAR_OPERATOR_READY, (user_id, default, owner))
+            updated = self._conn.execute(SQL_SET_READY, (operator_id, user_id)).rowcount > 0
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT" if updated else "ROLLBACK")
+        return updated
+
+    def clear_admin_ready(self, user_id: int) -> bool:
+        """Снимает готовность оператора ответить (вопрос снова ждет ответа)."""
+        return self._conn.execute(SQL_CLEAR_READY, (user_id,)).rowcount > 0
+
+    def mark_answered(self, user_id: int) -> bool:
+        """Помечает вопрос как отвеченный."""
+        return self._conn.execute(SQL_SET_ANSWERED, (user_id,)).rowcount > 0
+
+    def delete_question(self, user_id: int) -> bool:
+        """Удаляет вопрос."""
+        return self._conn.execute(SQL_DELETE, (user_id,)).rowcount > 0
+
+    def get_pending_questions(self, limit: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Возвращает неотвеченные вопросы (самые старые первыми)."""
+        # LIMIT -1 в SQLite означает отсутствие ограничения
+        return {
+            str(row["user_id"]): _row_to_dict(row)
+            for row in self._conn.execute(SQL_PENDING, (-1 if limit is None else limit,))
+        }
+
+    def get_pending_page(self, limit: int, after: Optional[Tuple[str, int]] = None,
+                         before: Optional[Tuple[str, int]] = None, created_before: Optional[str] = None,
+                         with_username: bool = False) -> List[Tuple[int, Dict[str, Any]]]:
+        """Возвращает страницу неотвеченных вопросов по курсору, самые старые первыми."""
+        if before is not None:
+            if created_before and created_before <= before[0]:
+                # Все вопросы раньше created_before идут раньше курсора (created_before, 0)
+                before = (created_before, 0)
+            rows = self._conn.execute(SQL_PENDING_BEFORE, (*before, int(with_username), limit)).fetchall()
+            rows.reverse()
+        else:
+            rows = self._conn.execute(
+                SQL_PENDING_AFTER,
+                (*(after or NO_CURSOR), created_before or NO_TIME_LIMIT, int(with_username), limit)
+            ).fetchall()
+        return [(row["user_id"], _row_to_dict(row)) for row in rows]
+
+    def get_ready_to_reply(self, operator_id: Optional[int] = None) -> Optional[tuple[int, Dict[str, Any]]]:
+        """Возвращает вопрос, на который готов ответить оператор."""
+        default = config.default_operator_id
+        row = self._conn.execute(SQL_READY, (default, operator_id or default)).fetchone()
+        return (row["user_id"], _row_to_dict(row)) if row else None
+
+    def get_open_assignments(self) -> Dict[int, Optional[int]]:
+        """Возвращает операторов неотвеченных вопросов: ID пользователя -> ID оператора."""
+        return dict(self._conn.execute(SQL_OPEN_ASSIGNMENTS).fetchall())
+
+    def get_statistics(self) -> Dict[str, int]:
+        """Возвращает статистику по вопросам."""
+        # Оба счетчика читаем из одного снимка базы
+        self._conn.execute("BEGIN")
+        try:
+            total = self._conn.execute(SQL_COUNT_TOTAL).fetchone()[0]
+            pending = self._conn.execute(SQL_COUNT_PENDING).fetchone()[0]
+        finally:
+            self._conn.execute("COMMIT")
+        return {
+            "total": total,
+            "pending": pending,
+            "answered": total - pending
+        }
+
+    def get_all_questions(self) -> Dict[str, Any]:
+        """Возвращает все вопросы (для админа)."""
+        return {
+            str(row["user_id"]): _row_to_dict(row)
+            for row in self._conn.execute(SQL_ALL)
+        }
+
+    def import_questions(self, questions: Dict[str, Any]) -> int:
+        """Импортирует вопросы в формате questions.json одной транзакцией."""
+        rows = list(self._iter_import_rows(questions))
+        # IMMEDIATE: блокировку записи берем сразу, а не при первом INSERT
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany(SQL_UPSERT, rows)
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+        return len(rows)
+
+    @staticmethod
+    def _iter_import_rows(questions: Dict[str, Any]) -> Iterable[tuple]:
+        """Готовит строки для импорта, приводя старый формат к dict."""
+        now = datetime.now().isoformat()
+        for uid, data in questions.items():
+            if not isinstance(data, dict):
+                # Старый формат: строка с текстом вопроса
+                data = {"question": data}
+            yield (
+                int(uid),
+                data.get("question") or "",
+                data.get("username"),
+                data.get("full_name"),
+                data.get("created_at") or now,
+                int(bool(data.get("admin_ready_to_reply"))),
+                int(bool(data.get("answered"))),
+                data.get("operator_id")
+            )
+
+    def close(self) -> None:
+        """Закрывает соединение с базой."""
+        self._conn.close()
@@ -0,0 +1,9 @@
+"""Окружение тестов.
+
+Бот читает конфигурацию и создает базу при импорте, поэтому, как и в
+бенчмарках, переменные окружения и временный рабочий каталог задаются до
+импорта модулей бота.
+"""
+from benchmarks.common import prepare_environment
+
+prepare_environment(DEDUP_STATE_FILE="")
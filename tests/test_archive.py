@@ -0,0 +1,123 @@
+"""Тесты архива вопросов."""
+import asyncio
+import gzip
+from datetime import date, datetime
+
+import services.archive as archive_module
+from config import config
+from services.archive import RESOLUTION_ANSWERED, QuestionArchive
+
+
+def set_today(monkeypatch, day: str) -> None:
+    """Подменяет текущую дату архива."""
+    class FixedDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.fromisoformat(f"{day}T12:00:00")
+
+    monkeypatch.setattr(archive_module, "datetime", FixedDatetime)
+
+
+def question(index: int) -> dict:
+    return {"question": f"вопрос {index}", "created_at": "2024-01-01T10:00:00"}
+
+
+def test_segments_rotate_by_size_and_day(tmp_path, monkeypatch):
+    archive = QuestionArchive(str(tmp_path), segment_bytes=600)
+    set_today(monkeypatch, "2024-01-01")
+    for index in range(10):
+        archive.add(index, question(index), RESOLUTION_ANSWERED, answer="ответ")
+    set_today(monkeypatch, "2024-01-02")
+    for index in range(10, 12):
+        archive.add(index, question(index), RESOLUTION_ANSWERED, answer="ответ")
+    archive.close()
+
+    names = [path.rsplit("/", 1)[1] for path in archive.segments()]
+    first_day = [name for name in names if name.startswith("archive-20240101-")]
+    assert len(first_day) > 1
+    assert names[-1] == "archive-20240102-0001.jsonl.gz"
+    # Ни одна запись не потерялась при смене сегментов, порядок сохранен
+    assert [record["user_id"] for record in archive.records()] == list(range(12))
+
+
+def test_records_filter_by_resolution_date(tmp_path, monkeypatch):
+    archive = QuestionArchive(str(tmp_path))
+    for day, user_id in (("2024-01-01", 1), ("2024-01-02", 2), ("2024-01-03", 3)):
+        set_today(monkeypatch, day)
+        archive.add(user_id, question(user_id), RESOLUTION_ANSWERED)
+    archive.close()
+
+    records = archive.records(since=date(2024, 1, 2), until=date(2024, 1, 2))
+    # Записи читаются потоково, а не списком
+    assert iter(records) is records
+    assert [record["user_id"] for record in records] == [2]
+    assert [record["user_id"] for record in archive.records(since=date(2024, 1, 2))] == [2, 3]
+    assert [record["user_id"] for record in archive.records(until=date(2024, 1, 1))] == [1]
+
+
+def test_open_segment_is_readable_after_each_write(tmp_path):
+    archive = QuestionArchive(str(tmp_path))
+    archive.add(1, question(1), RESOLUTION_ANSWERED)
+    assert [record["user_id"] for record in archive.records()] == [1]
+    archive.add(2, question(2), RESOLUTION_ANSWERED)
+    assert [record["user_id"] for record in archive.records()] == [1, 2]
+    archive.close()
+
+
+def test_event_loop_writes_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ARCHIVE_FLUSH_DELAY", 0.05)
+    flushes = []
+    original_flush = gzip.GzipFile.flush
+
+    def counting_flush(self, *args):
+        # Считаем только сбросы потока сжатия при записи, не при чтении
+        if self.mode == gzip.WRITE:
+            flushes.append(self.name)
+        return original_flush(self, *args)
+
+    monkeypatch.setattr(gzip.GzipFile, "flush", counting_flush)
+    archive = QuestionArchive(str(tmp_path))
+
+    async def scenario():
+        for index in range(20):
+            archive.add(index, question(index), RESOLUTION_ANSWERED)
+        # До сброса пачки на диск ничего не пишется
+        assert list(archive.records()) == []
+        await asyncio.sleep(0.2)
+        return [record["user_id"] for record in archive.records()]
+
+    assert asyncio.run(scenario()) == list(range(20))
+    assert len(flushes) == 1
+    archive.close()
+
+
+def test_large_batch_is_written_before_timer(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ARCHIVE_FLUSH_DELAY", 60)
+    monkeypatch.setattr(config, "ARCHIVE_FLUSH_BYTES", 1000)
+    archive = QuestionArchive(str(tmp_path))
+
+    async def scenario():
+        for index in range(20):
+            archive.add(index, question(index), RESOLUTION_ANSWERED)
+        await asyncio.sleep(0.1)
+        written = [record["user_id"] for record in archive.records()]
+        # Явный сброс дописывает все, что осталось в памяти
+        await archive.flush()
+        return written, [record["user_id"] for record in archive.records()]
+
+    written, after_flush = asyncio.run(scenario())
+    assert written and written == list(range(len(written)))
+    assert after_flush == list(range(20))
+    archive.close()
+
+
+def test_close_writes_buffered_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ARCHIVE_FLUSH_DELAY", 60)
+    archive = QuestionArchive(str(tmp_path))
+
+    async def scenario():
+        archive.add(1, question(1), RESOLUTION_ANSWERED)
+        archive.close()
+
+    asyncio.run(scenario())
+    assert [record["user_id"] for record in archive.records()] == [1]
@@ -0,0 +1,138 @@
+"""Тесты рассылки /broadcast."""
+import asyncio
+import json
+import os
+from collections import Counter
+
+import pytest
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import SendMessage
+
+import services.broadcast as broadcast_module
+from benchmarks.fake_session import FakeSession
+from config import config
+from services.broadcast import Broadcaster
+from services.outbound import OutboundDispatcher
+from services.subscribers import SubscriberRegistry
+
+FIRST_ID = 1000
+SUBSCRIBERS = 200
+# Каждый десятый подписчик заблокировал бота
+BLOCKED_EVERY = 10
+
+
+class BlockingSession(FakeSession):
+    """Сессия, в которой часть подписчиков заблокировала бота."""
+
+    async def make_request(self, bot, method, timeout=None):
+        if isinstance(method, SendMessage) and method.chat_id >= FIRST_ID \
+                and (method.chat_id - FIRST_ID) % BLOCKED_EVERY == 0:
+            self.requests.append(method)
+            raise TelegramForbiddenError(method=method, message="Forbidden: bot was blocked by the user")
+        return await super().make_request(bot, method, timeout)
+
+    def delivered(self) -> Counter:
+        """Сколько раз каждому подписчику отправлялась рассылка."""
+        return Counter(
+            method.chat_id for method in self.requests
+            if method.__api_method__ == "sendMessage" and FIRST_ID <= method.chat_id < FIRST_ID + SUBSCRIBERS
+        )
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    registry = SubscriberRegistry(str(tmp_path / "subscribers.bin"))
+    for user_id in range(FIRST_ID, FIRST_ID + SUBSCRIBERS):
+        registry.add(user_id)
+    monkeypatch.setattr(broadcast_module, "subscribers", registry)
+    yield registry
+    registry.close()
+
+
+def start_outbound(monkeypatch, session: FakeSession, rate: float) -> OutboundDispatcher:
+    outbound = OutboundDispatcher(global_rate=rate)
+    monkeypatch.setattr(broadcast_module, "outbound", outbound)
+    outbound.start(Bot(token=config.BOT_TOKEN, session=session))
+    return outbound
+
+
+def test_broadcast_prunes_blocked_subscribers(tmp_path, monkeypatch, registry):
+    state_file = str(tmp_path / "broadcast.json")
+    session = BlockingSession()
+
+    async def scenario():
+        outbound = start_outbound(monkeypatch, session, rate=5000)
+        broadcaster = Broadcaster(state_file=state_file, concurrency=16)
+        assert broadcaster.start("Объявление", config.ADMIN_ID)
+        # Вторая рассылка не начинается, пока идет первая
+        assert not broadcaster.start("Еще одно", config.ADMIN_ID)
+        await broadcaster._task
+        await outbound.stop()
+        return broadcaster.stats()
+
+    stats = asyncio.run(scenario())
+    blocked = SUBSCRIBERS // BLOCKED_EVERY
+    assert session.delivered() == Counter(range(FIRST_ID, FIRST_ID + SUBSCRIBERS))
+    assert (stats["sent"], stats["pruned"], stats["failed"]) == (SUBSCRIBERS - blocked, blocked, 0)
+    assert len(registry) == SUBSCRIBERS - blocked
+    # Удаление из реестра сохранено на диске
+    registry.close()
+    reloaded = SubscriberRegistry(registry.file_path)
+    reloaded.load()
+    assert FIRST_ID not in reloaded and FIRST_ID + 1 in reloaded
+    # Завершенная рассылка не оставляет файла прогресса
+    assert not os.path.exists(state_file)
+
+
+def test_broadcast_resumes_after_restart_without_duplicates(tmp_path, monkeypatch, registry):
+    state_file = str(tmp_path / "broadcast.json")
+    session = BlockingSession(latency=0.005)
+    checkpoints = []
+
+    async def watch_checkpoints():
+        """Читает файл прогресса, пока идет рассылка."""
+        while True:
+            try:
+                with open(state_file, encoding="utf-8") as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = None
+            if state is not None:
+                checkpoints.append((state["cursor"], set(session.delivered())))
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        # Первые rate сообщений уходят сразу (запас корзины), остальные - за секунду
+        outbound = start_outbound(monkeypatch, session, rate=100)
+        broadcaster = Broadcaster(state_file=state_file, concurrency=8, checkpoint_interval=0.05)
+        broadcaster.start("Объявление", config.ADMIN_ID)
+        watcher = asyncio.create_task(watch_checkpoints())
+        await asyncio.sleep(0.4)
+        # Остановка, как при перезапуске бота: прогресс сохраняется
+        await broadcaster.stop()
+        watcher.cancel()
+        with open(state_file, encoding="utf-8") as f:
+            interrupted = json.load(f)
+
+        # Новый экземпляр - как после перезапуска
+        broadcaster = Broadcaster(state_file=state_file, concurrency=8, checkpoint_interval=0.05)
+        assert broadcaster.resume()
+        await broadcaster._task
+        await outbound.stop()
+        return interrupted, broadcaster.stats()
+
+    interrupted, stats = asyncio.run(scenario())
+    assert FIRST_ID < interrupted["cursor"] < FIRST_ID + SUBSCRIBERS - 1
+    # Каждый подписчик получил рассылку ровно один раз, счетчики продолжились
+    assert session.delivered() == Counter(range(FIRST_ID, FIRST_ID + SUBSCRIBERS))
+    assert stats["sent"] + stats["pruned"] == SUBSCRIBERS
+    assert stats["total"] == SUBSCRIBERS
+    assert not os.path.exists(state_file)
+
+    # Промежуточный прогресс сохранялся, курсор не обгонял отправленные сообщения
+    cursors = [cursor for cursor, _ in checkpoints]
+    assert len(set(cursors)) > 2
+    assert cursors == sorted(cursors)
+    for cursor, delivered in checkpoints:
+        assert set(range(FIRST_ID, cursor + 1)) <= delivered
@@ -0,0 +1,165 @@
+"""Тесты JSON-хранилища вопросов."""
+import asyncio
+import json
+import os
+import random
+import time
+
+import pytest
+
+from config import config
+from database import BINARY_MAGIC, QuestionsDatabase, SortedKeys
+
+
+def make_db(tmp_path, name="questions.json"):
+    return QuestionsDatabase(str(tmp_path / name), mode="journal")
+
+
+def test_journal_replay_stops_at_malformed_entry(tmp_path):
+    db = make_db(tmp_path)
+    db.add_question(1, "первый")
+    db.add_question(2, "второй")
+    db.close()
+    with open(db.journal_path, "a", encoding="utf-8") as f:
+        size = f.tell()
+        f.write(json.dumps({"uid": 3}) + "\n")
+        f.write(json.dumps({"op": "update", "uid": 1, "fields": ["answered"]}) + "\n")
+
+    reopened = make_db(tmp_path)
+    assert reopened.get_question(1)["question"] == "первый"
+    assert reopened.get_question(2)["question"] == "второй"
+    assert os.path.getsize(reopened.journal_path) == size
+    assert reopened.check_indexes() == []
+
+
+def test_changes_in_event_loop_are_written_in_one_deferred_flush(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "FLUSH_DELAY", 0.05)
+    monkeypatch.setattr(config, "FLUSH_MAX_DELAY", 1.0)
+    db = make_db(tmp_path)
+    writes = []
+    write_journal = db._write_journal
+    monkeypatch.setattr(db, "_write_journal", lambda entries: writes.append(len(entries)) or write_journal(entries))
+
+    async def scenario():
+        for user_id in range(1, 11):
+            db.add_question(user_id, f"вопрос {user_id}")
+        # Запись отложена: журнал еще пуст
+        assert writes == []
+        await asyncio.sleep(0.2)
+
+    asyncio.run(scenario())
+    assert writes == [10]
+    db.close()
+    assert len(make_db(tmp_path).get_all_questions()) == 10
+
+
+def test_deferred_flush_is_bounded_by_max_delay(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "FLUSH_DELAY", 0.1)
+    monkeypatch.setattr(config, "FLUSH_MAX_DELAY", 0.3)
+    db = make_db(tmp_path)
+    written_at = []
+    write_journal = db._write_journal
+    monkeypatch.setattr(
+        db, "_write_journal", lambda entries: written_at.append(time.monotonic()) or write_journal(entries)
+    )
+
+    async def scenario():
+        started = time.monotonic()
+        # Изменения идут чаще FLUSH_DELAY, но запись не откладывается бесконечно
+        for user_id in range(1, 21):
+            db.add_question(user_id, f"вопрос {user_id}")
+            await asyncio.sleep(0.05)
+        await db.flush()
+        return started
+
+    started = asyncio.run(scenario())
+    assert written_at
+    assert written_at[0] - started < 0.3 + 0.15
+    db.close()
+
+
+def test_indexes_match_data_after_mixed_mutations(tmp_path, monkeypatch):
+    # Маленькие блоки, чтобы очередь неотвеченных делилась и сливалась
+    monkeypatch.setattr(SortedKeys, "LOAD", 4)
+    rng = random.Random(4)
+    db = make_db(tmp_path)
+    for step in range(600):
+        user_id = rng.randrange(1, 80)
+        action = rng.random()
+        if action < 0.35:
+            db.add_question(user_id, f"вопрос {step}", operator_id=rng.choice((None, 42, 43)))
+        elif action < 0.5:
+            db.append_question(user_id, "дополнение")
+        elif action < 0.65:
+            db.set_admin_ready(user_id, rng.choice((None, 42, 43)))
+        elif action < 0.75:
+            db.clear_admin_ready(user_id)
+        elif action < 0.9:
+            db.mark_answered(user_id)
+        else:
+            db.delete_question(user_id)
+        assert db.check_indexes() == []
+    pending = db.get_pending_questions()
+    db.close()
+
+    reopened = make_db(tmp_path)
+    assert reopened.check_indexes() == []
+    assert reopened.get_pending_questions() == pending
+
+
+def test_sorted_keys_match_sorted_list(monkeypatch):
+    monkeypatch.setattr(SortedKeys, "LOAD", 3)
+    rng = random.Random(5)
+    keys = SortedKeys()
+    expected = []
+    for _ in range(500):
+        if expected and rng.random() < 0.4:
+            key = expected.pop(rng.randrange(len(expected)))
+            keys.remove(key)
+        else:
+            key = (float(rng.randrange(50)), rng.randrange(10 ** 6))
+            expected.append(key)
+            expected.sort()
+            keys.add(key)
+        assert list(keys) == expected and len(keys) == len(expected)
+        probe = (float(rng.randrange(50)), rng.randrange(10 ** 6))
+        assert list(keys.after(probe)) == [key for key in expected if key > probe]
+        assert list(keys.before(probe)) == [key for key in reversed(expected) if key < probe]
+
+
+@pytest.mark.parametrize("snapshot_format", ["json", "compact", "binary"])
+def test_lazy_open_loads_each_snapshot_format(tmp_path, monkeypatch, snapshot_format):
+    monkeypatch.setattr(config, "SNAPSHOT_FORMAT", snapshot_format)
+    db = make_db(tmp_path)
+    for user_id in range(1, 31):
+        db.add_question(user_id, f"вопрос {user_id}", username=f"user{user_id}", operator_id=42)
+    db.set_admin_ready(3, 42)
+    db.mark_answered(5)
+    db.compact()
+    # Часть изменений остается только в журнале поверх снимка
+    db.add_question(31, "вопрос из журнала")
+    db.delete_question(7)
+    expected = {user_id: db.get_question(user_id) for user_id in range(1, 32)}
+    pending = db.get_pending_questions()
+    db.close()
+    with open(tmp_path / "questions.json", "rb") as f:
+        head = f.read(16)
+    assert head.startswith(BINARY_MAGIC) == (snapshot_format == "binary")
+    assert head.startswith(b"{\n") == (snapshot_format == "json")
+
+    # Формат снимка определяется по файлу, а не по текущей настройке
+    monkeypatch.setattr(config, "SNAPSHOT_FORMAT", "json")
+    lazy = QuestionsDatabase(str(tmp_path / "questions.json"), mode="journal", lazy=True)
+    assert not lazy.loaded and lazy.get_question(1) is None
+    asyncio.run(lazy.open())
+    assert lazy.loaded
+    assert {user_id: lazy.get_question(user_id) for user_id in range(1, 32)} == expected
+    assert lazy.get_pending_questions() == pending
+    assert lazy.get_ready_to_reply(42)[0] == 3
+    assert lazy.check_indexes() == []
+
+    # Повторный open не перечитывает файл поверх изменений в памяти
+    lazy.add_question(40, "новый вопрос")
+    asyncio.run(lazy.open())
+    assert lazy.get_question(40) is not None
+    lazy.close()
@@ -0,0 +1,78 @@
+"""Тесты отбрасывания повторных обновлений."""
+import asyncio
+from types import SimpleNamespace
+
+from config import config
+from middlewares.dedup import DedupMiddleware, SharedUpdateLog, UpdateDeduplicator
+
+
+def test_restart_keeps_only_processed_updates(tmp_path):
+    state_file = str(tmp_path / "dedup_state.json")
+    deduplicator = UpdateDeduplicator(max_size=100, ttl=3600, state_file=state_file)
+    # Обновление 11 было отклонено (503) и до дедупликации не дошло
+    for update_id in (10, 12, 13):
+        assert not deduplicator.seen(update_id)
+    deduplicator.save()
+
+    restarted = UpdateDeduplicator(max_size=100, ttl=3600, state_file=state_file)
+    assert restarted.seen(12)
+    assert restarted.seen(10)
+    assert not restarted.seen(11)
+    assert not restarted.seen(14)
+
+
+def test_expired_state_is_ignored(tmp_path):
+    state_file = str(tmp_path / "dedup_state.json")
+    deduplicator = UpdateDeduplicator(max_size=100, ttl=3600, state_file=state_file)
+    deduplicator.seen(10)
+    deduplicator.save({"seen": [10], "saved_at": 0})
+
+    assert not UpdateDeduplicator(max_size=100, ttl=3600, state_file=state_file).seen(10)
+
+
+def test_state_is_saved_only_after_new_updates(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "DEDUP_SAVE_EVERY", 3)
+    deduplicator = UpdateDeduplicator(max_size=100, ttl=3600, state_file=str(tmp_path / "dedup_state.json"))
+    saved = []
+    monkeypatch.setattr(deduplicator, "save", lambda state=None: saved.append(state["seen"]))
+    middleware = DedupMiddleware(deduplicator)
+
+    async def handle(event, data):
+        return None
+
+    async def scenario():
+        # Повторы не считаются новыми и не вызывают сохранения
+        for update_id in (1, 2, 2, 2, 2, 3, 3, 4, 4, 4, 5, 6):
+            await middleware(handle, SimpleNamespace(update_id=update_id), {})
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert saved == [[1, 2, 3], [1, 2, 3, 4, 5, 6]]
+    assert deduplicator.stats() == {"size": 6, "hits": 6, "misses": 6}
+
+
+def test_shared_log_lets_one_process_claim_an_update(tmp_path):
+    path = str(tmp_path / "questions.db")
+    # Два процесса бота - два соединения с одной базой
+    first = UpdateDeduplicator(max_size=100, ttl=3600, state_file="", shared=SharedUpdateLog(path, 3600))
+    second = UpdateDeduplicator(max_size=100, ttl=3600, state_file="", shared=SharedUpdateLog(path, 3600))
+
+    assert not first.seen(1)
+    assert second.seen(1)
+    assert not second.seen(2)
+    assert first.seen(2)
+    assert first.seen(1) and second.seen(2)
+    assert (first.misses, second.misses) == (1, 1)
+
+
+def test_shared_log_prune_forgets_old_updates(tmp_path):
+    path = str(tmp_path / "questions.db")
+    log = SharedUpdateLog(path, ttl=3600)
+    assert log.claim(1)
+    log._conn.execute("UPDATE processed_updates SET seen_at = seen_at - 7200 WHERE update_id = 1")
+    assert log.claim(2)
+    log.prune()
+
+    other = SharedUpdateLog(path, ttl=3600)
+    assert other.claim(1)
+    assert not other.claim(2)
@@ -0,0 +1,41 @@
+"""Тесты сводок уведомлений операторов."""
+import asyncio
+
+from aiogram import Bot
+
+import services.digest as digest_module
+from benchmarks.fake_session import FakeSession
+from config import config
+from database import db
+from services.digest import AdminNotifier
+from services.outbound import OutboundDispatcher
+
+OPERATOR_ID = 42
+
+
+def test_flush_all_sends_buffered_digests(monkeypatch):
+    for user_id in (101, 102, 103):
+        db.add_question(user_id, f"вопрос {user_id}")
+
+    async def scenario():
+        session = FakeSession()
+        outbound = OutboundDispatcher(global_rate=1000)
+        monkeypatch.setattr(digest_module, "outbound", outbound)
+        outbound.start(Bot(token=config.BOT_TOKEN, session=session))
+        notifier = AdminNotifier(enabled=True, window=60, threshold=1)
+        for user_id in (101, 102, 103):
+            notifier.notify(user_id, f"вопрос {user_id}", None, None, operator_id=OPERATOR_ID)
+        # Первый вопрос ушел сразу, остальные ждут конца окна
+        window = notifier._windows[OPERATOR_ID]
+        handle = window.flush_handle
+        assert len(window.buffer) == 2
+
+        notifier.flush_all()
+        await outbound.stop()
+        assert handle.cancelled()
+        assert window.flush_handle is None and not window.buffer
+        return [method.text for method in session.requests if method.__api_method__ == "sendMessage"]
+
+    texts = asyncio.run(scenario())
+    assert len(texts) == 2
+    assert "102" in texts[1] and "103" in texts[1]
@@ -0,0 +1,12 @@
+"""Тесты форматирования сообщений."""
+from utils.helpers import format_sla_reminder
+
+ITEMS = [(user_id, {"question": f"вопрос {user_id}", "username": None}) for user_id in (1, 2)]
+
+
+def test_sla_reminder_hints_questions_only_for_admin():
+    admin_text = format_sla_reminder(ITEMS, 5, "2 ч")
+    operator_text = format_sla_reminder(ITEMS, 5, "2 ч", questions_hint=False)
+    assert admin_text.endswith("...и еще 3. Все: /questions старше 2 ч")
+    assert operator_text.endswith("...и еще 3.")
+    assert "/questions" not in operator_text
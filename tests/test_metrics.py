@@ -0,0 +1,42 @@
+"""Тесты вывода метрик в формате Prometheus."""
+from services.metrics import MetricsRegistry
+
+
+def test_render_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.counter("bot_updates_total", "Обновления").inc(3)
+    handlers = registry.counter("bot_handler_calls_total", "Вызовы обработчиков", label="handler")
+    handlers.labels("cmd_start").inc()
+    handlers.labels('say "hi"\n').inc(2)
+    latency = registry.histogram("bot_latency_seconds", "Задержка", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+    registry.gauge_callback("bot_queue", "Очередь", lambda: {"depth": 4, "busy": 1})
+
+    assert registry.render() == "\n".join([
+        "# HELP bot_updates_total Обновления",
+        "# TYPE bot_updates_total counter",
+        "bot_updates_total 3",
+        "# HELP bot_handler_calls_total Вызовы обработчиков",
+        "# TYPE bot_handler_calls_total counter",
+        'bot_handler_calls_total{handler="cmd_start"} 1',
+        'bot_handler_calls_total{handler="say \\"hi\\"\\n"} 2',
+        "# HELP bot_latency_seconds Задержка",
+        "# TYPE bot_latency_seconds histogram",
+        'bot_latency_seconds_bucket{le="0.1"} 2',
+        'bot_latency_seconds_bucket{le="1.0"} 3',
+        'bot_latency_seconds_bucket{le="+Inf"} 4',
+        "bot_latency_seconds_sum 3.65",
+        "bot_latency_seconds_count 4",
+        "# HELP bot_queue_depth Очередь",
+        "# TYPE bot_queue_depth gauge",
+        "bot_queue_depth 4.0",
+        "# HELP bot_queue_busy Очередь",
+        "# TYPE bot_queue_busy gauge",
+        "bot_queue_busy 1.0",
+    ]) + "\n"
+
+
+def test_same_name_returns_same_metric():
+    registry = MetricsRegistry()
+    assert registry.counter("bot_total", "Счетчик") is registry.counter("bot_total", "Счетчик")
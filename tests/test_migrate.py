@@ -0,0 +1,32 @@
+"""Тесты переноса questions.json в SQLite."""
+import json
+import sys
+
+import migrate_to_sqlite
+from sqlite_database import SQLiteQuestionsDatabase
+
+
+def test_migration_keeps_source_unchanged(tmp_path, monkeypatch):
+    source = tmp_path / "questions.json"
+    target = tmp_path / "questions.db"
+    # Снимок старой схемы (версия 1) и журнал поверх него
+    source.write_text(json.dumps({
+        "1": {"question": "первый", "created_at": "2025-01-01T10:00:00", "answered": False},
+        "2": {"question": "второй", "created_at": "2025-01-01T11:00:00", "answered": True}
+    }), encoding="utf-8")
+    journal = tmp_path / "questions.json.journal"
+    journal.write_text(
+        json.dumps({"op": "update", "uid": 2, "fields": {"answered": False}}) + "\n" + '{"op": "put"',
+        encoding="utf-8"
+    )
+    before = {path: path.read_bytes() for path in (source, journal)}
+
+    monkeypatch.setattr(sys, "argv", ["migrate_to_sqlite.py", "--source", str(source), "--target", str(target)])
+    migrate_to_sqlite.main()
+
+    assert {path: path.read_bytes() for path in (source, journal)} == before
+    migrated = SQLiteQuestionsDatabase(file_path=str(target))
+    try:
+        assert set(migrated.get_pending_questions()) == {"1", "2"}
+    finally:
+        migrated.close()
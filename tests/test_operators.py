@@ -0,0 +1,67 @@
+"""Тесты распределения вопросов между операторами."""
+import random
+
+from config import config
+from services.operators import OperatorBalancer
+
+OPERATORS = [11, 12, 13]
+ADMIN_ID = 99
+
+
+def test_least_loaded_assign_transfer_release():
+    balancer = OperatorBalancer(OPERATORS, "least_loaded")
+    owners = {user_id: balancer.assign(user_id) for user_id in range(1, 7)}
+    assert balancer.stats() == {11: 2, 12: 2, 13: 2}
+    # Повторный вопрос остается у того же оператора
+    assert balancer.assign(1) == owners[1]
+
+    balancer.release(1)
+    loads = balancer.stats()
+    assert loads[owners[1]] == 1 and sum(loads.values()) == 5
+    # Новый вопрос - оператору, у которого освободилось место
+    assert balancer.assign(7) == owners[1]
+
+    balancer.transfer(2, 13)
+    assert balancer.operator_of(2) == 13
+    # Вопрос, взятый не оператором, с нагрузки снимается и не учитывается
+    balancer.transfer(3, ADMIN_ID)
+    assert balancer.operator_of(3) is None
+    assert sum(balancer.stats().values()) == len(balancer._owners)
+
+
+def test_least_loaded_matches_brute_force():
+    rng = random.Random(14)
+    balancer = OperatorBalancer(OPERATORS, "least_loaded")
+    owners = {}
+    for _ in range(2000):
+        user_id = rng.randrange(200)
+        action = rng.random()
+        if action < 0.5:
+            loads = {operator_id: list(owners.values()).count(operator_id) for operator_id in OPERATORS}
+            operator_id = balancer.assign(user_id)
+            if user_id in owners:
+                assert operator_id == owners[user_id]
+            else:
+                assert loads[operator_id] == min(loads.values())
+                owners[user_id] = operator_id
+        elif action < 0.7 and user_id in owners:
+            owners[user_id] = rng.choice(OPERATORS)
+            balancer.transfer(user_id, owners[user_id])
+        else:
+            owners.pop(user_id, None)
+            balancer.release(user_id)
+        expected = {operator_id: list(owners.values()).count(operator_id) for operator_id in OPERATORS}
+        assert balancer.stats() == expected
+
+
+def test_round_robin_and_restore():
+    balancer = OperatorBalancer(OPERATORS, "round_robin")
+    assert [balancer.assign(user_id) for user_id in range(1, 7)] == OPERATORS * 2
+
+    balancer.restore({1: 11, 2: 11, 3: None, 4: ADMIN_ID})
+    # Вопрос без оператора - у оператора по умолчанию (первого), чужие не учитываются
+    expected = dict.fromkeys(OPERATORS, 0)
+    expected[11] = 2
+    if config.default_operator_id in expected:
+        expected[config.default_operator_id] += 1
+    assert balancer.stats() == expected
@@ -0,0 +1,85 @@
+"""Тесты очереди исходящих сообщений."""
+import asyncio
+import time
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from benchmarks.fake_session import FakeSession
+from config import config
+from services.outbound import PRIORITY_ADMIN, PRIORITY_BROADCAST, PRIORITY_USER, OutboundDispatcher
+
+
+class TimedSession(FakeSession):
+    """Фейковая сессия, запоминающая время каждого запроса."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.times = []
+
+    async def make_request(self, bot, method, timeout=None):
+        self.times.append(time.monotonic())
+        return await super().make_request(bot, method, timeout)
+
+
+def retry_after(seconds: int) -> TelegramRetryAfter:
+    return TelegramRetryAfter(
+        method=SendMessage(chat_id=0, text=""), message="Too Many Requests", retry_after=seconds
+    )
+
+
+def test_queued_messages_go_out_by_priority():
+    async def scenario():
+        session = FakeSession()
+        outbound = OutboundDispatcher(global_rate=1000, workers=1)
+        outbound.start(Bot(token=config.BOT_TOKEN, session=session))
+        # Обработчик еще не запущен: порядок определяет только очередь
+        for chat_id in (1, 2, 3):
+            outbound.send_message(chat_id, "рассылка", priority=PRIORITY_BROADCAST)
+        outbound.send_message(10, "админу", priority=PRIORITY_ADMIN)
+        outbound.send_message(20, "пользователю", priority=PRIORITY_USER)
+        await outbound.stop()
+        return [method.chat_id for method in session.requests]
+
+    assert asyncio.run(scenario()) == [20, 10, 1, 2, 3]
+
+
+def test_retry_after_on_broadcast_pauses_all_chats():
+    async def scenario():
+        session = TimedSession(errors={0: retry_after(1)})
+        outbound = OutboundDispatcher(global_rate=1000, workers=2)
+        outbound.start(Bot(token=config.BOT_TOKEN, session=session))
+        started = time.monotonic()
+        first = outbound.send_message(1, "рассылка", priority=PRIORITY_BROADCAST)
+        await asyncio.sleep(0.1)
+        # Другой чат: без общей паузы ушел бы сразу
+        second = outbound.send_message(2, "рассылка", priority=PRIORITY_BROADCAST)
+        await asyncio.gather(first, second)
+        await outbound.stop()
+        return started, session, outbound
+
+    started, session, outbound = asyncio.run(scenario())
+    chats = [method.chat_id for method in session.requests]
+    assert chats.count(1) == 2 and chats.count(2) == 1
+    assert session.times[chats.index(2)] - started >= 0.9
+    assert outbound.retried == 1 and outbound.failed == 0
+
+
+def test_single_retry_after_for_user_chat_pauses_only_that_chat():
+    async def scenario():
+        session = TimedSession(errors={0: retry_after(1)})
+        outbound = OutboundDispatcher(global_rate=1000, workers=2)
+        outbound.start(Bot(token=config.BOT_TOKEN, session=session))
+        started = time.monotonic()
+        first = outbound.send_message(1, "ответ", priority=PRIORITY_USER)
+        await asyncio.sleep(0.1)
+        second = outbound.send_message(2, "ответ", priority=PRIORITY_USER)
+        await asyncio.gather(first, second)
+        await outbound.stop()
+        return started, session
+
+    started, session = asyncio.run(scenario())
+    chats = [method.chat_id for method in session.requests]
+    assert session.times[chats.index(2)] - started < 0.5
+    assert session.times[-1] - started >= 0.9
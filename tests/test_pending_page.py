@@ -0,0 +1,129 @@
+"""Тесты страниц очереди неотвеченных вопросов (/questions)."""
+import random
+import time
+from datetime import datetime
+
+import pytest
+
+import handlers.admin as admin_module
+import sqlite_database as sqlite_module
+from config import config
+from database import QuestionsDatabase
+from handlers.admin import render_pending_page
+from sqlite_database import SQLiteQuestionsDatabase
+
+PAGE_SIZE = 5
+QUESTIONS = 40
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def storage(request, tmp_path):
+    if request.param == "json":
+        db = QuestionsDatabase(str(tmp_path / "questions.json"), mode="journal")
+    else:
+        db = SQLiteQuestionsDatabase(file_path=str(tmp_path / "questions.db"))
+    for user_id in range(1, QUESTIONS + 1):
+        db.add_question(user_id, f"вопрос {user_id}")
+    yield db
+    db.close()
+
+
+def cursor(item):
+    """Курсор, как его передает кнопка страницы: строка created_at и user_id."""
+    user_id, data = item
+    return data.get("created_at") or "", user_id
+
+
+def test_pages_forward_and_backward_cover_each_question_once(storage):
+    forward = []
+    page = storage.get_pending_page(PAGE_SIZE)
+    pages = []
+    while page:
+        pages.append(page)
+        forward.extend(user_id for user_id, _ in page)
+        page = storage.get_pending_page(PAGE_SIZE, after=cursor(page[-1]))
+    assert forward == list(range(1, QUESTIONS + 1))
+    assert len(pages) == QUESTIONS // PAGE_SIZE
+
+    backward = []
+    page = pages[-1]
+    while page:
+        backward[:0] = [user_id for user_id, _ in page]
+        page = storage.get_pending_page(PAGE_SIZE, before=cursor(page[0]))
+    assert backward == forward
+
+
+def test_page_after_closed_cursor_continues_from_its_place(storage):
+    first = storage.get_pending_page(PAGE_SIZE)
+    last = first[-1]
+    storage.mark_answered(last[0])
+    page = storage.get_pending_page(PAGE_SIZE, after=cursor(last))
+    assert [user_id for user_id, _ in page] == list(range(PAGE_SIZE + 1, 2 * PAGE_SIZE + 1))
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def same_time_storage(request, tmp_path, monkeypatch):
+    """Хранилище, где все вопросы заданы в одну и ту же секунду."""
+    moment = datetime(2024, 1, 1, 10, 0, 0)
+
+    class FixedDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return moment
+
+    if request.param == "json":
+        db = QuestionsDatabase(str(tmp_path / "questions.json"), mode="journal")
+    else:
+        db = SQLiteQuestionsDatabase(file_path=str(tmp_path / "questions.db"))
+    user_ids = list(range(1, QUESTIONS + 4))
+    random.Random(18).shuffle(user_ids)
+    with monkeypatch.context() as patch:
+        patch.setattr(time, "time", moment.timestamp)
+        patch.setattr(sqlite_module, "datetime", FixedDatetime)
+        for user_id in user_ids:
+            db.add_question(user_id, f"вопрос {user_id}")
+    monkeypatch.setattr(admin_module, "db", db)
+    monkeypatch.setattr(config, "QUESTIONS_PAGE_SIZE", PAGE_SIZE)
+    yield db
+    db.close()
+
+
+def page_of(rendered):
+    """Вопросы страницы и курсоры ее кнопок ◀️ / ▶️, как их разберет обработчик."""
+    _, markup = rendered
+    user_ids = []
+    nav = {}
+    for row in markup.inline_keyboard:
+        for button in row:
+            if button.callback_data.startswith("ans_"):
+                user_ids.append(int(button.callback_data[4:]))
+            elif button.callback_data.startswith("qp_"):
+                _, direction, _, created_at, user_id = button.callback_data.split("_", 4)
+                nav[direction] = (created_at, int(user_id))
+    return user_ids, nav.get("p"), nav.get("n")
+
+
+def test_render_pages_with_equal_created_at(same_time_storage):
+    questions = same_time_storage.get_pending_page(QUESTIONS + 3)
+    assert len({data["created_at"] for _, data in questions}) == 1
+
+    pages = []
+    rendered = render_pending_page(0, False)
+    while True:
+        user_ids, prev_cursor, next_cursor = page_of(rendered)
+        assert (prev_cursor is None) == (not pages)
+        pages.append(user_ids)
+        if next_cursor is None:
+            break
+        rendered = render_pending_page(0, False, after=next_cursor)
+    # При одинаковом времени порядок задает user_id: ни пропусков, ни повторов
+    assert [user_id for page in pages for user_id in page] == list(range(1, QUESTIONS + 4))
+    assert len(pages) == (QUESTIONS + 3 + PAGE_SIZE - 1) // PAGE_SIZE
+
+    backward = [user_ids]
+    while prev_cursor is not None:
+        rendered = render_pending_page(0, False, before=prev_cursor)
+        user_ids, prev_cursor, next_cursor = page_of(rendered)
+        assert next_cursor is not None
+        backward.insert(0, user_ids)
+    assert backward == pages
@@ -0,0 +1,35 @@
+"""Тесты выбора вопроса, на который отвечает оператор."""
+import pytest
+
+from database import QuestionsDatabase
+from sqlite_database import SQLiteQuestionsDatabase
+
+OPERATOR_ID = 42
+OTHER_OPERATOR_ID = 43
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def storage(request, tmp_path):
+    if request.param == "json":
+        db = QuestionsDatabase(str(tmp_path / "questions.json"), mode="journal")
+    else:
+        db = SQLiteQuestionsDatabase(file_path=str(tmp_path / "questions.db"))
+    yield db
+    db.close()
+
+
+def test_last_selected_question_gets_the_reply(storage):
+    for user_id in (1, 2, 3):
+        storage.add_question(user_id, f"вопрос {user_id}")
+    storage.set_admin_ready(3, OTHER_OPERATOR_ID)
+    storage.set_admin_ready(1, OPERATOR_ID)
+    storage.set_admin_ready(2, OPERATOR_ID)
+
+    assert storage.get_ready_to_reply(OPERATOR_ID)[0] == 2
+    assert not storage.get_question(1)["admin_ready_to_reply"]
+    # Пометки других операторов не трогаются
+    assert storage.get_ready_to_reply(OTHER_OPERATOR_ID)[0] == 3
+
+    storage.set_admin_ready(1, OPERATOR_ID)
+    assert storage.get_ready_to_reply(OPERATOR_ID)[0] == 1
+    assert not storage.get_question(2)["admin_ready_to_reply"]
@@ -0,0 +1,130 @@
+"""Тесты расписания с сайта."""
+import asyncio
+import json
+import time
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from services.schedule import ScheduleCache, parse_events
+
+EVENTS_HTML = """<html><head>
+<script type="application/ld+json">
+{"@context": "https://schema.org", "@graph": [
+  {"@type": "Organization", "name": "Юсупово Лайф Холл"},
+  {"@type": "TheaterEvent", "name": "Гамлет", "startDate": "2099-05-02T19:00",
+   "location": {"@type": "Place", "name": "Большой зал"},
+   "offers": [{"price": "1500", "priceCurrency": "RUB", "url": "https://example.com/hamlet"},
+              {"lowPrice": "900,50", "availability": "https://schema.org/InStock"}]}
+]}
+</script>
+<script type='application/ld+json'>[
+  {"@type": ["Event", "MusicEvent"], "name": "Джаз", "startDate": "2099-04-01",
+   "offers": {"price": 500, "availability": "https://schema.org/SoldOut"}},
+  {"@type": "TheaterEvent", "name": "Гамлет", "startDate": "2099-05-02T19:00"},
+  {"@type": "Event", "name": "Прошедший концерт", "startDate": "2000-01-01T19:00"}
+]</script>
+<script type="application/ld+json">{broken json</script>
+</head></html>"""
+
+
+def test_parse_events_from_json_ld():
+    events = parse_events(EVENTS_HTML)
+    assert [(event["name"], event["start"]) for event in events] == [
+        ("Прошедший концерт", "2000-01-01T19:00"),
+        ("Джаз", "2099-04-01"),
+        ("Гамлет", "2099-05-02T19:00"),
+    ]
+    jazz = events[1]
+    assert jazz["sold_out"] and jazz["price"] == 500
+    # Мероприятие размечено дважды: остается последняя разметка
+    assert events[2]["location"] is None and events[2]["price"] is None
+
+
+def test_parse_events_from_json_list():
+    body = json.dumps([
+        {"name": "Гамлет", "startDate": "2099-05-02T19:00", "location": "Большой зал",
+         "offers": [{"price": 1500, "priceCurrency": "RUB"}, {"lowPrice": "900,50"}]},
+        {"name": "Без даты"},
+        {"@type": "Event", "startDate": "2099-05-03"},
+    ])
+    assert parse_events(body) == [{
+        "name": "Гамлет", "start": "2099-05-02T19:00", "location": "Большой зал", "url": None,
+        "price": 900.5, "currency": "RUB", "sold_out": False
+    }]
+    assert parse_events("<html>нет разметки</html>") == []
+
+
+class FakeSite:
+    """Страница сайта с ETag: отвечает 304 на условный запрос с тем же ETag."""
+
+    def __init__(self):
+        self.body = json.dumps([{"name": "Гамлет", "startDate": "2099-05-02T19:00",
+                                 "offers": {"price": 1500, "priceCurrency": "RUB"}}])
+        self.etag = '"v1"'
+        self.status = 200
+        self.requests = []
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests.append(request.headers.get("If-None-Match"))
+        if self.status != 200:
+            return web.Response(status=self.status)
+        if request.headers.get("If-None-Match") == self.etag:
+            return web.Response(status=304)
+        return web.Response(text=self.body, content_type="application/json", headers={"ETag": self.etag})
+
+
+def test_cache_revalidates_and_keeps_stale_text(tmp_path):
+    site = FakeSite()
+    cache_file = str(tmp_path / "schedule_cache.json")
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get("/", site.handle)
+        server = TestServer(app)
+        await server.start_server()
+        url = str(server.make_url("/"))
+        try:
+            cache = ScheduleCache(url=url, refresh_interval=3600, timeout=5, cache_file=cache_file)
+            cache.start()
+            assert await cache.refresh()
+            text = cache.schedule_text()
+            assert "Гамлет" in text and "1500" in text
+            assert (cache.fetches, cache.etag) == (1, '"v1"')
+
+            # Страница не изменилась: 304, мероприятия те же
+            assert await cache.refresh()
+            assert site.requests[-1] == '"v1"'
+            assert (cache.fetches, cache.not_modified) == (1, 1)
+            assert cache.schedule_text() == text
+
+            # Сайт недоступен или отдал страницу без мероприятий: остается прежний текст
+            site.status = 500
+            assert not await cache.refresh()
+            site.status = 200
+            site.body, site.etag = "<html>заглушка хостинга</html>", '"v2"'
+            assert not await cache.refresh()
+            assert cache.errors == 2 and cache.schedule_text() == text
+
+            # Устаревший текст: обработчики отвечают сразу и запускают одно обновление на всех
+            site.body = json.dumps([{"name": "Джаз", "startDate": "2099-04-01"}])
+            cache.checked_at = time.time() - 3 * cache.refresh_interval
+            requests = len(site.requests)
+            assert cache.schedule_text() == text
+            assert cache.tickets_text()
+            await cache._refresh_task
+            assert len(site.requests) == requests + 1
+            assert "Джаз" in cache.schedule_text()
+            await cache.stop()
+
+            # После перезапуска расписание есть сразу, а запрос к сайту условный
+            restarted = ScheduleCache(url=url, refresh_interval=3600, timeout=5, cache_file=cache_file)
+            restarted.start()
+            assert "Джаз" in restarted.schedule_text()
+            assert await restarted.refresh()
+            assert site.requests[-1] == '"v2"' and restarted.not_modified == 1
+            await restarted.stop()
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,73 @@
+"""Тесты полнотекстового поиска."""
+import math
+import random
+
+from services.search import STATUS_OPEN, SearchIndex, normalize
+
+
+def brute_force(index: SearchIndex, doc_terms: list, query: str, limit: int) -> list:
+    """Полный перебор документов с той же оценкой, что и у индекса."""
+    terms = set(normalize(query))
+    total = len(index._docs)
+    frequency = {term: len(index._postings.get(term, ())) for term in terms}
+    weights = {
+        term: round(math.log(1 + total / count) * 1_000_000)
+        for term, count in frequency.items() if count
+    }
+    scored = []
+    for doc_id, terms_of_doc in enumerate(doc_terms):
+        if terms_of_doc is None:
+            continue
+        score = sum(weight for term, weight in weights.items() if term in terms_of_doc)
+        if score:
+            scored.append((score, doc_id))
+    scored.sort(reverse=True)
+    return [index._docs[doc_id] for _, doc_id in scored[:limit]]
+
+
+def test_search_matches_brute_force():
+    rng = random.Random(16)
+    # Частоты слов сильно различаются, как в живых вопросах
+    vocabulary = [f"w{number}" for number in range(60)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    def text() -> str:
+        return " ".join(rng.choices(vocabulary, weights, k=rng.randint(2, 8)))
+
+    index = SearchIndex(max_results=50, page_size=5)
+    for user_id in range(3000):
+        index.add_open(user_id, {"question": text(), "created_at": "2024-01-01T10:00:00"})
+    # Дополненные и закрытые вопросы заменяют прежние документы
+    for _ in range(2500):
+        user_id = rng.randrange(3000)
+        if rng.random() < 0.5:
+            index.add_open(user_id, {"question": text()})
+        else:
+            index.add_archived({"user_id": user_id, "question": text(), "answer": text(),
+                                "resolution": "answered"})
+
+    assert index._removed
+
+    # Сначала с удаленными документами в списках, затем после компактизации
+    for compact in (False, True):
+        if compact:
+            index._compact()
+        doc_terms = [doc and doc.terms() for doc in index._docs]
+        for _ in range(100):
+            query = " ".join(rng.choices(vocabulary, k=rng.randint(1, 5)))
+            limit = rng.choice((1, 5, 50))
+            assert index.search(query, limit) == brute_force(index, doc_terms, query, limit), query
+
+
+def test_search_uses_stems_and_replaces_open_question():
+    index = SearchIndex()
+    index.add_open(1, {"question": "Сколько стоят билеты?"})
+    index.add_open(2, {"question": "Где расписание автобусов?"})
+    assert [doc.user_id for doc in index.search("билетов")] == [1]
+
+    index.add_archived({"user_id": 1, "question": "Сколько стоят билеты?", "answer": "100 рублей",
+                        "resolution": "answered"})
+    results = index.search("билет")
+    assert len(results) == 1 and results[0].status == "answered"
+    assert len(index) == 2
+    assert index.search("автобус")[0].status == STATUS_OPEN
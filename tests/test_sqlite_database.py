@@ -0,0 +1,29 @@
+"""Тесты хранилища вопросов в SQLite."""
+import sqlite3
+
+from sqlite_database import SCHEMA_VERSION, SQLiteQuestionsDatabase
+
+
+def index_names(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    finally:
+        conn.close()
+
+
+def test_old_answered_index_is_dropped_once(tmp_path):
+    path = str(tmp_path / "questions.db")
+    SQLiteQuestionsDatabase(file_path=path).close()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA user_version = 0")
+    conn.execute("CREATE INDEX idx_questions_answered ON questions (answered)")
+    conn.commit()
+    conn.close()
+
+    SQLiteQuestionsDatabase(file_path=path).close()
+    assert "idx_questions_answered" not in index_names(path)
+    assert {"idx_questions_pending", "idx_questions_ready"} <= index_names(path)
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    conn.close()
@@ -0,0 +1,58 @@
+"""Тесты подсказок ответов."""
+import services.suggestions as suggestions_module
+from services.suggestions import AUTO_REPLY_COOLDOWN, SuggestionIndex
+
+ANSWERED = (
+    ("Сколько стоит билет на автобус до Москвы?", "Билет до Москвы стоит 150 рублей."),
+    ("Какая цена билета на автобус в Москву?", "Билет до Москвы стоит 150 рублей."),
+    ("Во сколько первый автобус утром?", "Первый автобус уходит в 5:40."),
+    ("Где найти расписание электричек?", "Расписание электричек - в разделе «Расписание»."),
+    ("Можно ли провезти велосипед?", "Велосипед можно провезти в багажном отделении."),
+)
+
+
+def make_index(**kwargs) -> SuggestionIndex:
+    index = SuggestionIndex(dim=1024, max_items=100, file_path="unused.npz", **kwargs)
+    for question, answer in ANSWERED:
+        index.add(question, answer)
+    return index
+
+
+def test_suggest_respects_min_score_and_limit():
+    index = make_index(min_score=0.3)
+    result = index.suggest("Сколько стоит билет на автобус до Москвы?", limit=3)
+    assert result[0][2] == "Билет до Москвы стоит 150 рублей."
+    assert result[0][1] > 0.95
+    # Одинаковый ответ на два похожих вопроса предлагается один раз
+    assert len({key for key, _, _ in result}) == len(result)
+    assert all(score >= 0.3 for _, score, _ in result)
+    assert index.suggest("Сколько стоит билет на автобус до Москвы?", limit=1) == result[:1]
+    assert index.suggest("Кошка спит на диване") == []
+
+    strict = make_index(min_score=0.95)
+    assert [answer for _, _, answer in strict.suggest("Можно ли провезти велосипед?")] == [
+        "Велосипед можно провезти в багажном отделении."
+    ]
+    assert strict.suggest("Можно ли провезти велосипед в автобусе?") == []
+
+
+def test_auto_answer_threshold_and_cooldown(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(suggestions_module.time, "monotonic", lambda: now[0])
+    question = "Во сколько первый автобус утром?"
+
+    assert make_index(auto_reply=0).auto_answer(1, make_index().suggest(question)) is None
+
+    index = make_index(min_score=0.1, auto_reply=0.9)
+    confident = index.suggest(question)
+    weak = index.suggest("Во сколько автобус?")
+    assert weak and weak[0][1] < 0.9
+    assert index.auto_answer(1, weak) is None
+    assert index.auto_answer(1, []) is None
+
+    assert index.auto_answer(1, confident) == "Первый автобус уходит в 5:40."
+    # Второй уверенный ответ тому же пользователю - только после паузы
+    assert index.auto_answer(1, confident) is None
+    assert index.auto_answer(2, confident) == "Первый автобус уходит в 5:40."
+    now[0] += AUTO_REPLY_COOLDOWN + 1
+    assert index.auto_answer(1, confident) == "Первый автобус уходит в 5:40."
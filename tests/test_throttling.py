@@ -0,0 +1,42 @@
+"""Тесты ограничения частоты вопросов."""
+import asyncio
+from types import SimpleNamespace
+
+from aiogram.dispatcher.event.handler import HandlerObject
+
+from database import db
+from middlewares.throttling import ThrottlingMiddleware
+
+
+class FakeMessage:
+    """Сообщение пользователя, запоминающее ответы бота."""
+
+    def __init__(self, user_id: int, text: str, answers: list):
+        self.from_user = SimpleNamespace(id=user_id)
+        self.text = text
+        self._answers = answers
+
+    async def answer(self, text: str, **kwargs) -> None:
+        self._answers.append(text)
+
+
+async def handle(event, data):
+    return "handled"
+
+
+def test_flood_warning_after_merge_notice():
+    user_id = 501
+    db.add_question(user_id, "вопрос")
+    middleware = ThrottlingMiddleware(burst=3, period=3600, merge_window=60)
+    data = {"handler": HandlerObject(callback=handle, flags={"throttle": True})}
+    answers = []
+
+    async def send(count):
+        for number in range(count):
+            await middleware(handle, FakeMessage(user_id, f"сообщение {number}", answers), data)
+
+    asyncio.run(send(5))
+    assert answers == [
+        "📝 Сообщение добавлено к вашему вопросу.",
+        "⏳ Слишком много сообщений. Подождите немного, пожалуйста."
+    ]
@@ -0,0 +1,96 @@
+"""Тесты таймеров открытых вопросов."""
+import asyncio
+from datetime import datetime
+
+from aiogram import Bot
+from aiogram.types import CallbackQuery, Chat, Message, User
+
+import services.timers as timers_module
+from benchmarks.fake_session import FakeSession
+from config import config
+from database import db
+from handlers.support import answer_callback
+from services.outbound import OutboundDispatcher
+from services.timers import QuestionTimers
+from utils.keyboards import get_admin_inline_keyboard
+
+
+def test_rebuild_wakes_running_scheduler():
+    db.add_question(501, "вопрос без ответа")
+    pending = {"501": db.get_question(501)}
+    resolved = []
+
+    async def scenario():
+        timers = QuestionTimers(sla=0, ready_timeout=0, retention=0.05)
+        # Пустой планировщик спит, пока его не разбудят
+        timers.start(lambda user_id, data, resolution: resolved.append((user_id, resolution)))
+        await asyncio.sleep(0.01)
+        await timers.rebuild(pending)
+        assert timers.stats()["timers"] == 1
+        for _ in range(100):
+            if resolved:
+                break
+            await asyncio.sleep(0.01)
+        await timers.stop()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        db.delete_question(501)
+    assert resolved == [(501, "expired")]
+
+
+def test_closing_question_in_reminder_removes_only_its_buttons(monkeypatch):
+    for user_id in (601, 602):
+        db.add_question(user_id, f"вопрос {user_id}")
+    session = FakeSession()
+    bot = Bot(token=config.BOT_TOKEN, session=session)
+
+    async def press(message: Message, data: str) -> Message:
+        """Нажимает кнопку сообщения и возвращает, каким оно стало."""
+        callback = CallbackQuery(
+            id="1", from_user=User(id=config.ADMIN_ID, is_bot=False, first_name="Админ"),
+            chat_instance="1", data=data, message=message
+        ).as_(bot)
+        await answer_callback(callback)
+        edit = session.requests[-2]
+        if edit.__api_method__ == "editMessageText":
+            return message.model_copy(update={"text": edit.text, "reply_markup": None})
+        assert edit.__api_method__ == "editMessageReplyMarkup"
+        return message.model_copy(update={"reply_markup": edit.reply_markup})
+
+    async def scenario():
+        outbound = OutboundDispatcher(global_rate=1000)
+        monkeypatch.setattr(timers_module, "outbound", outbound)
+        outbound.start(bot)
+        timers = QuestionTimers(sla=60, ready_timeout=0, retention=0)
+        timers._overdue = {config.ADMIN_ID: [(user_id, db.get_question(user_id)) for user_id in (601, 602)]}
+        timers._send_reminders()
+        await outbound.stop()
+        reminder = session.requests[-1]
+        message = Message(
+            message_id=1, date=datetime.now(), chat=Chat(id=config.ADMIN_ID, type="private"),
+            text=reminder.text, reply_markup=reminder.reply_markup
+        ).as_(bot)
+
+        # Напоминание - список: кнопки закрытого вопроса пропадают, текст остается
+        message = await press(message, "close_601")
+        buttons = [button.callback_data for row in message.reply_markup.inline_keyboard for button in row]
+        assert buttons == ["ans_602", "close_602"]
+        assert message.text == reminder.text
+        # В списке остался один вопрос, но это все еще список
+        message = await press(message, "close_602")
+        assert message.reply_markup.inline_keyboard == []
+        assert message.text == reminder.text
+
+        # Уведомление об одном вопросе при закрытии заменяется текстом
+        db.add_question(603, "вопрос 603")
+        single = Message(
+            message_id=2, date=datetime.now(), chat=Chat(id=config.ADMIN_ID, type="private"),
+            text="вопрос 603", reply_markup=get_admin_inline_keyboard(603)
+        ).as_(bot)
+        single = await press(single, "close_603")
+        assert single.text == "❌ Вопрос закрыт без ответа."
+
+    asyncio.run(scenario())
+    assert all(db.get_question(user_id) is None for user_id in (601, 602, 603))
@@ -0,0 +1,105 @@
+"""Тесты ответа в теле webhook-запроса."""
+import asyncio
+
+from aiogram import Bot, Dispatcher, F
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from benchmarks.fake_session import FakeSession
+from config import config
+from middlewares.webhook_reply import WebhookReplyMiddleware
+from services.webhook import PooledRequestHandler, UpdateWorkerPool
+
+REPLY_TIMEOUT = 0.2
+
+
+def make_update(update_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": 7, "type": "private"},
+            "from": {"id": 7, "is_bot": False, "first_name": "Тест"},
+            "text": text
+        }
+    }
+
+
+def make_dispatcher() -> Dispatcher:
+    dp = Dispatcher()
+
+    async def fast(message):
+        return message.answer("быстрый ответ")
+
+    async def slow(message):
+        await asyncio.sleep(REPLY_TIMEOUT * 2)
+        return message.answer("поздний ответ")
+
+    async def plain(message):
+        return message.answer("ответ без флага")
+
+    dp.message.register(fast, F.text == "fast", flags={"webhook_reply": True})
+    dp.message.register(slow, F.text == "slow", flags={"webhook_reply": True})
+    dp.message.register(plain, F.text == "plain")
+    dp.message.middleware(WebhookReplyMiddleware())
+    return dp
+
+
+async def post_updates(texts: list) -> tuple:
+    session = FakeSession()
+    bot = Bot(token=config.BOT_TOKEN, session=session)
+    handler = PooledRequestHandler(dispatcher=make_dispatcher(), bot=bot, reply_timeout=REPLY_TIMEOUT)
+    app = web.Application()
+    handler.register(app, path="/webhook")
+    bodies = []
+    async with TestClient(TestServer(app)) as client:
+        for update_id, text in enumerate(texts, 1):
+            response = await client.post("/webhook", json=make_update(update_id, text))
+            assert response.status == 200
+            bodies.append(await response.text())
+        await handler.pool.stop()
+    sent = [method.text for method in session.requests if method.__api_method__ == "sendMessage"]
+    return bodies, sent, handler.pool.stats()
+
+
+def test_flagged_reply_goes_in_webhook_response():
+    bodies, sent, stats = asyncio.run(post_updates(["fast"]))
+    assert "sendMessage" in bodies[0] and "быстрый ответ" in bodies[0]
+    assert sent == []
+    assert stats["webhook_replies"] == 1
+
+
+def test_late_and_unflagged_replies_use_api_calls():
+    bodies, sent, stats = asyncio.run(post_updates(["slow", "plain"]))
+    assert all("sendMessage" not in body for body in bodies)
+    assert sorted(sent) == ["ответ без флага", "поздний ответ"]
+    assert stats["webhook_replies"] == 0
+
+
+def test_pool_keeps_order_within_chat():
+    handled = []
+
+    class RecordingPool(UpdateWorkerPool):
+        async def _process(self, bot, update):
+            text = update["message"]["text"]
+            # Первые сообщения чата обрабатываются дольше последующих
+            await asyncio.sleep(0.05 if text.endswith("0") else 0.001)
+            handled.append((update["message"]["chat"]["id"], text))
+
+    async def scenario():
+        bot = Bot(token=config.BOT_TOKEN, session=FakeSession())
+        pool = RecordingPool(Dispatcher(), workers=4, max_queue=100)
+        update_id = 0
+        for number in range(5):
+            for chat_id in (1, 2, 3):
+                update_id += 1
+                update = make_update(update_id, f"{chat_id}-{number}")
+                update["message"]["chat"]["id"] = chat_id
+                assert await pool.submit(bot, update)
+        await pool.stop()
+
+    asyncio.run(scenario())
+    for chat_id in (1, 2, 3):
+        assert [text for chat, text in handled if chat == chat_id] == [f"{chat_id}-{n}" for n in range(5)]
+    assert len(handled) == 15
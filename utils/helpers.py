@@ -11,17 +11,111 @@ def format_user_info(user: User) -> tuple[str, str]:
 
 
 def format_question_message(user_id: int, question: str, username: str, 
-                           full_name: str) -> str:
+                           full_name: str, suggestions: list = ()) -> str:
     """Форматирует сообщение с вопросом для админа."""
-    return (
+    text = (
         f"📩 Новый вопрос!\n"
         f"👤 {username} ({full_name})\n"
         f"🆔 {user_id}\n\n"
         f"{question}"
     )
+    if suggestions:
+        text += "\n\n💡 Похожие прошлые ответы:"
+        for number, (_, score, answer) in enumerate(suggestions, start=1):
+            short = answer[:300] + ("..." if len(answer) > 300 else "")
+            text += f"\n{number}. ({score:.0%}) {short}"
+    return text
 
 
 def format_answer_message(answer: str) -> str:
     """Форматирует сообщение с ответом для пользователя."""
     return f"📬 **Ответ от поддержки Usupovo Life Hall:**\n\n{answer}"
 
+
+
+def format_digest_message(items: list[tuple[int, str, str]], first_number: int,
+                          page: int, pages: int, total: int) -> str:
+    """Форматирует страницу сводки вопросов для админа."""
+    lines = [f"📩 Новых вопросов: {total} (стр. {page + 1}/{pages})\n"]
+    for number, (user_id, username, question) in enumerate(items, start=first_number):
+        short = question[:200] + ("..." if len(question) > 200 else "")
+        lines.append(f"{number}. 👤 {username} (🆔 {user_id})\n{short}\n")
+    return "\n".join(lines)
+
+
+def format_age(seconds: int) -> str:
+    """Возраст вопроса из фильтра /questions: 90m, 2h, 1d."""
+    for unit, size in (("d", 86400), ("h", 3600)):
+        if seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds // 60}m"
+
+
+def format_pending_page(items: list[tuple[int, dict]], filters_text: str) -> str:
+    """Форматирует страницу неотвеченных вопросов для /questions."""
+    lines = [f"📋 Неотвеченные вопросы{filters_text}:\n"]
+    for number, (user_id, data) in enumerate(items, start=1):
+        question = data.get("question") or ""
+        short = question[:200] + ("..." if len(question) > 200 else "")
+        created_at = (data.get("created_at") or "")[:16].replace("T", " ")
+        lines.append(f"{number}. 👤 {data.get('username') or f'ID{user_id}'} (🆔 {user_id}), {created_at}\n{short}\n")
+    return "\n".join(lines)
+
+
+def format_sla_reminder(items: list[tuple[int, dict]], total: int, age: str,
+                        questions_hint: bool = True) -> str:
+    """Форматирует напоминание оператору о вопросах, которые ждут ответа дольше срока.
+
+    ``questions_hint`` - подсказать /questions, если вопросов больше, чем в
+    списке (команда доступна только администратору).
+    """
+    lines = [f"⏰ Ждут ответа дольше {age}: {total}\n"]
+    for number, (user_id, data) in enumerate(items, start=1):
+        question = data.get("question") or ""
+        short = question[:200] + ("..." if len(question) > 200 else "")
+        lines.append(f"{number}. 👤 {data.get('username') or f'ID{user_id}'} (🆔 {user_id})\n{short}\n")
+    if total > len(items):
+        more = f"...и еще {total - len(items)}."
+        lines.append(f"{more} Все: /questions старше {age}" if questions_hint else more)
+    return "\n".join(lines)
+
+
+def format_broadcast_progress(sent: int, failed: int, pruned: int, total: int,
+                              elapsed: float, status: str) -> str:
+    """Форматирует отчет о ходе рассылки для админа."""
+    done = sent + failed + pruned
+    rate = done / elapsed if elapsed else 0.0
+    text = (
+        f"📣 Рассылка {status}\n\n"
+        f"📨 Обработано: {done} из {total}\n"
+        f"✅ Доставлено: {sent}\n"
+        f"🚫 Заблокировали бота: {pruned}\n"
+        f"❌ Ошибки: {failed}\n"
+        f"⚡ Скорость: {rate:.1f} сообщ./с"
+    )
+    if status == "идет" and rate and done < total:
+        text += f"\n⏱ Осталось около {int((total - done) / rate) // 60 + 1} мин"
+    return text
+
+
+# Значки статусов вопросов в результатах поиска
+SEARCH_STATUS_ICONS = {
+    "open": "⏳", "answered": "✅", "closed": "❌", "unreachable": "🚫", "auto": "🤖", "expired": "⌛"
+}
+
+
+def format_search_results(query: str, items: list, first_number: int,
+                          page: int, pages: int) -> str:
+    """Форматирует страницу результатов поиска для админа."""
+    lines = [f"🔎 «{query}» (стр. {page + 1}/{pages})\n"]
+    for number, doc in enumerate(items, start=first_number):
+        icon = SEARCH_STATUS_ICONS.get(doc.status, "•")
+        question = doc.question[:200] + ("..." if len(doc.question) > 200 else "")
+        lines.append(
+            f"{number}. {icon} {doc.username or ''} (🆔 {doc.user_id}), {(doc.date or '')[:16].replace('T', ' ')}\n"
+            f"❓ {question}"
+        )
+        if doc.answer:
+            lines.append(f"💬 {doc.answer[:200]}{'...' if len(doc.answer) > 200 else ''}")
+        lines.append("")
+    return "\n".join(lines)
@@ -1,7 +1,11 @@
 """Утилиты для создания клавиатур."""
+from typing import Optional
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
 from config import config
 
+# Тексты кнопок главного меню (не считаются вопросами в поддержку)
+MENU_BUTTONS = frozenset({"📅 Расписание", "🎫 Купить билеты", "📞 Поддержка", "📊 Статистика"})
+
 
 def get_user_menu(is_admin: bool = False) -> ReplyKeyboardMarkup:
     """Создает главное меню для пользователя."""
@@ -24,16 +28,106 @@ def get_user_menu(is_admin: bool = False) -> ReplyKeyboardMarkup:
     )
 
 
-def get_admin_inline_keyboard(user_id: int) -> InlineKeyboardMarkup:
-    """Создает inline клавиатуру для ответа на вопрос."""
+def get_admin_inline_keyboard(user_id: int, suggestions: list = ()) -> InlineKeyboardMarkup:
+    """Создает inline клавиатуру для ответа на вопрос (с кнопками подсказок)."""
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [InlineKeyboardButton(text="💬 Ответить", callback_data=f"ans_{user_id}")],
+            *(
+                [InlineKeyboardButton(
+                    text=f"💡 Отправить {number}: {answer[:40].replace(chr(10), ' ')}", callback_data=f"sug_{user_id}_{key}"
+                )]
+                for number, (key, _, answer) in enumerate(suggestions, start=1)
+            ),
             [InlineKeyboardButton(text="❌ Закрыть", callback_data=f"close_{user_id}")]
         ]
     )
 
 
+def get_digest_keyboard(digest_id: int, user_ids: list[int], first_number: int,
+                        page: int, pages: int) -> InlineKeyboardMarkup:
+    """Создает клавиатуру страницы сводки: кнопки вопросов и навигация."""
+    rows = [
+        [
+            InlineKeyboardButton(text=f"💬 {number}", callback_data=f"ans_{user_id}"),
+            InlineKeyboardButton(text=f"❌ {number}", callback_data=f"close_{user_id}")
+        ]
+        for number, user_id in enumerate(user_ids, start=first_number)
+    ]
+    if pages > 1:
+        nav = []
+        if page > 0:
+            nav.append(InlineKeyboardButton(text="◀️", callback_data=f"dg_{digest_id}_{page - 1}"))
+        nav.append(InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data=f"dg_{digest_id}_{page}"))
+        if page < pages - 1:
+            nav.append(InlineKeyboardButton(text="▶️", callback_data=f"dg_{digest_id}_{page + 1}"))
+        rows.append(nav)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def get_search_keyboard(search_id: int, page: int, pages: int) -> InlineKeyboardMarkup:
+    """Создает клавиатуру листания результатов поиска."""
+    if pages <= 1:
+        return InlineKeyboardMarkup(inline_keyboard=[])
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton(text="◀️", callback_data=f"srch_{search_id}_{page - 1}"))
+    nav.append(InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data=f"srch_{search_id}_{page}"))
+    if page < pages - 1:
+        nav.append(InlineKeyboardButton(text="▶️", callback_data=f"srch_{search_id}_{page + 1}"))
+    return InlineKeyboardMarkup(inline_keyboard=[nav])
+
+
+def get_pending_keyboard(user_ids: list[int], filters: str, first: Optional[tuple[str, int]],
+                         last: Optional[tuple[str, int]]) -> InlineKeyboardMarkup:
+    """Создает клавиатуру страницы /questions: кнопки вопросов и переход по курсорам.
+
+    ``first``/``last`` - ключи (created_at, user_id) первого и последнего
+    вопроса страницы, если перед ней/после нее еще есть вопросы.
+    """
+    rows = [
+        [
+            InlineKeyboardButton(text=f"💬 {number}", callback_data=f"ans_{user_id}"),
+            InlineKeyboardButton(text=f"❌ {number}", callback_data=f"close_{user_id}")
+        ]
+        for number, user_id in enumerate(user_ids, start=1)
+    ]
+    nav = []
+    if first is not None:
+        nav.append(InlineKeyboardButton(text="◀️", callback_data=f"qp_p_{filters}_{first[0]}_{first[1]}"))
+    if last is not None:
+        nav.append(InlineKeyboardButton(text="▶️", callback_data=f"qp_n_{filters}_{last[0]}_{last[1]}"))
+    if nav:
+        rows.append(nav)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def is_question_list(markup: Optional[InlineKeyboardMarkup]) -> bool:
+    """Сообщение со списком вопросов (сводка, /questions, напоминание), а не с одним вопросом.
+
+    В списке кнопки вопроса стоят в одной строке, у отдельного вопроса - в разных,
+    так что список узнается, даже когда в нем остался один вопрос.
+    """
+    if not markup:
+        return False
+    for row in markup.inline_keyboard:
+        data = [button.callback_data or "" for button in row]
+        if any(item.startswith(("dg_", "qp_")) for item in data):
+            return True
+        if any(item.startswith("ans_") for item in data) and any(item.startswith("close_") for item in data):
+            return True
+    return False
+
+
+def remove_question_buttons(markup: InlineKeyboardMarkup, user_id: int) -> InlineKeyboardMarkup:
+    """Убирает из клавиатуры строку с кнопками вопроса пользователя."""
+    own = {f"ans_{user_id}", f"close_{user_id}"}
+    return InlineKeyboardMarkup(inline_keyboard=[
+        row for row in markup.inline_keyboard
+        if not any(button.callback_data in own for button in row)
+    ])
+
+
 def get_back_keyboard() -> ReplyKeyboardMarkup:
     """Создает клавиатуру с кнопкой 'Назад'."""
     return ReplyKeyboardMarkup(